@@ -6,3 +6,4 @@
 from blenderproc.python.renderer.SegMapRendererUtility import render_segmap
 from blenderproc.python.renderer.FlowRendererUtility import render_optical_flow
 from blenderproc.python.renderer.NOCSRendererUtility import render_nocs
+from blenderproc.python.renderer.GroundTruthRendererUtility import render_ground_truth
@@ -28,6 +28,9 @@ def cli():
         "extract": {
             'hdf5': "Extracts images out of an hdf5 file into separate image files."
         },
+        "compact": {
+            'coco': "Merges sharded coco annotations into one coco_annotations.json file."
+        },
         "download": {
             'blenderkit': "Downloads materials and models from blenderkit.",
             'cc_textures': "Downloads textures from cc0textures.com.",
@@ -68,6 +71,9 @@ def cli():
     parser_extract = subparsers.add_parser('extract', help="Extract the raw images from generated containers such "
                                                            f"as hdf5. \nOptions: {', '.join(options['extract'])}",
                                            formatter_class=argparse.RawTextHelpFormatter)
+    parser_compact = subparsers.add_parser('compact', help="Merge incrementally written outputs into their standard "
+                                                           f"format. \nOptions: {', '.join(options['compact'])}",
+                                           formatter_class=argparse.RawTextHelpFormatter)
     parser_pip = subparsers.add_parser('pip', help="Can be used to install/uninstall pip packages in the Blender "
                                                    f"python environment. \nOptions: {', '.join(options['pip'])}",
                                        formatter_class=argparse.RawTextHelpFormatter)
@@ -84,6 +90,10 @@ def cli():
     for cmd, help_str in options['extract'].items():
         sub_parser_extract.add_parser(cmd, help=help_str, add_help=False)
 
+    sub_parser_compact = parser_compact.add_subparsers(dest='compact_mode')
+    for cmd, help_str in options['compact'].items():
+        sub_parser_compact.add_parser(cmd, help=help_str, add_help=False)
+
     parser_pip.add_argument('pip_mode', choices=options['pip'],
                             help='\n'.join(f"{key}: {value}" for key, value in options["pip"].items()))
     parser_pip.add_argument('pip_packages', metavar='pip_packages', nargs='*',
@@ -216,7 +226,7 @@ def handle_sigterm(_signum, _frame):
 
         sys.exit(p.returncode)
     # Import the required entry point
-    elif args.mode in ["vis", "extract", "download"]:
+    elif args.mode in ["vis", "extract", "compact", "download"]:
         # pylint: disable=import-outside-toplevel
         if args.mode == "vis" and args.vis_mode == "hdf5":
             from blenderproc.scripts.visHdf5Files import cli as current_cli
@@ -224,6 +234,8 @@ def handle_sigterm(_signum, _frame):
             from blenderproc.scripts.vis_coco_annotation import cli as current_cli
         elif args.mode == "extract" and args.extract_mode == "hdf5":
             from blenderproc.scripts.saveAsImg import cli as current_cli
+        elif args.mode == "compact" and args.compact_mode == "coco":
+            from blenderproc.scripts.compact_coco_annotations import cli as current_cli
         elif args.mode == "download" and args.download_mode == "blenderkit":
             from blenderproc.scripts.download_blenderkit import cli as current_cli
         elif args.mode == "download" and args.download_mode == "cc_textures":
@@ -1,8 +1,9 @@
 """Useful functions ot evaluate the objects in the camera's viewport."""
 
+import multiprocessing
 import numbers
 import sys
-from typing import Union, List, Set
+from typing import Union, List, Set, Optional, Tuple, Dict
 from collections import defaultdict
 
 import bpy
@@ -10,7 +11,116 @@
 from mathutils import Matrix
 from mathutils.bvhtree import BVHTree
 
-from blenderproc.python.types.MeshObjectUtility import MeshObject
+from blenderproc.python.types.MeshObjectUtility import MeshObject, create_bvh_tree_multi_objects, \
+    get_all_mesh_objects
+
+
+def cast_camera_rays(cam2world_matrix: Union[Matrix, np.ndarray], sqrt_number_of_rays: int = 10,
+                     bvh_tree: Optional[BVHTree] = None,
+                     max_distance: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray, List[bpy.types.Object]]:
+    """ Sends a grid of rays from the given camera pose through the camera frame.
+
+    The ray directions are computed at once, then all rays are cast either against the given bvh tree or against
+    the scene, using the same evaluated depsgraph for all rays.
+
+    :param cam2world_matrix: The world matrix which describes the camera pose.
+    :param sqrt_number_of_rays: The square root of the number of rays which should be sent.
+    :param bvh_tree: If given, the rays are cast against this bvh tree, otherwise against the whole scene.
+    :param max_distance: If given, only hits up to this distance are considered.
+    :return: The hit distances with shape [N] (inf, if nothing was hit), the index of the hit object with shape
+             [N] (-1, if nothing was hit or a bvh tree is used) and the list of hit objects the indices refer to.
+             The rays are ordered row by row along the first side of the camera frame.
+    """
+    positions, directions = _camera_ray_grid(np.array(cam2world_matrix)[None], _camera_frame(), sqrt_number_of_rays)
+    position = positions[0].tolist()
+
+    if bvh_tree is not None:
+        distances, _ = _cast_rays_against_bvh_tree(bvh_tree, positions, directions, max_distance)
+        return distances[0], np.full(len(distances[0]), -1), []
+
+    distances = np.full(directions.shape[1], np.inf)
+    object_indices = np.full(directions.shape[1], -1)
+    hit_objects: List[bpy.types.Object] = []
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    hit_object_indices: Dict[bpy.types.Object, int] = {}
+    hit_locations = np.zeros((directions.shape[1], 3))
+    for i, direction in enumerate(directions[0].tolist()):
+        # Send ray from the camera position through the current point on the plane
+        if max_distance is None:
+            hit, location, _, _, hit_object, _ = bpy.context.scene.ray_cast(depsgraph, position, direction)
+        else:
+            hit, location, _, _, hit_object, _ = bpy.context.scene.ray_cast(depsgraph, position, direction,
+                                                                             distance=max_distance)
+        if hit:
+            if hit_object not in hit_object_indices:
+                hit_object_indices[hit_object] = len(hit_objects)
+                hit_objects.append(hit_object)
+            object_indices[i] = hit_object_indices[hit_object]
+            hit_locations[i] = location
+    hits = object_indices >= 0
+    distances[hits] = np.linalg.norm(hit_locations[hits] - np.array(position), axis=1)
+
+    return distances, object_indices, hit_objects
+
+
+def _camera_frame() -> np.ndarray:
+    """ Returns the corners of the near plane of the active camera in camera space.
+
+    :return: The four corners with shape [4, 3].
+    """
+    cam = bpy.context.scene.camera.data
+    return np.array([list(v) for v in cam.view_frame(scene=bpy.context.scene)])
+
+
+def _camera_ray_grid(cam2world_matrices: np.ndarray, frame: np.ndarray,
+                     sqrt_number_of_rays: int) -> Tuple[np.ndarray, np.ndarray]:
+    """ Computes the rays going from each camera position through a grid over its near plane.
+
+    :param cam2world_matrices: The camera poses with shape [N, 4, 4].
+    :param frame: The corners of the near plane in camera space with shape [4, 3].
+    :param sqrt_number_of_rays: The square root of the number of rays per camera pose.
+    :return: The camera positions with shape [N, 3] and the ray directions with shape [N, R, 3]. The rays are
+             ordered row by row along the first side of the camera frame.
+    """
+    # Bring the corners of the near plane to world space
+    frames = frame @ np.transpose(cam2world_matrices[:, :3, :3], (0, 2, 1)) + cam2world_matrices[:, None, :3, 3]
+
+    # Compute vectors along both sides of the plane
+    vec_x = frames[:, 1] - frames[:, 0]
+    vec_y = frames[:, 3] - frames[:, 0]
+
+    # Compute all points of the grids over the planes at once
+    steps = np.arange(sqrt_number_of_rays) / float(sqrt_number_of_rays - 1)
+    ends = frames[:, None, None, 0] + steps[None, :, None, None] * vec_x[:, None, None] + \
+        steps[None, None, :, None] * vec_y[:, None, None]
+    positions = cam2world_matrices[:, :3, 3]
+    directions = ends.reshape(len(cam2world_matrices), -1, 3) - positions[:, None]
+    return positions, directions
+
+
+def _cast_rays_against_bvh_tree(bvh_tree: BVHTree, positions: np.ndarray, directions: np.ndarray,
+                                max_distance: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """ Casts the given rays against the bvh tree.
+
+    :param bvh_tree: The bvh tree to cast the rays against.
+    :param positions: The start positions of the rays with shape [N, 3].
+    :param directions: The directions of the rays starting at each position with shape [N, R, 3].
+    :param max_distance: If given, only hits up to this distance are considered.
+    :return: The hit distances with shape [N, R] (inf, if nothing was hit) and the indices of the hit faces with
+             shape [N, R] (-1, if nothing was hit).
+    """
+    distances = np.full(directions.shape[:2], np.inf)
+    face_indices = np.full(directions.shape[:2], -1)
+    for i, (position, pose_directions) in enumerate(zip(positions.tolist(), directions.tolist())):
+        for j, direction in enumerate(pose_directions):
+            if max_distance is None:
+                _, _, face_index, dist = bvh_tree.ray_cast(position, direction)
+            else:
+                _, _, face_index, dist = bvh_tree.ray_cast(position, direction, max_distance)
+            if dist is not None:
+                distances[i, j] = dist
+                face_indices[i, j] = face_index
+    return distances, face_indices
 
 
 def perform_obstacle_in_view_check(cam2world_matrix: Union[Matrix, np.ndarray], proximity_checks: dict,
@@ -32,24 +142,17 @@ def perform_obstacle_in_view_check(cam2world_matrix: Union[Matrix, np.ndarray],
     if not proximity_checks:  # if no checks are in the settings all positions are accepted
         return True
 
-    cam2world_matrix = Matrix(cam2world_matrix)
-
-    cam_ob = bpy.context.scene.camera
-    cam = cam_ob.data
-    # Get position of the corners of the near plane
-    frame = cam.view_frame(scene=bpy.context.scene)
-    # Bring to world space
-    frame = [cam2world_matrix @ v for v in frame]
+    range_distance = _validate_proximity_checks(proximity_checks)
+    distances, _, _ = cast_camera_rays(cam2world_matrix, sqrt_number_of_rays, bvh_tree, range_distance)
+    return bool(_evaluate_proximity_checks(distances, proximity_checks))
 
-    # Compute vectors along both sides of the plane
-    vec_x = frame[1] - frame[0]
-    vec_y = frame[3] - frame[0]
-
-    sum_value = 0.0
-    sum_sq = 0.0
 
-    range_distance = sys.float_info.max
+def _validate_proximity_checks(proximity_checks: dict) -> Optional[float]:
+    """ Validates the given proximity checks and determines the ray range distance required to evaluate them.
 
+    :param proximity_checks: The proximity checks, see `perform_obstacle_in_view_check`.
+    :return: The maximum distance up to which rays need to be cast or None, if there is no limit.
+    """
     # Input validation
     for operator in proximity_checks:
         if operator in ["min", "max"] and not isinstance(proximity_checks[operator], numbers.Number):
@@ -62,65 +165,53 @@ def perform_obstacle_in_view_check(cam2world_matrix: Union[Matrix, np.ndarray],
                     not isinstance(proximity_checks[operator]["max"], numbers.Number):
                 raise ValueError("Threshold must be a number in perform_obstacle_in_view_check")
 
+    if "no_background" in proximity_checks and proximity_checks["no_background"]:
+        # when no background is on, it can not be combined with a reduced range distance
+        return None
+
     # If there are no average or variance operators, we can decrease the ray range distance for efficiency
     if "avg" not in proximity_checks and "var" not in proximity_checks:
         if "max" in proximity_checks:
             # Cap distance values at a value slightly higher than the max threshold
-            range_distance = proximity_checks["max"] + 1.0
-        else:
-            range_distance = proximity_checks["min"]
+            return proximity_checks["max"] + 1.0
+        if "min" in proximity_checks:
+            return proximity_checks["min"]
+    return None
 
-    no_range_distance = False
-    if "no_background" in proximity_checks and proximity_checks["no_background"]:
-        # when no background is on, it can not be combined with a reduced range distance
-        no_range_distance = True
-
-    # Go in discrete grid-like steps over plane
-    position = cam2world_matrix.to_translation()
-    for x in range(0, sqrt_number_of_rays):
-        for y in range(0, sqrt_number_of_rays):
-            # Compute current point on plane
-            end = frame[0] + vec_x * x / float(sqrt_number_of_rays - 1) + vec_y * y / float(sqrt_number_of_rays - 1)
-            # Send ray from the camera position through the current point on the plane
-            if no_range_distance:
-                _, _, _, dist = bvh_tree.ray_cast(position, end - position)
-            else:
-                _, _, _, dist = bvh_tree.ray_cast(position, end - position, range_distance)
 
-            # Check if something was hit and how far it is away
-            if dist is not None:
-                if "min" in proximity_checks and dist <= proximity_checks["min"]:
-                    return False
-                if "max" in proximity_checks and dist >= proximity_checks["max"]:
-                    return False
-                if "avg" in proximity_checks:
-                    sum_value += dist
-                if "var" in proximity_checks:
-                    if not "avg" in proximity_checks:
-                        sum_value += dist
-                    sum_sq += dist * dist
-            elif "no_background" in proximity_checks and proximity_checks["no_background"]:
-                return False
+def _evaluate_proximity_checks(distances: np.ndarray, proximity_checks: dict) -> np.ndarray:
+    """ Evaluates the given proximity checks on the distances of the rays sent through the camera frame.
+
+    :param distances: The hit distances of all rays with shape [..., R], inf if nothing was hit.
+    :param proximity_checks: The proximity checks, see `perform_obstacle_in_view_check`.
+    :return: A boolean array with shape [...], True where the distances do not violate any of the specified
+             proximity_checks.
+    """
+    hits = np.isfinite(distances)
+    hit_distances = np.where(hits, distances, 0)
+    valid = np.ones(distances.shape[:-1], dtype=bool)
+
+    # Check if something was hit and how far it is away
+    if "min" in proximity_checks:
+        valid &= ~np.any(hits & (distances <= proximity_checks["min"]), axis=-1)
+    if "max" in proximity_checks:
+        valid &= ~np.any(hits & (distances >= proximity_checks["max"]), axis=-1)
+    if "no_background" in proximity_checks and proximity_checks["no_background"]:
+        valid &= np.all(hits, axis=-1)
 
+    # Rays which did not hit anything count as distance 0
+    avg = hit_distances.sum(axis=-1) / distances.shape[-1]
     if "avg" in proximity_checks:
-        avg = sum_value / (sqrt_number_of_rays * sqrt_number_of_rays)
-        # Check that the average distance is not within the accepted interval
-        if avg >= proximity_checks["avg"]["max"] or avg <= proximity_checks["avg"]["min"]:
-            return False
+        # Check that the average distance is within the accepted interval
+        valid &= (avg < proximity_checks["avg"]["max"]) & (avg > proximity_checks["avg"]["min"])
 
     if "var" in proximity_checks:
-        if not "avg" in proximity_checks:
-            avg = sum_value / (sqrt_number_of_rays * sqrt_number_of_rays)
-        sq_avg = avg * avg
-
-        avg_sq = sum_sq / (sqrt_number_of_rays * sqrt_number_of_rays)
+        avg_sq = np.square(hit_distances).sum(axis=-1) / distances.shape[-1]
+        var = avg_sq - avg * avg
+        # Check that the variance value of the distance is within the accepted interval
+        valid &= (var < proximity_checks["var"]["max"]) & (var > proximity_checks["var"]["min"])
 
-        var = avg_sq - sq_avg
-        # Check that the variance value of the distance is not within the accepted interval
-        if var >= proximity_checks["var"]["max"] or var <= proximity_checks["var"]["min"]:
-            return False
-
-    return True
+    return valid
 
 
 def visible_objects(cam2world_matrix: Union[Matrix, np.ndarray], sqrt_number_of_rays: int = 10) -> Set[MeshObject]:
@@ -133,35 +224,8 @@ def visible_objects(cam2world_matrix: Union[Matrix, np.ndarray], sqrt_number_of_
                                 visible objects.
     :return: A set of objects visible hit by the sent rays.
     """
-    cam2world_matrix = Matrix(cam2world_matrix)
-
-    visible_objects_set = set()
-    cam_ob = bpy.context.scene.camera
-    cam = cam_ob.data
-
-    # Get position of the corners of the near plane
-    frame = cam.view_frame(scene=bpy.context.scene)
-    # Bring to world space
-    frame = [cam2world_matrix @ v for v in frame]
-
-    # Compute vectors along both sides of the plane
-    vec_x = frame[1] - frame[0]
-    vec_y = frame[3] - frame[0]
-
-    # Go in discrete grid-like steps over plane
-    position = cam2world_matrix.to_translation()
-    for x in range(0, sqrt_number_of_rays):
-        for y in range(0, sqrt_number_of_rays):
-            # Compute current point on plane
-            end = frame[0] + vec_x * x / float(sqrt_number_of_rays - 1) + vec_y * y / float(sqrt_number_of_rays - 1)
-            # Send ray from the camera position through the current point on the plane
-            _, _, _, _, hit_object, _ = bpy.context.scene.ray_cast(bpy.context.evaluated_depsgraph_get(),
-                                                                   position, end - position)
-            # Add hit object to set
-            if hit_object:
-                visible_objects_set.add(MeshObject(hit_object))
-
-    return visible_objects_set
+    _, _, hit_objects = cast_camera_rays(cam2world_matrix, sqrt_number_of_rays)
+    return {MeshObject(hit_object) for hit_object in hit_objects}
 
 
 def scene_coverage_score(cam2world_matrix: Union[Matrix, np.ndarray], special_objects: list = None,
@@ -183,62 +247,55 @@ def scene_coverage_score(cam2world_matrix: Union[Matrix, np.ndarray], special_ob
                                 visible objects.
     :return: the scoring of the scene.
     """
-    cam2world_matrix = Matrix(cam2world_matrix)
+    _, object_indices, hit_objects = cast_camera_rays(cam2world_matrix, sqrt_number_of_rays)
+    return _coverage_score_from_hits(object_indices, hit_objects, special_objects, special_objects_weight)
+
 
+def _coverage_score_from_hits(object_indices: np.ndarray, hit_objects: List[bpy.types.Object],
+                              special_objects: Optional[list], special_objects_weight: float) -> float:
+    """ Computes the scene coverage score from the objects hit by the rays sent through the camera frame.
+
+    :param object_indices: The index of the object hit by each ray, -1 if nothing was hit.
+    :param hit_objects: The hit objects the indices refer to, ordered by their first hit.
+    :param special_objects: Objects that weights differently, see `scene_coverage_score`.
+    :param special_objects_weight: Weighting factor for more special objects, see `scene_coverage_score`.
+    :return: the scoring of the scene.
+    """
     if special_objects is None:
         special_objects = []
-    cam_ob = bpy.context.scene.camera
-    cam = cam_ob.data
 
-    num_of_rays = sqrt_number_of_rays * sqrt_number_of_rays
+    num_of_rays = len(object_indices)
     score = 0.0
     objects_hit: defaultdict = defaultdict(int)
 
-    # Get position of the corners of the near plane
-    frame = cam.view_frame(scene=bpy.context.scene)
-    # Bring to world space
-    frame = [cam2world_matrix @ v for v in frame]
-
-    # Compute vectors along both sides of the plane
-    vec_x = frame[1] - frame[0]
-    vec_y = frame[3] - frame[0]
-
-    # Go in discrete grid-like steps over plane
-    position = cam2world_matrix.to_translation()
-    for x in range(0, sqrt_number_of_rays):
-        for y in range(0, sqrt_number_of_rays):
-            # Compute current point on plane
-            end = frame[0] + vec_x * x / float(sqrt_number_of_rays - 1) + vec_y * y / float(sqrt_number_of_rays - 1)
-            # Send ray from the camera position through the current point on the plane
-            hit, _, _, _, hit_object, _ = bpy.context.scene.ray_cast(bpy.context.evaluated_depsgraph_get(),
-                                                                     position, end - position)
-
-            if hit:
-                is_of_special_dataset = "is_suncg" in hit_object or "is_3d_front" in hit_object
-                is_suncg_object = "suncg_type" in hit_object and hit_object["suncg_type"] == "Object"
-                is_front_3d_object = "3D_future_type" in hit_object and hit_object["3D_future_type"] == "Object"
-                if is_of_special_dataset and is_suncg_object or is_of_special_dataset and is_front_3d_object:
-                    # calculate the score based on the type of the object,
-                    # wall, floor and ceiling objects have 0 score
-                    if "coarse_grained_class" in hit_object:
-                        object_class = hit_object["coarse_grained_class"]
-                        objects_hit[object_class] += 1
-                        if object_class in special_objects:
-                            score += special_objects_weight
-                        else:
-                            score += 1
-                    else:
-                        score += 1
-                elif "category_id" in hit_object:
-                    object_class = hit_object["category_id"]
-                    if object_class in special_objects:
-                        score += special_objects_weight
-                    else:
-                        score += 1
-                    objects_hit[object_class] += 1
+    # The number of rays hitting each object
+    hit_counts = np.bincount(object_indices[object_indices >= 0], minlength=len(hit_objects))
+    for hit_object, hit_count in zip(hit_objects, hit_counts.tolist()):
+        is_of_special_dataset = "is_suncg" in hit_object or "is_3d_front" in hit_object
+        is_suncg_object = "suncg_type" in hit_object and hit_object["suncg_type"] == "Object"
+        is_front_3d_object = "3D_future_type" in hit_object and hit_object["3D_future_type"] == "Object"
+        if is_of_special_dataset and is_suncg_object or is_of_special_dataset and is_front_3d_object:
+            # calculate the score based on the type of the object,
+            # wall, floor and ceiling objects have 0 score
+            if "coarse_grained_class" in hit_object:
+                object_class = hit_object["coarse_grained_class"]
+                objects_hit[object_class] += hit_count
+                if object_class in special_objects:
+                    score += special_objects_weight * hit_count
                 else:
-                    objects_hit[hit_object] += 1
-                    score += 1
+                    score += hit_count
+            else:
+                score += hit_count
+        elif "category_id" in hit_object:
+            object_class = hit_object["category_id"]
+            if object_class in special_objects:
+                score += special_objects_weight * hit_count
+            else:
+                score += hit_count
+            objects_hit[object_class] += hit_count
+        else:
+            objects_hit[hit_object] += hit_count
+            score += hit_count
     # For a scene with three different objects, the starting variance is 1.0, increases/decreases by '1/3' for
     # each object more/less, excluding floor, ceiling and walls
     scene_variance = len(objects_hit) / 3.0
@@ -250,6 +307,118 @@ def scene_coverage_score(cam2world_matrix: Union[Matrix, np.ndarray], special_ob
     return score
 
 
+def validate_camera_poses(cam2world_matrices: np.ndarray, proximity_checks: Optional[dict] = None,
+                          min_coverage_score: Optional[float] = None, objects: Optional[List[MeshObject]] = None,
+                          bvh_tree: Optional[BVHTree] = None, special_objects: Optional[list] = None,
+                          special_objects_weight: float = 2, sqrt_number_of_rays: int = 10,
+                          num_processes: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """ Validates a batch of candidate camera poses at once.
+
+    All candidates are checked against the same bvh tree, which is built only once via
+    `create_bvh_tree_multi_objects`. A candidate is valid if it fulfills the given proximity checks (see
+    `perform_obstacle_in_view_check`) and if its scene coverage score (see `scene_coverage_score`) is at least
+    `min_coverage_score`. In contrast to `scene_coverage_score`, the coverage is determined by casting the rays
+    against the bvh tree, so only the given objects are considered.
+
+    :param cam2world_matrices: The candidate camera poses with shape [N, 4, 4].
+    :param proximity_checks: The proximity checks every valid pose has to fulfill, see
+                             `perform_obstacle_in_view_check`. If None, no proximity checks are performed.
+    :param min_coverage_score: The minimum scene coverage score of valid poses. If None, no scores are computed.
+    :param objects: The mesh objects to cast the rays against. If None, all mesh objects in the scene are used.
+    :param bvh_tree: A bvh tree built via `create_bvh_tree_multi_objects` from exactly the given objects in the same
+                     order. If None, the tree is built here.
+    :param special_objects: Objects that weights differently in calculating the scene coverage score, see
+                            `scene_coverage_score`.
+    :param special_objects_weight: Weighting factor for the special objects, see `scene_coverage_score`.
+    :param sqrt_number_of_rays: The square root of the number of rays which are sent per candidate.
+    :param num_processes: The number of processes the ray casting is distributed to. If 0, all rays are cast in
+                          this process. Requires the fork start method, which is not available on Windows.
+    :return: A boolean mask with shape [N], which is True for all valid candidates, and the scene coverage scores
+             with shape [N] (nan, if min_coverage_score is None).
+    """
+    cam2world_matrices = np.array(cam2world_matrices, dtype=np.float64).reshape(-1, 4, 4)
+    mask = np.ones(len(cam2world_matrices), dtype=bool)
+    scores = np.full(len(cam2world_matrices), np.nan)
+    if not proximity_checks and min_coverage_score is None:
+        return mask, scores
+
+    if objects is None:
+        objects = get_all_mesh_objects()
+    if bvh_tree is None:
+        bvh_tree = create_bvh_tree_multi_objects(objects)
+
+    range_distance = _validate_proximity_checks(proximity_checks) if proximity_checks else None
+    # The coverage score requires all hits, so the range can only be reduced if no scores are computed
+    max_distance = range_distance if min_coverage_score is None else None
+
+    positions, directions = _camera_ray_grid(cam2world_matrices, _camera_frame(), sqrt_number_of_rays)
+    if num_processes > 0 and len(cam2world_matrices) > 1:
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise RuntimeError("Validating camera poses in multiple processes requires the fork start method")
+        # The bvh tree cannot be pickled, so it is handed over to the forked workers via their initializer
+        chunks = np.array_split(np.arange(len(cam2world_matrices)), min(num_processes * 4, len(cam2world_matrices)))
+        with multiprocessing.get_context("fork").Pool(num_processes, initializer=_init_ray_cast_worker,
+                                                      initargs=(bvh_tree,)) as pool:
+            results = pool.starmap(_ray_cast_worker, [(positions[chunk], directions[chunk], max_distance)
+                                                      for chunk in chunks])
+        distances = np.concatenate([result[0] for result in results])
+        face_indices = np.concatenate([result[1] for result in results])
+    else:
+        distances, face_indices = _cast_rays_against_bvh_tree(bvh_tree, positions, directions, max_distance)
+
+    if proximity_checks:
+        if range_distance is not None:
+            # Ignore all hits outside the range the checks are defined for
+            distances = np.where(distances <= range_distance, distances, np.inf)
+        mask &= _evaluate_proximity_checks(distances, proximity_checks)
+
+    if min_coverage_score is not None:
+        # Map the face indices of the bvh tree to the objects they have been created from
+        face_offsets = np.cumsum([0] + [len(obj.get_mesh().polygons) for obj in objects])
+        object_indices = np.where(face_indices >= 0, np.searchsorted(face_offsets, face_indices, side="right") - 1,
+                                  -1)
+        for i, pose_object_indices in enumerate(object_indices):
+            # Renumber the hit objects in the order of their first hit
+            hits = pose_object_indices >= 0
+            hit_object_ids, first_hits, inverse = np.unique(pose_object_indices[hits], return_index=True,
+                                                            return_inverse=True)
+            order = np.argsort(first_hits)
+            rank = np.empty_like(order)
+            rank[order] = np.arange(len(order))
+            local_indices = np.full(len(pose_object_indices), -1)
+            local_indices[hits] = rank[inverse.reshape(-1)]
+            scores[i] = _coverage_score_from_hits(local_indices,
+                                                  [objects[j].blender_obj for j in hit_object_ids[order]],
+                                                  special_objects, special_objects_weight)
+        mask &= scores >= min_coverage_score
+
+    return mask, scores
+
+
+_worker_bvh_tree: Optional[BVHTree] = None
+
+
+def _init_ray_cast_worker(bvh_tree: BVHTree):
+    """ Stores the bvh tree for all rays cast in this worker process.
+
+    :param bvh_tree: The bvh tree to cast the rays against.
+    """
+    global _worker_bvh_tree
+    _worker_bvh_tree = bvh_tree
+
+
+def _ray_cast_worker(positions: np.ndarray, directions: np.ndarray,
+                     max_distance: Optional[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """ Casts the given rays against the bvh tree of this worker process, see `_cast_rays_against_bvh_tree`.
+
+    :param positions: The start positions of the rays with shape [N, 3].
+    :param directions: The directions of the rays starting at each position with shape [N, R, 3].
+    :param max_distance: If given, only hits up to this distance are considered.
+    :return: The hit distances and the indices of the hit faces, both with shape [N, R].
+    """
+    return _cast_rays_against_bvh_tree(_worker_bvh_tree, positions, directions, max_distance)
+
+
 def decrease_interest_score(interest_score: float, min_interest_score: float, interest_score_step: float):
     """ Decreases the interest scores in the given interval
 
@@ -280,37 +449,156 @@ def check_novel_pose(cam2world_matrix: Union[Matrix, np.ndarray], existing_poses
                                      check that the variance is increased. Default: sys.float_info.min.
     :return: True, if the given pose is novel.
     """
-    def _variance_constraint(array, new_val, old_var, diff_threshold, mode):
-        array.append(new_val)
-        var = np.var(array)
-
-        if var < old_var:
-            array.pop()
-            return False
-
-        diff = ((var - old_var) / old_var) * 100.0
-        print(f"Variance difference {mode}: {diff}")
-        if diff < diff_threshold:  # Check if the variance increased sufficiently
-            array.pop()
-            return False
+    # When checking many poses, keep one PoseNoveltyTracker instead, which does not revisit all existing poses
+    tracker = PoseNoveltyTracker(check_pose_novelty_rot, check_pose_novelty_translation, min_var_diff_rot,
+                                 min_var_diff_translation)
+    for pose in existing_poses:
+        tracker.add_pose(pose)
+    return tracker.is_novel(cam2world_matrix)
 
-        return True
-
-    if len(existing_poses) > 0:  # First pose is always novel
-        cam2world_matrix = Matrix(cam2world_matrix)
-        if check_pose_novelty_rot:
-            rotations = [Matrix(pose).to_euler() for pose in existing_poses]
-            var_rot = np.var(rotations)
 
-            if not _variance_constraint(rotations, cam2world_matrix.to_euler(), var_rot, min_var_diff_rot, "rotation"):
-                return False
+class PoseNoveltyTracker:
+    """ Keeps track of the variance of all accepted camera poses to check if new poses are novel.
 
-        if check_pose_novelty_translation:
-            translations = [Matrix(pose).to_translation() for pose in existing_poses]
-            var_translation = np.var(translations)
-
-            if not _variance_constraint(translations, cam2world_matrix.to_translation(), var_translation,
-                                        min_var_diff_translation, "translation"):
-                return False
+    The rotation (as euler angles) and translation variances are updated incrementally, so checking and adding a
+    pose takes constant time, independent of the number of already accepted poses. The checks are the same as in
+    `check_novel_pose`.
+    """
 
-    return True
+    def __init__(self, check_pose_novelty_rot: bool = True, check_pose_novelty_translation: bool = True,
+                 min_var_diff_rot: float = -1, min_var_diff_translation: float = -1):
+        """
+        :param check_pose_novelty_rot: Checks that a new pose is novel with respect to the rotation component.
+        :param check_pose_novelty_translation: Checks that a new pose is novel with respect to the translation
+                                               component.
+        :param min_var_diff_rot: Considers a pose novel if it increases the variance of the rotation component of all
+                                 poses by this parameter's value in percentage. If set to -1, then it would only
+                                 check that the variance is increased.
+        :param min_var_diff_translation: Same as min_var_diff_rot but for translation.
+        """
+        self.check_pose_novelty_rot = check_pose_novelty_rot
+        self.check_pose_novelty_translation = check_pose_novelty_translation
+        self.min_var_diff_rot = min_var_diff_rot
+        self.min_var_diff_translation = min_var_diff_translation
+        self._rotation_stats = _RunningVariance()
+        self._translation_stats = _RunningVariance()
+        self._num_poses = 0
+
+    def __len__(self) -> int:
+        """ Returns the number of added poses. """
+        return self._num_poses
+
+    def add_pose(self, cam2world_matrix: Union[Matrix, np.ndarray]):
+        """ Adds the given pose to the accepted poses.
+
+        :param cam2world_matrix: The world matrix which describes the camera pose.
+        """
+        rotations, translations = PoseNoveltyTracker._split_poses([cam2world_matrix])
+        self._rotation_stats.add(rotations[0])
+        self._translation_stats.add(translations[0])
+        self._num_poses += 1
+
+    def is_novel(self, cam2world_matrix: Union[Matrix, np.ndarray]) -> bool:
+        """ Checks if the given pose is novel with respect to all added poses.
+
+        :param cam2world_matrix: The world matrix which describes the camera pose to check.
+        :return: True, if the given pose is novel.
+        """
+        return bool(self.are_novel([cam2world_matrix])[0])
+
+    def are_novel(self, cam2world_matrices: Union[List[Union[Matrix, np.ndarray]], np.ndarray]) -> np.ndarray:
+        """ Checks for each of the given poses if it is novel with respect to all added poses.
+
+        Every pose is checked on its own, the given poses are not compared with each other.
+
+        :param cam2world_matrices: The world matrices which describe the camera poses to check.
+        :return: A boolean array which is True for every novel pose.
+        """
+        novel = np.ones(len(cam2world_matrices), dtype=bool)
+        if self._num_poses == 0:  # First pose is always novel
+            return novel
+
+        rotations, translations = PoseNoveltyTracker._split_poses(cam2world_matrices)
+        if self.check_pose_novelty_rot:
+            novel &= PoseNoveltyTracker._raises_variance(self._rotation_stats, rotations, self.min_var_diff_rot)
+        if self.check_pose_novelty_translation:
+            novel &= PoseNoveltyTracker._raises_variance(self._translation_stats, translations,
+                                                         self.min_var_diff_translation)
+        return novel
+
+    @staticmethod
+    def _split_poses(cam2world_matrices: Union[List[Union[Matrix, np.ndarray]], np.ndarray]) \
+            -> Tuple[np.ndarray, np.ndarray]:
+        """ Splits the given poses into euler angles and translations.
+
+        :param cam2world_matrices: The world matrices which describe the camera poses.
+        :return: The euler angles and the translations, both with shape [N, 3].
+        """
+        rotations = np.array([list(Matrix(pose).to_euler()) for pose in cam2world_matrices]).reshape(-1, 3)
+        translations = np.array([np.array(pose)[:3, 3] for pose in cam2world_matrices]).reshape(-1, 3)
+        return rotations, translations
+
+    @staticmethod
+    def _raises_variance(stats: "_RunningVariance", values: np.ndarray, diff_threshold: float) -> np.ndarray:
+        """ Checks for each row of values if adding it raises the variance sufficiently.
+
+        :param stats: The running variance of all added values.
+        :param values: The values to check with shape [N, K].
+        :param diff_threshold: The minimum increase of the variance in percentage, -1 to only check for an increase.
+        :return: A boolean array with shape [N].
+        """
+        old_var = stats.variance()
+        new_var = stats.variance_with(values)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            diff = (new_var - old_var) / old_var * 100.0
+        # Check if the variance increased sufficiently
+        return (new_var >= old_var) & ~(diff < diff_threshold)
+
+
+class _RunningVariance:
+    """ Running mean and variance over all scalars added so far, updated via Welford's algorithm. """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, values: np.ndarray):
+        """ Adds the given values.
+
+        :param values: The values to add.
+        """
+        count, mean, m2 = self._merge(np.reshape(values, (1, -1)))
+        self.count, self.mean, self.m2 = count, float(mean[0]), float(m2[0])
+
+    def variance(self) -> float:
+        """ Returns the variance of all added values.
+
+        :return: The variance.
+        """
+        return self.m2 / self.count if self.count > 0 else 0.0
+
+    def variance_with(self, values: np.ndarray) -> np.ndarray:
+        """ Computes the variance for each row of values, if only this row would be added.
+
+        :param values: The values with shape [N, K].
+        :return: The variances with shape [N].
+        """
+        count, _, m2 = self._merge(values)
+        return m2 / count
+
+    def _merge(self, values: np.ndarray) -> Tuple[int, np.ndarray, np.ndarray]:
+        """ Merges the statistics of each row of values with the current statistics.
+
+        :param values: The values with shape [N, K].
+        :return: The merged count, and the merged means and sums of squared differences, both with shape [N].
+        """
+        values = np.asarray(values, dtype=np.float64)
+        other_count = values.shape[1]
+        other_mean = values.mean(axis=1)
+        other_m2 = np.square(values - other_mean[:, None]).sum(axis=1)
+        count = self.count + other_count
+        delta = other_mean - self.mean
+        mean = self.mean + delta * other_count / count
+        m2 = self.m2 + other_m2 + np.square(delta) * self.count * other_count / count
+        return count, mean, m2
@@ -9,12 +9,13 @@
 """
 
 import os
-from typing import Union, List, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, List, Tuple, Optional, Dict, Any
 
 import numpy as np
 import yaml
 import bpy
-from scipy.ndimage import map_coordinates
+import cv2
 
 from blenderproc.python.utility.GlobalStorage import GlobalStorage
 from blenderproc.python.camera import CameraUtility
@@ -196,6 +197,8 @@ def set_lens_distortion(k1: float, k2: float, k3: float = 0.0, p1: float = 0.0,
     if use_global_storage:
         GlobalStorage.set("_lens_distortion_is_used", {"mapping_coords": mapping_coords,
                                                     "original_image_res": original_image_resolution})
+    # The remap tables only depend on the mapping, so they are computed once here and reused for all images
+    _LensDistortionUtility.get_remap_tables(mapping_coords, original_image_resolution)
     return mapping_coords
 
 
@@ -203,7 +206,8 @@ def apply_lens_distortion(image: Union[List[np.ndarray], np.ndarray],
                           mapping_coords: Optional[np.ndarray] = None,
                           orig_res_x: Optional[int] = None,
                           orig_res_y: Optional[int] = None,
-                          use_interpolation: bool = True) -> Union[List[np.ndarray], np.ndarray]:
+                          use_interpolation: bool = True,
+                          num_threads: int = 0) -> Union[List[np.ndarray], np.ndarray]:
     """
     This functions applies the lens distortion mapping that needs to be precalculated by
     `bproc.camera.set_lens_distortion()`.
@@ -215,8 +219,10 @@ def apply_lens_distortion(image: Union[List[np.ndarray], np.ndarray],
     :param mapping_coords: an array of pixel mappings from undistorted to distorted image
     :param orig_res_x: original and output width resolution of the image
     :param orig_res_y: original and output height resolution of the image
-    :param use_interpolation: if this is True, for each pixel an interpolation will be performed, if this is false
-                              the nearest pixel will be used
+    :param use_interpolation: if this is True, for each pixel a bicubic interpolation will be performed, if this is
+                              false the nearest pixel will be used
+    :param num_threads: The number of threads used to distort a list of images in parallel. If 0 is given, the
+                        images are distorted one after another.
     :return: a list of images or an image that have been distorted, now in the desired (original) resolution
     """
 
@@ -233,7 +239,9 @@ def apply_lens_distortion(image: Union[List[np.ndarray], np.ndarray],
                             "'orig_res_x' + 'orig_res_x' to bproc.postprocessing.apply_lens_distortion(...). "
                             "Previously this could also have been done via the CameraInterface module, "
                             "see the example on lens_distortion.")
-    interpolation_order = 2 if use_interpolation else 0
+    remap_tables = _LensDistortionUtility.get_remap_tables(mapping_coords, (orig_res_y, orig_res_x))
+    map1, map2 = remap_tables["interpolated" if use_interpolation else "nearest"]
+    interpolation = cv2.INTER_CUBIC if use_interpolation else cv2.INTER_NEAREST
 
     def _internal_apply(input_image: np.ndarray) -> np.ndarray:
         """
@@ -241,35 +249,29 @@ def _internal_apply(input_image: np.ndarray) -> np.ndarray:
         :param input_image: input image, which will be distorted
         :return: distorted input image
         """
-        amount_of_output_channels = 1
-        if len(input_image.shape) == 3:
-            amount_of_output_channels = input_image.shape[2]
-        image_distorted = np.zeros((orig_res_y, orig_res_x, amount_of_output_channels))
-        used_dtpye = input_image.dtype
-        data = input_image.astype(np.float32)
-        # Forward mapping in order to distort the undistorted image coordinates
-        # and reshape the arrays into the image shape grid.
+        used_dtype = input_image.dtype
+        data = input_image
+        # opencv can only remap these types directly, all others are interpolated in float32
+        if used_dtype not in [np.uint8, np.uint16, np.int16, np.float32]:
+            data = data.astype(np.float32)
+        # Forward mapping in order to distort the undistorted image coordinates.
         # The reference frame for coords is as in DLR CalDe etc. (the upper-left pixel center is at [0,0])
-        for i in range(image_distorted.shape[2]):
-            if len(input_image.shape) == 3:
-                image_distorted[:, :, i] = np.reshape(map_coordinates(data[:, :, i], mapping_coords,
-                                                                      order=interpolation_order,
-                                                                      mode='nearest'), image_distorted[:, :, i].shape)
-            else:
-                image_distorted[:, :, i] = np.reshape(map_coordinates(data, mapping_coords, order=interpolation_order,
-                                                                      mode='nearest'),
-                                                      image_distorted[:, :, i].shape)
-        # Other options are:
-        # - map_coordinates() in all channels at the same time (turns out to be slower)
-        # - use torch.nn.functional.grid_sample() instead to do it on the GPU (even in batches)
-
-        if used_dtpye == np.uint8:
-            image_distorted = np.clip(image_distorted, 0, 255)
-        data = image_distorted.astype(used_dtpye)
-        if len(input_image.shape) == 2:
-            return data[:, :, 0]
-        return data
+        if len(data.shape) == 3:
+            # opencv remaps at most four channels at once, the results are clipped to the range of the dtype
+            image_distorted = np.empty((orig_res_y, orig_res_x, data.shape[2]), dtype=data.dtype)
+            for i in range(0, data.shape[2], 4):
+                channels = np.ascontiguousarray(data[:, :, i:i + 4])
+                image_distorted[:, :, i:i + 4] = cv2.remap(channels, map1, map2, interpolation,
+                                                           borderMode=cv2.BORDER_REPLICATE).reshape(
+                    orig_res_y, orig_res_x, channels.shape[2])
+        else:
+            image_distorted = cv2.remap(data, map1, map2, interpolation, borderMode=cv2.BORDER_REPLICATE)
+        return image_distorted.astype(used_dtype, copy=False)
+
     if isinstance(image, list):
+        if num_threads > 0:
+            with ThreadPoolExecutor(max_workers=num_threads) as executor:
+                return list(executor.map(_internal_apply, image))
         return [_internal_apply(img) for img in image]
     if isinstance(image, np.ndarray):
         return _internal_apply(image)
@@ -373,3 +375,36 @@ def _is_number(value: str) -> bool:
         cam2world = change_source_coordinate_frame_of_transformation_matrix(cam2world, ["X", "-Y", "-Z"])
         CameraUtility.add_camera_pose(cam2world)
     return extracted_camera_parameters["width"], extracted_camera_parameters["height"], mapping_coords
+
+
+class _LensDistortionUtility:
+
+    @staticmethod
+    def get_remap_tables(mapping_coords: np.ndarray, original_image_res: Tuple[int, int]) -> Dict[str, Any]:
+        """ Returns the fixed-point remap tables of opencv for the given mapping.
+
+        The tables are cached in the GlobalStorage, so they are only computed once per mapping.
+
+        :param mapping_coords: The array of pixel mappings from undistorted to distorted image.
+        :param original_image_res: The original (output) resolution of the images as (height, width).
+        :return: A dict containing the remap tables for the interpolated ("interpolated") and the nearest pixel
+                 ("nearest") mapping.
+        """
+        original_image_res = tuple(original_image_res)
+        if GlobalStorage.is_in_storage("_lens_distortion_remap_tables"):
+            remap_tables = GlobalStorage.get("_lens_distortion_remap_tables")
+            if remap_tables["mapping_coords"] is mapping_coords \
+                    and remap_tables["original_image_res"] == original_image_res:
+                return remap_tables
+
+        map_y = mapping_coords[0].reshape(original_image_res).astype(np.float32)
+        map_x = mapping_coords[1].reshape(original_image_res).astype(np.float32)
+        remap_tables = {
+            "mapping_coords": mapping_coords,
+            "original_image_res": original_image_res,
+            # integer pixel positions plus the fractions used for the interpolation weights
+            "interpolated": cv2.convertMaps(map_x, map_y, cv2.CV_16SC2),
+            "nearest": cv2.convertMaps(map_x, map_y, cv2.CV_16SC2, nninterpolation=True)
+        }
+        GlobalStorage.set("_lens_distortion_remap_tables", remap_tables)
+        return remap_tables
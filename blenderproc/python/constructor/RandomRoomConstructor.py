@@ -5,7 +5,7 @@
 
 import warnings
 import math
-from typing import Tuple, List, Dict
+from typing import Tuple, List, Optional
 import random
 
 import bpy
@@ -14,7 +14,7 @@
 import numpy as np
 
 from blenderproc.python.types.MaterialUtility import Material
-from blenderproc.python.utility.CollisionUtility import CollisionUtility
+from blenderproc.python.utility.CollisionUtility import CollisionUtility, BroadPhaseIndex, BVHCache
 from blenderproc.python.types.EntityUtility import delete_multiple
 from blenderproc.python.types.MeshObjectUtility import MeshObject, create_primitive
 from blenderproc.python.object.FaceSlicer import FaceSlicer
@@ -49,7 +49,7 @@ def construct_random_room(used_floor_area: float, interior_objects: List[MeshObj
     # internally the first basic rectangular is counted as one
     amount_of_extrusions += 1
 
-    bvh_cache_for_intersection: Dict[str, mathutils.bvhtree.BVHTree] = {}
+    bvh_cache_for_intersection = BVHCache()
     placed_objects = []
 
     # construct a random room
@@ -60,6 +60,8 @@ def construct_random_room(used_floor_area: float, interior_objects: List[MeshObj
     placed_objects.append(wall_obj)
     if ceiling_obj is not None:
         placed_objects.append(ceiling_obj)
+    # bounding boxes of all placed objects, so they are not recomputed in every try
+    broad_phase = BroadPhaseIndex(placed_objects)
 
     # assign materials to all existing objects
     _assign_materials_to_floor_wall_ceiling(floor_obj, wall_obj, ceiling_obj,
@@ -117,9 +119,10 @@ def construct_random_room(used_floor_area: float, interior_objects: List[MeshObj
                     for _ in range(placement_tries_per_face):
                         found_spot = _sample_new_object_poses_on_face(current_obj, face_bb,
                                                                      bvh_cache_for_intersection,
-                                                                     placed_objects, wall_obj)
+                                                                     placed_objects, wall_obj, broad_phase)
                         if found_spot:
                             placed_objects.append(current_obj)
+                            broad_phase.update(current_obj)
                             current_obj = current_obj.duplicate()
                             is_duplicated = True
                             break
@@ -131,9 +134,10 @@ def construct_random_room(used_floor_area: float, interior_objects: List[MeshObj
                     for _ in range(placement_tries_per_face):
                         found_spot = _sample_new_object_poses_on_face(current_obj, face_bb,
                                                                      bvh_cache_for_intersection,
-                                                                     placed_objects, wall_obj)
+                                                                     placed_objects, wall_obj, broad_phase)
                         if found_spot:
                             placed_objects.append(current_obj)
+                            broad_phase.update(current_obj)
                             current_obj = current_obj.duplicate()
                             is_duplicated = True
                             break
@@ -142,9 +146,6 @@ def construct_random_room(used_floor_area: float, interior_objects: List[MeshObj
             current_i = (current_i + 1) % len(list_of_face_sizes)
             total_acc_size += face_size
 
-        # remove current obj from the bvh cache
-        if current_obj.get_name() in bvh_cache_for_intersection:
-            del bvh_cache_for_intersection[current_obj.get_name()]
         # if there was no collision save the object in the placed list
         if is_duplicated:
             # delete the duplicated object
@@ -503,12 +504,14 @@ def _assign_materials_to_floor_wall_ceiling(floor_obj: MeshObject, wall_obj: Mes
                       "No materials have been assigned to the walls, floors and possible ceiling.")
 
 
-def _sample_new_object_poses_on_face(current_obj: MeshObject, face_bb, bvh_cache_for_intersection: dict,
-                                     placed_objects: List[MeshObject], wall_obj: MeshObject):
+def _sample_new_object_poses_on_face(current_obj: MeshObject, face_bb, bvh_cache_for_intersection: BVHCache,
+                                     placed_objects: List[MeshObject], wall_obj: MeshObject,
+                                     broad_phase: Optional[BroadPhaseIndex] = None):
     """
     Sample new object poses on the current `floor_obj`.
 
     :param face_bb:
+    :param broad_phase: The index containing the bounding boxes of the placed objects.
     :return: True, if there is no collision
     """
     random_placed_value = [random.uniform(face_bb[0][i], face_bb[1][i]) for i in range(2)]
@@ -519,13 +522,10 @@ def _sample_new_object_poses_on_face(current_obj: MeshObject, face_bb, bvh_cache
     current_obj.set_location(random_placed_value)
     current_obj.set_rotation_euler(random_placed_rotation)
 
-    # Remove bvh cache, as object has changed
-    if current_obj.get_name() in bvh_cache_for_intersection:
-        del bvh_cache_for_intersection[current_obj.get_name()]
-
     # perform check if object can be placed there
     no_collision = CollisionUtility.check_intersections(current_obj,
                                                         bvh_cache=bvh_cache_for_intersection,
                                                         objects_to_check_against=placed_objects,
-                                                        list_of_objects_with_no_inside_check=[wall_obj])
+                                                        list_of_objects_with_no_inside_check=[wall_obj],
+                                                        broad_phase=broad_phase)
     return no_collision
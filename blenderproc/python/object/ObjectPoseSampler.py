@@ -2,9 +2,7 @@
 
 from typing import Callable, List, Dict, Tuple
 
-import mathutils
-
-from blenderproc.python.utility.CollisionUtility import CollisionUtility
+from blenderproc.python.utility.CollisionUtility import CollisionUtility, BroadPhaseIndex, BVHCache
 from blenderproc.python.types.EntityUtility import Entity
 from blenderproc.python.types.MeshObjectUtility import MeshObject, get_all_mesh_objects
 
@@ -47,7 +45,9 @@ def sample_poses(objects_to_sample: List[MeshObject], sample_pose_func: Callable
         raise RuntimeError("The list of objects_to_sample can not be empty!")
 
     # cache to fasten collision detection
-    bvh_cache: Dict[str, mathutils.bvhtree.BVHTree] = {}
+    bvh_cache = BVHCache()
+    # bounding boxes of all objects to check against, so they are not recomputed in every try
+    broad_phase = BroadPhaseIndex(cur_objects_to_check_collisions)
 
     sample_results: Dict[Entity, Tuple[int, bool]] = {}
 
@@ -69,11 +69,8 @@ def sample_poses(objects_to_sample: List[MeshObject], sample_pose_func: Callable
             # Put the top object in queue at the sampled point in space
             sample_pose_func(obj)
 
-            # Remove bvh cache, as object has changed
-            if obj.get_name() in bvh_cache:
-                del bvh_cache[obj.get_name()]
-
-            no_collision = CollisionUtility.check_intersections(obj, bvh_cache, cur_objects_to_check_collisions, [])
+            no_collision = CollisionUtility.check_intersections(obj, bvh_cache, cur_objects_to_check_collisions, [],
+                                                                broad_phase)
 
             # If no collision then keep the position
             if no_collision:
@@ -93,6 +90,8 @@ def sample_poses(objects_to_sample: List[MeshObject], sample_pose_func: Callable
                 obj.set_location(initial_location)
                 obj.set_rotation_euler(initial_rotation)
 
+        broad_phase.update(obj)
+
         sample_results[obj] = (amount_of_tries_done, no_collision)
 
     return sample_results
@@ -1,5 +1,8 @@
 """Run the physics simulation for the objects in the scene."""
 
+import time
+from typing import List, Dict, Tuple, Optional, Any
+
 import bpy
 import mathutils
 import numpy as np
@@ -13,7 +16,9 @@ def simulate_physics_and_fix_final_poses(min_simulation_time: float = 4.0, max_s
                                          check_object_interval: float = 2.0,
                                          object_stopped_location_threshold: float = 0.01,
                                          object_stopped_rotation_threshold: float = 0.1, substeps_per_frame: int = 10,
-                                         solver_iters: int = 10, verbose: bool = False, use_volume_com: bool = False):
+                                         solver_iters: int = 10, verbose: bool = False, use_volume_com: bool = False,
+                                         step_incrementally: bool = False,
+                                         freeze_stopped_objects_after: Optional[float] = None) -> List[Dict[str, Any]]:
     """ Simulates the current scene and in the end fixes the final poses of all active objects.
 
     The simulation is run for at least `min_simulation_time` seconds and at a maximum `max_simulation_time` seconds.
@@ -38,14 +43,30 @@ def simulate_physics_and_fix_final_poses(min_simulation_time: float = 4.0, max_s
     :param verbose: If True, more details during the physics simulation are printed.
     :param use_volume_com: If True, the center of mass will be calculated by using the object volume.
                            This is more accurate than using the surface area (default), but requires a watertight mesh.
+    :param step_incrementally: If True, the simulation is advanced frame by frame instead of baking it again for
+                               every interval, see `simulate_physics`.
+    :param freeze_stopped_objects_after: If given, every object whose location and rotation have changed less than
+                                         the stopped thresholds for this many seconds is frozen at its current pose.
+                                         Frozen objects still collide with the others, but are no longer simulated.
+                                         This is checked every `check_object_interval` seconds and requires
+                                         `step_incrementally`, which is then turned on automatically.
+    :return: A report with one entry per simulated interval, containing the simulated `time` in seconds, the
+             `frame`, the number of `active_objects` and the wall clock `duration` of the interval in seconds.
+             With `freeze_stopped_objects_after`, every entry also contains the number of `frozen_objects` so far
+             and the names of the objects frozen in this interval as `newly_frozen_objects`.
     """
+    # Freezing objects during the simulation requires advancing it incrementally
+    step_incrementally = step_incrementally or freeze_stopped_objects_after is not None
+
     # Undo changes made in the simulation like origin adjustment and persisting the object's scale
     with UndoAfterExecution():
         # Run simulation and remember poses before and after
         obj_poses_before_sim = _PhysicsSimulation.get_pose()
-        origin_shifts = simulate_physics(min_simulation_time, max_simulation_time, check_object_interval,
-                                         object_stopped_location_threshold, object_stopped_rotation_threshold,
-                                         substeps_per_frame, solver_iters, verbose, use_volume_com)
+        origin_shifts, report = _PhysicsSimulation.simulate(min_simulation_time, max_simulation_time,
+                                                            check_object_interval, object_stopped_location_threshold,
+                                                            object_stopped_rotation_threshold, substeps_per_frame,
+                                                            solver_iters, verbose, use_volume_com, step_incrementally,
+                                                            freeze_stopped_objects_after)
         obj_poses_after_sim = _PhysicsSimulation.get_pose()
 
         # Make sure to remove the simulation cache as we are only interested in the final poses
@@ -74,12 +95,14 @@ def simulate_physics_and_fix_final_poses(min_simulation_time: float = 4.0, max_s
     # Deactivate the simulation so it does not influence object positions
     bpy.context.scene.rigidbody_world.enabled = False
     bpy.context.view_layer.update()
+    return report
 
 
 def simulate_physics(min_simulation_time: float = 4.0, max_simulation_time: float = 40.0,
                      check_object_interval: float = 2.0, object_stopped_location_threshold: float = 0.01,
                      object_stopped_rotation_threshold: float = 0.1, substeps_per_frame: int = 10,
-                     solver_iters: int = 10, verbose: bool = False, use_volume_com: bool = False) -> dict:
+                     solver_iters: int = 10, verbose: bool = False, use_volume_com: bool = False,
+                     step_incrementally: bool = False) -> dict:
     """ Simulates the current scene.
 
     The simulation is run for at least `min_simulation_time` seconds and at a maximum `max_simulation_time` seconds.
@@ -105,33 +128,60 @@ def simulate_physics(min_simulation_time: float = 4.0, max_simulation_time: floa
     :param verbose: If True, more details during the physics simulation are printed.
     :param use_volume_com: If True, the center of mass will be calculated by using the object volume.
                            This is more accurate than using the surface area (default), but requires a watertight mesh.
+    :param step_incrementally: If True, the simulation is advanced frame by frame from one interval to the next,
+                               instead of baking the point cache again for every interval. Only the poses of the
+                               active objects are read to check whether they have stopped moving. The time spent on
+                               every interval is printed.
     :return: A dict containing for every active object the shift that was added to their origins.
     """
-    # Shift the origin of all objects to their center of mass to make the simulation more realistic
-    origin_shift = {}
-    for obj in get_all_mesh_objects():
-        if obj.has_rigidbody_enabled():
-            prev_origin = obj.get_origin()
-            new_origin = obj.set_origin(mode="ORIGIN_CENTER_OF_VOLUME" if use_volume_com else "CENTER_OF_MASS")
-            origin_shift[obj.get_name()] = new_origin - prev_origin
-
-            # Persist mesh scaling as having a scale != 1 can make the simulation unstable
-            obj.persist_transformation_into_mesh(location=False, rotation=False, scale=True)
-
-    # Configure simulator
-    bpy.context.scene.rigidbody_world.substeps_per_frame = substeps_per_frame
-    bpy.context.scene.rigidbody_world.solver_iterations = solver_iters
-
-    # Perform simulation
-    _PhysicsSimulation.do_simulation(min_simulation_time, max_simulation_time, check_object_interval,
-                                     object_stopped_location_threshold, object_stopped_rotation_threshold,
-                                     verbose)
-
+    origin_shift, _ = _PhysicsSimulation.simulate(min_simulation_time, max_simulation_time, check_object_interval,
+                                                  object_stopped_location_threshold, object_stopped_rotation_threshold,
+                                                  substeps_per_frame, solver_iters, verbose, use_volume_com,
+                                                  step_incrementally)
     return origin_shift
 
 
 class _PhysicsSimulation:
 
+    @staticmethod
+    def simulate(min_simulation_time: float, max_simulation_time: float, check_object_interval: float,
+                 object_stopped_location_threshold: float, object_stopped_rotation_threshold: float,
+                 substeps_per_frame: int, solver_iters: int, verbose: bool, use_volume_com: bool,
+                 step_incrementally: bool, freeze_stopped_objects_after: Optional[float] = None) \
+            -> Tuple[dict, List[Dict[str, Any]]]:
+        """ Simulates the current scene, see `simulate_physics_and_fix_final_poses` for the parameters.
+
+        :return: A dict containing for every active object the shift that was added to their origins and a report
+                 with one entry per simulated interval.
+        """
+        # Shift the origin of all objects to their center of mass to make the simulation more realistic
+        origin_shift = {}
+        for obj in get_all_mesh_objects():
+            if obj.has_rigidbody_enabled():
+                prev_origin = obj.get_origin()
+                new_origin = obj.set_origin(mode="ORIGIN_CENTER_OF_VOLUME" if use_volume_com else "CENTER_OF_MASS")
+                origin_shift[obj.get_name()] = new_origin - prev_origin
+
+                # Persist mesh scaling as having a scale != 1 can make the simulation unstable
+                obj.persist_transformation_into_mesh(location=False, rotation=False, scale=True)
+
+        # Configure simulator
+        bpy.context.scene.rigidbody_world.substeps_per_frame = substeps_per_frame
+        bpy.context.scene.rigidbody_world.solver_iterations = solver_iters
+
+        # Perform simulation
+        if step_incrementally:
+            report = _PhysicsSimulation.step_simulation(min_simulation_time, max_simulation_time,
+                                                        check_object_interval, object_stopped_location_threshold,
+                                                        object_stopped_rotation_threshold, verbose,
+                                                        freeze_stopped_objects_after)
+        else:
+            report = _PhysicsSimulation.do_simulation(min_simulation_time, max_simulation_time, check_object_interval,
+                                                      object_stopped_location_threshold,
+                                                      object_stopped_rotation_threshold, verbose)
+
+        return origin_shift, report
+
     @staticmethod
     def seconds_to_frames(seconds: float) -> int:
         """ Converts the given number of seconds into the corresponding number of blender animation frames.
@@ -153,7 +203,7 @@ def frames_to_seconds(frames: int) -> float:
     @staticmethod
     def do_simulation(min_simulation_time: float, max_simulation_time: float, check_object_interval: float,
                       object_stopped_location_threshold: float, object_stopped_rotation_threshold: float,
-                      verbose: bool = False):
+                      verbose: bool = False) -> List[Dict[str, Any]]:
         """ Perform the simulation.
 
         This method bakes the simulation for the configured number of iterations and returns all object positions
@@ -170,6 +220,7 @@ def do_simulation(min_simulation_time: float, max_simulation_time: float, check_
                                                   Euler vector that is allowed such that an object is still recognized
                                                   as 'stopped moving'.
         :param verbose: If True, more details during the physics simulation are printed.
+        :return: A report with one entry per simulated interval.
         """
         # Make sure the RigidBody world is active
         bpy.context.scene.rigidbody_world.enabled = True
@@ -181,8 +232,10 @@ def do_simulation(min_simulation_time: float, max_simulation_time: float, check_
         if min_simulation_time >= max_simulation_time:
             raise Exception("max_simulation_iterations has to be bigger than min_simulation_iterations")
 
+        report = []
         # Run simulation starting from min to max in the configured steps
         for current_time in np.arange(min_simulation_time, max_simulation_time, check_object_interval):
+            interval_start = time.time()
             current_frame = _PhysicsSimulation.seconds_to_frames(current_time)
             print("Running simulation up to " + str(current_time) + " seconds (" + str(current_frame) + " frames)")
 
@@ -199,6 +252,8 @@ def do_simulation(min_simulation_time: float, max_simulation_time: float, check_
             # Go to last frame of simulation and get poses
             bpy.context.scene.frame_set(current_frame)
             new_poses = _PhysicsSimulation.get_pose()
+            report.append({"time": float(current_time), "frame": current_frame, "active_objects": len(new_poses),
+                           "duration": time.time() - interval_start})
 
             # If objects have stopped moving between the last two frames, then stop here
             if _PhysicsSimulation.have_objects_stopped_moving(old_poses, new_poses, object_stopped_location_threshold,
@@ -213,6 +268,162 @@ def do_simulation(min_simulation_time: float, max_simulation_time: float, check_
                 # reuse the already calculated frames)
                 with bpy.context.temp_override(point_cache=point_cache):
                     bpy.ops.ptcache.free_bake()
+        return report
+
+    @staticmethod
+    def step_simulation(min_simulation_time: float, max_simulation_time: float, check_object_interval: float,
+                        object_stopped_location_threshold: float, object_stopped_rotation_threshold: float,
+                        verbose: bool = False,
+                        freeze_stopped_objects_after: Optional[float] = None) -> List[Dict[str, Any]]:
+        """ Perform the simulation by advancing it frame by frame.
+
+        In contrast to `do_simulation`, the point cache is not baked again for every interval, instead the simulation
+        continues from the last frame of the previous interval. Only the poses of the active objects are read to
+        check if they have stopped moving.
+
+        Optionally, objects which have stopped moving are frozen, so the simulation gets cheaper as the scene settles.
+
+        :param min_simulation_time: The minimum number of seconds to simulate.
+        :param max_simulation_time: The maximum number of seconds to simulate.
+        :param check_object_interval: The interval in seconds at which all objects should be checked if they are still
+                                      moving. If all objects have stopped moving, then the simulation will be stopped.
+        :param object_stopped_location_threshold: The maximum difference per second and per coordinate in the rotation
+                                                  Euler vector that is allowed such that an object is still recognized
+                                                  as 'stopped moving'.
+        :param object_stopped_rotation_threshold: The maximum difference per second and per coordinate in the rotation
+                                                  Euler vector that is allowed such that an object is still recognized
+                                                  as 'stopped moving'.
+        :param verbose: If True, more details during the physics simulation are printed.
+        :param freeze_stopped_objects_after: If given, objects which have stopped moving for this many seconds are
+                                             frozen at their current pose.
+        :return: A report with one entry per simulated interval.
+        """
+        # Make sure the RigidBody world is active
+        bpy.context.scene.rigidbody_world.enabled = True
+
+        if min_simulation_time >= max_simulation_time:
+            raise Exception("max_simulation_iterations has to be bigger than min_simulation_iterations")
+
+        # Frames are only simulated within the range of the point cache
+        point_cache = bpy.context.scene.rigidbody_world.point_cache
+        point_cache.frame_start = 1
+        point_cache.frame_end = _PhysicsSimulation.seconds_to_frames(max_simulation_time)
+
+        active_objects = [obj for obj in get_all_blender_mesh_objects()
+                          if obj.rigid_body is not None and obj.rigid_body.type == 'ACTIVE']
+
+        # The time since which each active object has not moved anymore
+        stopped_since = np.full(len(active_objects), np.nan)
+        num_frozen_objects = 0
+
+        # Start at the first frame, which resets the simulation
+        last_frame = point_cache.frame_start
+        bpy.context.scene.frame_set(last_frame)
+
+        report = []
+        # Run simulation starting from min to max in the configured steps
+        for current_time in np.arange(min_simulation_time, max_simulation_time, check_object_interval):
+            interval_start = time.time()
+            current_frame = _PhysicsSimulation.seconds_to_frames(current_time)
+            check_frame = max(current_frame - _PhysicsSimulation.seconds_to_frames(1), point_cache.frame_start)
+
+            # Simulate current interval frame by frame and get the poses one second before its end
+            old_poses = None
+            with stdout_redirected(enabled=not verbose):
+                if check_frame <= last_frame:
+                    # The frame has already been simulated, read it from the cache and go back to continue from there
+                    bpy.context.scene.frame_set(check_frame)
+                    old_poses = _PhysicsSimulation.get_active_poses(active_objects)
+                    bpy.context.scene.frame_set(last_frame)
+                # Blender can only advance the simulation by one frame at a time
+                for frame in range(last_frame + 1, current_frame + 1):
+                    bpy.context.scene.frame_set(frame)
+                    if frame == check_frame:
+                        old_poses = _PhysicsSimulation.get_active_poses(active_objects)
+            new_poses = _PhysicsSimulation.get_active_poses(active_objects)
+            last_frame = current_frame
+
+            report.append({"time": float(current_time), "frame": current_frame, "active_objects": len(active_objects),
+                           "duration": time.time() - interval_start})
+            print(f"Simulated up to {current_time} seconds ({current_frame} frames) in {report[-1]['duration']:.2f}s")
+            objects_stopped_moving = _PhysicsSimulation.have_poses_stopped_moving(old_poses, new_poses,
+                                                                                  object_stopped_location_threshold,
+                                                                                  object_stopped_rotation_threshold)
+
+            if freeze_stopped_objects_after is not None:
+                # Here, movements in any direction count, not only the ones checked by have_poses_stopped_moving
+                pose_diff = np.abs(old_poses - new_poses)
+                stopped = np.all(pose_diff[:, :3] <= object_stopped_location_threshold, axis=1) & \
+                    np.all(pose_diff[:, 3:] <= object_stopped_rotation_threshold, axis=1)
+                # The poses are compared over the last second, so stopped objects rest at least since then
+                stopped_since = np.where(stopped, np.fmin(stopped_since, current_time - 1.0), np.nan)
+                freeze = stopped & (current_time - stopped_since >= freeze_stopped_objects_after)
+
+                newly_frozen_objects = [obj for obj, frozen in zip(active_objects, freeze) if frozen]
+                for obj in newly_frozen_objects:
+                    _PhysicsSimulation.freeze_object(obj)
+                active_objects = [obj for obj, frozen in zip(active_objects, freeze) if not frozen]
+                stopped_since = stopped_since[~freeze]
+
+                num_frozen_objects += len(newly_frozen_objects)
+                report[-1]["frozen_objects"] = num_frozen_objects
+                report[-1]["newly_frozen_objects"] = [obj.name for obj in newly_frozen_objects]
+                if newly_frozen_objects:
+                    print(f"Froze {len(newly_frozen_objects)} objects after {current_time} seconds, "
+                          f"{len(active_objects)} objects are still simulated")
+
+            # If objects have stopped moving between the last two checked frames, then stop here
+            if objects_stopped_moving or not active_objects:
+                print(f"Objects have stopped moving after {current_time} seconds ({current_frame} frames)")
+                break
+            if current_time + check_object_interval >= max_simulation_time:
+                print("Stopping simulation as configured max_simulation_time has been reached")
+        return report
+
+    @staticmethod
+    def freeze_object(obj: bpy.types.Object):
+        """ Fixes the given object at its current pose in the simulation.
+
+        The object is turned into a kinematic body, so it still collides with the other objects, but it is no longer
+        moved by the simulation. Its rigid body type stays ACTIVE.
+
+        :param obj: The object with ACTIVE rigid_body type.
+        """
+        # Kinematic bodies follow the object transformation, so persist the simulated pose into it
+        obj.matrix_world = obj.matrix_world.copy()
+        obj.rigid_body.kinematic = True
+
+    @staticmethod
+    def get_active_poses(active_objects: List[bpy.types.Object]) -> np.ndarray:
+        """ Returns position and rotation values of the given objects.
+
+        :param active_objects: The objects with ACTIVE rigid_body type.
+        :return: An array of shape [N, 6], containing the location and the euler rotation of every object.
+        """
+        return np.array([list(obj.matrix_world.translation) + list(obj.matrix_world.to_euler())
+                         for obj in active_objects]).reshape(-1, 6)
+
+    @staticmethod
+    def have_poses_stopped_moving(last_poses: np.ndarray, new_poses: np.ndarray,
+                                  object_stopped_location_threshold: float,
+                                  object_stopped_rotation_threshold: float) -> bool:
+        """ Check if the difference between the two given poses per object is smaller than the configured threshold.
+
+        This is the same check as in `have_objects_stopped_moving` for poses returned by `get_active_poses`.
+
+        :param last_poses: The poses with shape [N, 6].
+        :param new_poses: The poses with shape [N, 6].
+        :param object_stopped_location_threshold: The maximum difference per second and per coordinate in the rotation
+                                                  Euler vector that is allowed such that an object is still recognized
+                                                  as 'stopped moving'.
+        :param object_stopped_rotation_threshold: The maximum difference per second and per coordinate in the rotation
+                                                  Euler vector that is allowed such that an object is still recognized
+                                                  as 'stopped moving'.
+        :return: True, if no objects are moving anymore.
+        """
+        pose_diff = last_poses - new_poses
+        return not np.any(pose_diff[:, :3] > object_stopped_location_threshold) and \
+            not np.any(pose_diff[:, 3:] > object_stopped_rotation_threshold)
 
     @staticmethod
     def get_pose() -> dict:
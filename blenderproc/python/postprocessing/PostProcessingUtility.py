@@ -12,22 +12,27 @@
 from blenderproc.python.utility.BlenderUtility import get_all_blender_mesh_objects
 
 
-def dist2depth(dist: Union[List[np.ndarray], np.ndarray], points_2d: Optional[np.ndarray] = None) -> Union[List[np.ndarray], np.ndarray]:
+def dist2depth(dist: Union[List[np.ndarray], np.ndarray], points_2d: Optional[np.ndarray] = None,
+               K: Optional[np.ndarray] = None) -> Union[List[np.ndarray], np.ndarray]:
     """
     Maps a distance image to depth image, also works with a list of images or a 1-dim array of dist values.
 
     :param dist: The distance data.
     :param points_2d: Can be used to specify the 2D points corresponding to the given distance values:
                       Is necessary, if the given distance data is not a full distance image.
+    :param K: The camera intrinsics the distance data has been rendered with. If None, the intrinsics of the
+              current camera are used.
     :return: The depth data
     """
 
     dist = trim_redundant_channels(dist)
 
+    if K is None:
+        K = CameraUtility.get_intrinsics_as_K_matrix()
+
     if isinstance(dist, list) or hasattr(dist, "shape") and len(dist.shape) > 2:
-        return [dist2depth(img) for img in dist]
+        return [dist2depth(img, K=K) for img in dist]
 
-    K = CameraUtility.get_intrinsics_as_K_matrix()
     f, cx, cy = K[0, 0], K[0, 2], K[1, 2]
 
     if points_2d is None:
@@ -46,20 +51,25 @@ def dist2depth(dist: Union[List[np.ndarray], np.ndarray], points_2d: Optional[np
     return depth
 
 
-def depth2dist(depth: Union[List[np.ndarray], np.ndarray]) -> Union[List[np.ndarray], np.ndarray]:
+def depth2dist(depth: Union[List[np.ndarray], np.ndarray],
+               K: Optional[np.ndarray] = None) -> Union[List[np.ndarray], np.ndarray]:
     """
     Maps a depth image to distance image, also works with a list of images.
 
     :param depth: The depth data.
+    :param K: The camera intrinsics the depth data has been rendered with. If None, the intrinsics of the current
+              camera are used.
     :return: The distance data
     """
 
     depth = trim_redundant_channels(depth)
 
+    if K is None:
+        K = CameraUtility.get_intrinsics_as_K_matrix()
+
     if isinstance(depth, list) or hasattr(depth, "shape") and len(depth.shape) > 2:
-        return [depth2dist(img) for img in depth]
+        return [depth2dist(img, K=K) for img in depth]
 
-    K = CameraUtility.get_intrinsics_as_K_matrix()
     f, cx, cy = K[0, 0], K[0, 2], K[1, 2]
 
     xs, ys = np.meshgrid(np.arange(depth.shape[1]), np.arange(depth.shape[0]))
@@ -91,31 +101,54 @@ def remove_segmap_noise(image: Union[list, np.ndarray]) -> Union[list, np.ndarra
         return [remove_segmap_noise(img) for img in image]
 
     noise_indices = _PostProcessingUtility.determine_noisy_pixels(image)
-
-    for index in noise_indices:
-        neighbors = _PostProcessingUtility.get_pixel_neighbors(image, index[0], index[
-            1])  # Extracting the indices surrounding 3x3 neighbors
-        curr_val = image[index[0]][index[1]][0]  # Current value of the noisy pixel
-
-        neighbor_vals = [image[neighbor[0]][neighbor[1]] for neighbor in
-                         neighbors]  # Getting the values of the neighbors
-        # Getting the unique values only
-        neighbor_vals = np.unique(np.array([np.array(index) for index in neighbor_vals]))
-
-        min_val = 10000000000
-        min_idx = 0
-
-        # Here we iterate through the unique values of the neighbor and find the one closest to the current noisy value
-        for idx, n in enumerate(neighbor_vals):
-            # Is this closer than the current closest value?
-            if n - curr_val <= min_val:
-                # If so, update
-                min_val = n - curr_val
-                min_idx = idx
-
-        # Now that we have found the closest value, assign it to the noisy value
-        new_val = neighbor_vals[min_idx]
-        image[index[0]][index[1]] = np.array([new_val, new_val, new_val])
+    if len(noise_indices) == 0:
+        return image
+
+    # Every noisy pixel gets the neighbor value (of its 3x3 neighborhood) with the smallest difference to the noisy
+    # value. Noisy pixels are processed in raster order, so a pixel sees the already denoised values of its upper and
+    # left neighbors, but the original values of its right and lower neighbors. All pixels on the same wavefront
+    # 2 * row + col do not depend on each other, so they are processed together. Noisy pixels without any noisy
+    # neighbor do not depend on the order at all and are all processed in the first batch.
+    rows, cols = image.shape[0], image.shape[1]
+    neighbor_offsets = np.array([[p, q] for p in range(-1, 2) for q in range(-1, 2) if not (p == 0 and q == 0)])
+    noisy_pixels, num_noisy_channels = np.unique(noise_indices[:, :2], axis=0, return_counts=True)
+    noisy_mask = np.zeros((rows + 2, cols + 2), dtype=bool)
+    noisy_mask[noisy_pixels[:, 0] + 1, noisy_pixels[:, 1] + 1] = True
+    has_noisy_neighbors = noisy_mask[noisy_pixels[:, :1] + 1 + neighbor_offsets[:, 0],
+                                     noisy_pixels[:, 1:] + 1 + neighbor_offsets[:, 1]].any(axis=1)
+    wavefronts = np.where(has_noisy_neighbors, 2 * noisy_pixels[:, 0] + noisy_pixels[:, 1], -1)
+    order = np.argsort(wavefronts, kind='stable')
+    noisy_pixels, num_noisy_channels = noisy_pixels[order], num_noisy_channels[order]
+    _, wavefront_starts = np.unique(wavefronts[order], return_index=True)
+
+    for wavefront_pixels, wavefront_num_noisy_channels in zip(np.split(noisy_pixels, wavefront_starts[1:]),
+                                                             np.split(num_noisy_channels, wavefront_starts[1:])):
+        neighbor_rows = wavefront_pixels[:, :1] + neighbor_offsets[:, 0]
+        neighbor_cols = wavefront_pixels[:, 1:] + neighbor_offsets[:, 1]
+        # Neighbors outside the image are ignored
+        valid_neighbors = (neighbor_rows >= 0) & (neighbor_rows < rows) & (neighbor_cols >= 0) & (neighbor_cols < cols)
+        neighbor_vals = image[np.clip(neighbor_rows, 0, rows - 1), np.clip(neighbor_cols, 0, cols - 1)]
+        neighbor_vals = neighbor_vals.reshape(len(wavefront_pixels), -1)
+        valid_neighbors = np.repeat(valid_neighbors, neighbor_vals.shape[1] // len(neighbor_offsets), axis=1)
+        smallest_vals = np.where(valid_neighbors, neighbor_vals.astype(np.float64), np.inf).argmin(axis=1)
+
+        # A pixel is denoised once per noisy channel, the neighbors do not change in between
+        for repetition in range(wavefront_num_noisy_channels.max()):
+            repeated = wavefront_num_noisy_channels > repetition
+            pixels, vals = wavefront_pixels[repeated], neighbor_vals[repeated]
+            # Current values of the noisy pixels
+            curr_vals = image[pixels[:, 0], pixels[:, 1], 0]
+            differences = (vals - curr_vals[:, None]).astype(np.float64)
+            differences[~valid_neighbors[repeated] | (differences > 10000000000)] = np.inf
+            # Among the values with the smallest difference, the largest one is used
+            closest = differences == differences.min(axis=1, keepdims=True)
+            closest_idx = np.where(closest, vals.astype(np.float64), -np.inf).argmax(axis=1)
+            # If no difference is small enough, the smallest neighbor value is used
+            closest_idx = np.where(np.isinf(differences.min(axis=1)), smallest_vals[repeated], closest_idx)
+            new_vals = vals[np.arange(len(pixels)), closest_idx]
+
+            # Now that we have found the closest value, assign it to the noisy value
+            image[pixels[:, 0], pixels[:, 1]] = new_vals[:, None]
 
     return image
 
@@ -286,9 +319,72 @@ def trim_redundant_channels(image: Union[list, np.ndarray]) -> Union[list, np.nd
     return image
 
 
+def snapshot_segmentation_attributes(map_by: Union[str, List[str]],
+                                     default_values: Optional[Dict[str, int]]) -> Dict[str, Any]:
+    """ Resolves the map_by attributes of all objects in the scene, s.t. images which contain the pass indices
+    defined in `enable_segmentation_output` can be mapped later on, even if the scene has changed in the meantime.
+
+    :param map_by: The keys which will be extracted from the objects, either a single key or a list of keys.
+    :param default_values: If an object does not provide a key a default key must be provided.
+    :return: The snapshot, which can be given to `segmentation_mapping`.
+    """
+    if not isinstance(map_by, list):
+        map_by = [map_by]
+    attributes = []
+    for map_by_attribute in map_by:
+        map_by_attribute = map_by_attribute.lower()
+        if map_by_attribute != "instance":
+            attributes.append("category_id" if map_by_attribute in ["class", "category_id"] else map_by_attribute)
+
+    # map object ids in the image to the used objects, the world background is always zero
+    object_ids_to_object = {obj.pass_index: obj for obj in get_all_blender_mesh_objects()}
+    object_ids_to_object[0] = bpy.context.scene.world
+
+    values: Dict[int, Dict[str, Any]] = {}
+    errors: Dict[int, Dict[str, Exception]] = {}
+    for object_id, current_obj in object_ids_to_object.items():
+        for current_attribute in attributes:
+            # if the current obj has an attribute with that name -> get it
+            if hasattr(current_obj, current_attribute):
+                value = getattr(current_obj, current_attribute)
+            # if the current object has a custom property with that name -> get it
+            elif current_attribute in current_obj:
+                value = current_obj[current_attribute]
+            elif current_attribute.startswith("cf_"):
+                if current_attribute == "cf_basename":
+                    value = current_obj.name
+                    if "." in value:
+                        value = value[:value.rfind(".")]
+                else:
+                    errors.setdefault(object_id, {})[current_attribute] = ValueError(
+                        f"The given attribute is a custom function: \"cf_\", but it is not defined here: "
+                        f"{current_attribute}")
+                    continue
+            elif default_values and current_attribute in default_values:
+                # if none of the above applies use the default value
+                value = default_values[current_attribute]
+            else:
+                # if the requested current_attribute is not a custom property or an attribute
+                # or there is a default value stored, the error is raised as soon as the object is visible
+                d_error = {current_attribute: None}
+                errors.setdefault(object_id, {})[current_attribute] = RuntimeError(
+                    f"The object \"{current_obj.name}\" does not have the attribute: \"{current_attribute}\". "
+                    f"Either set the attribute for every object or pass a default value to "
+                    f"bproc.renderer.enable_segmentation_output(default_values={d_error}).")
+                continue
+
+            # copy blender types, as they reference the data of the object
+            if isinstance(value, (mathutils.Vector, mathutils.Matrix)):
+                value = np.array(value)
+            values.setdefault(object_id, {})[current_attribute] = value
+
+    return {"is_stereo": bpy.context.scene.render.use_multiview, "values": values, "errors": errors}
+
+
 def segmentation_mapping(image: Union[List[np.ndarray], np.ndarray],
                          map_by: Union[str, List[str]],
-                         default_values: Optional[Dict[str, int]]) \
+                         default_values: Optional[Dict[str, int]],
+                         attribute_snapshot: Optional[Dict[str, Any]] = None) \
         -> Dict[str, Union[np.ndarray, List[np.ndarray], List[Dict[str, Any]]]]:
     """ Maps an image or a list of images to the desired segmentation images plus segmentation dictionary for keys,
     which can not be stored in an image (e.g. `name`).
@@ -297,11 +393,15 @@ def segmentation_mapping(image: Union[List[np.ndarray], np.ndarray],
                  `enable_segmentation_output`.
     :param map_by: The keys which will be extracted from the objects, either a single key or a list of keys.
     :param default_values: If an object does not provide a key a default key must be provided.
+    :param attribute_snapshot: The attributes of the objects, see `snapshot_segmentation_attributes`. If given, the
+                               scene is not accessed. If None, the attributes are taken from the current scene.
     :return: A dict mapping each key in map_by to an output list of images or a dictionary containing the information
     """
+    if attribute_snapshot is None:
+        attribute_snapshot = snapshot_segmentation_attributes(map_by, default_values)
 
     return_dict: Dict[str, Union[np.ndarray, List[np.ndarray], List[Dict[str, Any]]]] = {}
-    is_stereo_case = bpy.context.scene.render.use_multiview
+    is_stereo_case = attribute_snapshot["is_stereo"]
     # convert a single image to a list of stereo images
     if isinstance(image, list):
         if len(image) == 0:
@@ -333,13 +433,8 @@ def segmentation_mapping(image: Union[List[np.ndarray], np.ndarray],
         mapped_results_stereo_dict: Dict[str, List[np.ndarray]] = {}
         for stereo_image in frame_image:
 
-            # map object ids in the image to the used objects
+            # the object ids visible in the image
             object_ids = np.unique(stereo_image).astype(int)
-            object_ids_to_object = {}
-            for obj in get_all_blender_mesh_objects():
-                if obj.pass_index in object_ids:
-                    object_ids_to_object[obj.pass_index] = obj
-            object_ids_to_object[0] = bpy.context.scene.world
 
             for map_by_attribute in map_by:
 
@@ -357,55 +452,16 @@ def segmentation_mapping(image: Union[List[np.ndarray], np.ndarray],
                 if map_by_attribute == "instance":
                     mapped_results_stereo_dict.setdefault(f"{map_by_attribute}_segmaps", []).append(stereo_image)
                 else:
-                    # check if a default value was specified
-                    default_value_set = False
-                    default_value = None
-                    if default_values and current_attribute in default_values:
-                        default_value_set = True
-                        default_value = default_values[current_attribute]
-                    elif default_values and current_attribute in default_values:
-                        default_value_set = True
-                        default_value = default_values[current_attribute]
-
                     for object_id in object_ids:
-                        # get current object
-                        current_obj = object_ids_to_object[object_id]
-
-                        # if the current obj has an attribute with that name -> get it
-                        if hasattr(current_obj, current_attribute):
-                            value = getattr(current_obj, current_attribute)
-                        # if the current object has a custom property with that name -> get it
-                        elif current_attribute in current_obj:
-                            value = current_obj[current_attribute]
-                        elif current_attribute.startswith("cf_"):
-                            if current_attribute == "cf_basename":
-                                value = current_obj.name
-                                if "." in value:
-                                    value = value[:value.rfind(".")]
-                            else:
-                                raise ValueError(f"The given attribute is a custom function: \"cf_\", but it is not "
-                                                 f"defined here: {current_attribute}")
-                        elif default_value_set:
-                            # if none of the above applies use the default value
-                            value = default_value
-                        else:
-                            # if the requested current_attribute is not a custom property or an attribute
-                            # or there is a default value stored
-                            # it throws an exception
-                            d_error = {current_attribute: None}
-                            raise RuntimeError(f"The object \"{current_obj.name}\" does not have the "
-                                               f"attribute: \"{current_attribute}\". Either set the attribute for "
-                                               f"every object or pass a default value to "
-                                               f"bproc.renderer.enable_segmentation_output(default_values={d_error}).")
+                        if current_attribute in attribute_snapshot["errors"].get(object_id, {}):
+                            raise attribute_snapshot["errors"][object_id][current_attribute]
+                        value = attribute_snapshot["values"][object_id][current_attribute]
 
                         # save everything which is not instance also in the .csv
                         if isinstance(value, (int, float, np.integer, np.floating)):
                             resulting_map[stereo_image == object_id] = value
                             found_dtype = type(value)
 
-                        if isinstance(value, (mathutils.Vector, mathutils.Matrix)):
-                            value = np.array(value)
-
                         if object_id in non_image_attributes:
                             non_image_attributes[object_id][current_attribute] = value
                         else:
@@ -418,6 +474,7 @@ def segmentation_mapping(image: Union[List[np.ndarray], np.ndarray],
                     elif "instance" not in map_by:
                         raise ValueError(f"The map_by key \"{map_by_attribute}\" requires that the instance map is "
                                          f"stored as well in the output. Change it to: {map_by + ['instance']}")
+
         # combine stereo image and add to output
         for key, list_of_stereo_images in mapped_results_stereo_dict.items():
             if len(list_of_stereo_images) == 1:
@@ -1,6 +1,8 @@
 """Use stereo global matching to calculate an distance image. """
 
-from typing import Tuple, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from typing import Tuple, List, Optional, Any
 
 import bpy
 import cv2
@@ -11,7 +13,8 @@
 
 def stereo_global_matching(color_images: List[np.ndarray], depth_max: Optional[float] = None, window_size: int = 7,
                            num_disparities: int = 32, min_disparity: int = 0, disparity_filter: bool = True,
-                           depth_completion: bool = True) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+                           depth_completion: bool = True,
+                           num_threads: int = 0) -> Tuple[List[np.ndarray], List[np.ndarray]]:
     """ Does the stereo global matching in the following steps:
     1. Collect camera object and its state,
     2. For each frame, load left and right images and call the `sgm()` methode.
@@ -25,6 +28,8 @@ def stereo_global_matching(color_images: List[np.ndarray], depth_max: Optional[f
     :param min_disparity: Semi-global matching minimum disparity.
     :param disparity_filter: Applies post-processing of the generated disparity map using WLS filter.
     :param depth_completion: Applies basic depth completion using image processing techniques.
+    :param num_threads: The number of threads used to process the frames in parallel, each thread uses its own
+                        matchers. If 0 is given, all frames are processed one after another.
     :return: Returns the computed depth and disparity images for all given frames.
     """
     # Collect camera and camera object
@@ -44,42 +49,45 @@ def stereo_global_matching(color_images: List[np.ndarray], depth_max: Optional[f
 
     focal_length = CameraUtility.get_intrinsics_as_K_matrix()[0, 0]
 
-    depth_frames = []
-    disparity_frames = []
-    for color_image in color_images:
-        depth, disparity = _StereoGlobalMatching.stereo_global_matching(color_image[0], color_image[1], baseline,
-                                                                        depth_max, focal_length, window_size,
-                                                                        num_disparities, min_disparity,
-                                                                        disparity_filter, depth_completion)
-
-        depth_frames.append(depth)
-        disparity_frames.append(disparity)
-
+    # The matchers are created once per thread and reused for all of its frames
+    thread_data = threading.local()
+
+    def process_frame(color_image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if not hasattr(thread_data, "matchers"):
+            thread_data.matchers = _StereoGlobalMatching.create_matchers(window_size, num_disparities, min_disparity,
+                                                                         disparity_filter)
+        return _StereoGlobalMatching.stereo_global_matching(color_image[0], color_image[1], baseline, depth_max,
+                                                            focal_length, window_size, num_disparities,
+                                                            min_disparity, disparity_filter, depth_completion,
+                                                            thread_data.matchers)
+
+    if num_threads > 0:
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            results = list(executor.map(process_frame, color_images))
+    else:
+        results = [process_frame(color_image) for color_image in color_images]
+
+    depth_frames = [depth for depth, _ in results]
+    disparity_frames = [disparity for _, disparity in results]
     return depth_frames, disparity_frames
 
 
 class _StereoGlobalMatching:
 
     @staticmethod
-    def stereo_global_matching(left_color_image: np.ndarray, right_color_image: np.ndarray, baseline: float,
-                               depth_max: float, focal_length: float, window_size: int = 7, num_disparities: int = 32,
-                               min_disparity: int = 0, disparity_filter: bool = True,
-                               depth_completion: bool = True) -> Tuple[np.ndarray, np.ndarray]:
-        """ Semi global matching funciton, for more details on what this function does check the original paper
-        https://elib.dlr.de/73119/1/180Hirschmueller.pdf
+    def create_matchers(window_size: int = 7, num_disparities: int = 32, min_disparity: int = 0,
+                        disparity_filter: bool = True) -> Tuple[Any, Optional[Any], Optional[Any]]:
+        """ Creates the semi global matchers and the WLS filter, which can be reused for multiple frames.
+
+        The returned objects must not be used by multiple threads at the same time.
 
-        :param left_color_image: The left color image.
-        :param right_color_image: The right color image.
-        :param baseline: The baseline that was used for rendering the two images.
-        :param depth_max: The maximum depth value for clipping the resulting depth values.
-        :param focal_length: The focal length that was used for rendering the two images.
         :param window_size: Semi-global matching kernel size. Should be an odd number.
         :param num_disparities: Semi-global matching number of disparities. Should be > 0 and divisible by 16.
         :param min_disparity: Semi-global matching minimum disparity.
-        :param disparity_filter: Applies post-processing of the generated disparity map using WLS filter.
-        :param depth_completion: Applies basic depth completion using image processing techniques.
-        :return: depth, disparity
-         """
+        :param disparity_filter: Whether the right matcher and the WLS filter are needed.
+        :return: The left matcher, the right matcher and the WLS filter. The last two are None, if no disparity filter
+                 is used.
+        """
         if window_size % 2 == 0:
             raise ValueError("Window size must be an odd number")
 
@@ -101,6 +109,7 @@ def stereo_global_matching(left_color_image: np.ndarray, right_color_image: np.n
             mode=cv2.StereoSGBM_MODE_HH
         )
 
+        right_matcher, wls_filter = None, None
         if disparity_filter:
             right_matcher = cv2.ximgproc.createRightMatcher(left_matcher)
 
@@ -110,7 +119,38 @@ def stereo_global_matching(left_color_image: np.ndarray, right_color_image: np.n
             wls_filter = cv2.ximgproc.createDisparityWLSFilter(matcher_left=left_matcher)
             wls_filter.setLambda(lmbda)
             wls_filter.setSigmaColor(sigma)
+        return left_matcher, right_matcher, wls_filter
 
+    @staticmethod
+    def stereo_global_matching(left_color_image: np.ndarray, right_color_image: np.ndarray, baseline: float,
+                               depth_max: float, focal_length: float, window_size: int = 7, num_disparities: int = 32,
+                               min_disparity: int = 0, disparity_filter: bool = True,
+                               depth_completion: bool = True,
+                               matchers: Optional[Tuple[Any, Optional[Any], Optional[Any]]] = None) \
+            -> Tuple[np.ndarray, np.ndarray]:
+        """ Semi global matching funciton, for more details on what this function does check the original paper
+        https://elib.dlr.de/73119/1/180Hirschmueller.pdf
+
+        :param left_color_image: The left color image.
+        :param right_color_image: The right color image.
+        :param baseline: The baseline that was used for rendering the two images.
+        :param depth_max: The maximum depth value for clipping the resulting depth values.
+        :param focal_length: The focal length that was used for rendering the two images.
+        :param window_size: Semi-global matching kernel size. Should be an odd number.
+        :param num_disparities: Semi-global matching number of disparities. Should be > 0 and divisible by 16.
+        :param min_disparity: Semi-global matching minimum disparity.
+        :param disparity_filter: Applies post-processing of the generated disparity map using WLS filter.
+        :param depth_completion: Applies basic depth completion using image processing techniques.
+        :param matchers: The matchers created via `create_matchers()` with the same parameters. If None, new matchers
+                         are created.
+        :return: depth, disparity
+         """
+        if matchers is None:
+            matchers = _StereoGlobalMatching.create_matchers(window_size, num_disparities, min_disparity,
+                                                             disparity_filter)
+        left_matcher, right_matcher, wls_filter = matchers
+
+        if disparity_filter:
             dispr = right_matcher.compute(right_color_image, left_color_image)
 
         displ = left_matcher.compute(left_color_image, right_color_image)
@@ -1,7 +1,7 @@
 """Provides functionality to render an optical flow image."""
 
 import os
-from typing import Dict, List, Union
+from typing import Dict, List, Set, Union
 
 import bpy
 import numpy as np
@@ -56,43 +56,17 @@ def render_optical_flow(output_dir: str = None, temp_dir: str = None, get_forwar
         _FlowRendererUtility.output_vector_field(get_forward_flow, get_backward_flow, output_dir)
 
         # only need to render once; both fwd and bwd flow will be saved
-        temporary_fwd_flow_file_path = os.path.join(temp_dir, 'fwd_flow_')
-        temporary_bwd_flow_file_path = os.path.join(temp_dir, 'bwd_flow_')
         print(f"Rendering {bpy.context.scene.frame_end - bpy.context.scene.frame_start} frames of optical flow...")
         RendererUtility.render(temp_dir, "img_flow_temp_ignore_me_", None, load_keys=set(), verbose=verbose)
 
         # After rendering: convert to optical flow or calculate hsv visualization, if desired
-        for frame in range(bpy.context.scene.frame_start, bpy.context.scene.frame_end):
-            # temporarily save respective vector fields
-            if get_forward_flow:
-                file_path = temporary_fwd_flow_file_path + f"{frame:04d}" + ".exr"
-                fwd_flow_field = load_image(file_path, num_channels=4).astype(np.float32)
+        _FlowRendererUtility.save_optical_flow(temp_dir, output_dir, get_forward_flow, get_backward_flow,
+                                               blender_image_coordinate_style, forward_flow_output_file_prefix,
+                                               backward_flow_output_file_prefix)
 
-                if not blender_image_coordinate_style:
-                    fwd_flow_field[:, :, 1] = fwd_flow_field[:, :, 1] * -1
-
-                file_name = os.path.join(output_dir, forward_flow_output_file_prefix) + f"{frame:04d}"
-                forward_flow = fwd_flow_field * -1  # invert forward flow to point at next frame
-                np.save(file_name + '.npy', forward_flow[:, :, :2])
-
-            if get_backward_flow:
-                file_path = temporary_bwd_flow_file_path + f"{frame:04d}" + ".exr"
-                bwd_flow_field = load_image(file_path, num_channels=4).astype(np.float32)
-
-                if not blender_image_coordinate_style:
-                    bwd_flow_field[:, :, 1] = bwd_flow_field[:, :, 1] * -1
-
-                file_name = os.path.join(output_dir, backward_flow_output_file_prefix) + f"{frame:04d}"
-                np.save(file_name + '.npy', bwd_flow_field[:, :, :2])
-
-    load_keys = set()
-    # register desired outputs
-    if get_forward_flow:
-        Utility.register_output(output_dir, forward_flow_output_file_prefix, forward_flow_output_key, '.npy', '2.0.0')
-        load_keys.add(forward_flow_output_key)
-    if get_backward_flow:
-        Utility.register_output(output_dir, backward_flow_output_file_prefix, backward_flow_output_key, '.npy', '2.0.0')
-        load_keys.add(backward_flow_output_key)
+    load_keys = _FlowRendererUtility.register_optical_flow_outputs(
+        output_dir, get_forward_flow, get_backward_flow, forward_flow_output_file_prefix, forward_flow_output_key,
+        backward_flow_output_file_prefix, backward_flow_output_key)
 
     return _WriterUtility.load_registered_outputs(load_keys) if return_data else {}
 
@@ -143,3 +117,69 @@ def output_vector_field(forward_flow: bool, backward_flow: bool, output_dir: str
             bwd_flow_output_file.format.file_format = "OPEN_EXR"
             bwd_flow_output_file.file_slots.values()[0].path = "bwd_flow_"
             links.new(combine_bwd_flow.outputs['Image'], bwd_flow_output_file.inputs['Image'])
+
+    @staticmethod
+    def save_optical_flow(temp_dir: str, output_dir: str, get_forward_flow: bool, get_backward_flow: bool,
+                          blender_image_coordinate_style: bool, forward_flow_output_file_prefix: str,
+                          backward_flow_output_file_prefix: str):
+        """ Converts the rendered vector fields into optical flow and saves them as .npy files.
+
+        :param temp_dir: The directory the vector fields have been written to, see `output_vector_field()`.
+        :param output_dir: The directory to write the optical flow to.
+        :param get_forward_flow: Whether to convert the forward optical flow.
+        :param get_backward_flow: Whether to convert the backward optical flow.
+        :param blender_image_coordinate_style: Whether to specify the image coordinate system at the bottom left
+                                               (blender default; True) or top left (standard convention; False).
+        :param forward_flow_output_file_prefix: The file prefix to use for writing the forward flow.
+        :param backward_flow_output_file_prefix: The file prefix to use for writing the backward flow.
+        """
+        temporary_fwd_flow_file_path = os.path.join(temp_dir, 'fwd_flow_')
+        temporary_bwd_flow_file_path = os.path.join(temp_dir, 'bwd_flow_')
+        for frame in range(bpy.context.scene.frame_start, bpy.context.scene.frame_end):
+            # temporarily save respective vector fields
+            if get_forward_flow:
+                file_path = temporary_fwd_flow_file_path + f"{frame:04d}" + ".exr"
+                fwd_flow_field = load_image(file_path, num_channels=4).astype(np.float32)
+
+                if not blender_image_coordinate_style:
+                    fwd_flow_field[:, :, 1] = fwd_flow_field[:, :, 1] * -1
+
+                file_name = os.path.join(output_dir, forward_flow_output_file_prefix) + f"{frame:04d}"
+                forward_flow = fwd_flow_field * -1  # invert forward flow to point at next frame
+                np.save(file_name + '.npy', forward_flow[:, :, :2])
+
+            if get_backward_flow:
+                file_path = temporary_bwd_flow_file_path + f"{frame:04d}" + ".exr"
+                bwd_flow_field = load_image(file_path, num_channels=4).astype(np.float32)
+
+                if not blender_image_coordinate_style:
+                    bwd_flow_field[:, :, 1] = bwd_flow_field[:, :, 1] * -1
+
+                file_name = os.path.join(output_dir, backward_flow_output_file_prefix) + f"{frame:04d}"
+                np.save(file_name + '.npy', bwd_flow_field[:, :, :2])
+
+    @staticmethod
+    def register_optical_flow_outputs(output_dir: str, get_forward_flow: bool, get_backward_flow: bool,
+                                      forward_flow_output_file_prefix: str, forward_flow_output_key: str,
+                                      backward_flow_output_file_prefix: str, backward_flow_output_key: str) -> Set[str]:
+        """ Registers the optical flow written by `save_optical_flow()` as outputs.
+
+        :param output_dir: The directory the optical flow has been written to.
+        :param get_forward_flow: Whether the forward optical flow should be registered.
+        :param get_backward_flow: Whether the backward optical flow should be registered.
+        :param forward_flow_output_file_prefix: The file prefix of the forward flow files.
+        :param forward_flow_output_key: The key to use for registering the forward flow.
+        :param backward_flow_output_file_prefix: The file prefix of the backward flow files.
+        :param backward_flow_output_key: The key to use for registering the backward flow.
+        :return: The registered output keys.
+        """
+        load_keys = set()
+        if get_forward_flow:
+            Utility.register_output(output_dir, forward_flow_output_file_prefix, forward_flow_output_key, '.npy',
+                                    '2.0.0')
+            load_keys.add(forward_flow_output_key)
+        if get_backward_flow:
+            Utility.register_output(output_dir, backward_flow_output_file_prefix, backward_flow_output_key, '.npy',
+                                    '2.0.0')
+            load_keys.add(backward_flow_output_key)
+        return load_keys
@@ -0,0 +1,143 @@
+"""Provides functionality to render segmentation, NOCS and optical flow images in one single rendering."""
+
+import os
+from typing import Optional, Dict, List, Union, Any
+
+import bpy
+import numpy as np
+
+from blenderproc.python.renderer import RendererUtility
+from blenderproc.python.renderer.RendererUtility import set_world_background
+from blenderproc.python.renderer.NOCSRendererUtility import _NOCSRendererUtility
+from blenderproc.python.renderer.SegMapRendererUtility import _save_segmaps
+from blenderproc.python.renderer.FlowRendererUtility import _FlowRendererUtility
+from blenderproc.python.utility.BlenderUtility import get_all_blender_mesh_objects
+from blenderproc.python.utility.Utility import Utility, UndoAfterExecution
+from blenderproc.python.writer.WriterUtility import _WriterUtility
+
+
+def render_ground_truth(output_dir: Optional[str] = None, temp_dir: Optional[str] = None,
+                        render_segmentation: bool = True, map_by: Union[str, List[str]] = "instance",
+                        default_values: Optional[Dict[str, Any]] = None, render_nocs: bool = True,
+                        get_forward_flow: bool = True, get_backward_flow: bool = True,
+                        blender_image_coordinate_style: bool = False, segmap_file_prefix: str = "segmap_",
+                        segmap_output_key: str = "segmap",
+                        segcolormap_output_file_prefix: str = "instance_attribute_map_",
+                        segcolormap_output_key: str = "segcolormap", nocs_file_prefix: str = "nocs_",
+                        nocs_output_key: str = "nocs", forward_flow_output_file_prefix: str = "forward_flow_",
+                        forward_flow_output_key: str = "forward_flow",
+                        backward_flow_output_file_prefix: str = "backward_flow_",
+                        backward_flow_output_key: str = "backward_flow", return_data: bool = True,
+                        verbose: bool = False) -> Dict[str, Union[np.ndarray, List[np.ndarray]]]:
+    """ Renders segmentation maps, the Normalized Object Coordinate Space (NOCS) and the optical flow in one go.
+
+    Calling `render_segmap()`, `render_nocs()` and `render_optical_flow()` after another renders the scene three
+    times. Here, all of them are taken from the same rendering instead: The NOCS is the rendered image itself, while
+    the object indices and the motion vectors are written as separate render passes. So the scene is only set up and
+    rendered once. All outputs are registered like the ones of the separate renderers.
+
+    The segmentation is based on the object index pass, like `render_segmap(segmentation_backend="object_index")`,
+    so no per object materials are created. All objects share the NOCS material while rendering.
+
+    :param output_dir: The directory to write images to. If None is given, the temp dir is used.
+    :param temp_dir: The directory to write intermediate data to. If None is given, the temp dir is used.
+    :param render_segmentation: Whether to render segmentation maps.
+    :param map_by: The attributes to be used for the segmentation maps, see `render_segmap()`.
+    :param default_values: The default values used for objects which do not provide one of the map_by attributes,
+                           if None is {"class": 0}.
+    :param render_nocs: Whether to render the NOCS.
+    :param get_forward_flow: Whether to render forward optical flow.
+    :param get_backward_flow: Whether to render backward optical flow.
+    :param blender_image_coordinate_style: Whether to specify the image coordinate system of the optical flow at the
+                                           bottom left (blender default; True) or top left (standard convention;
+                                           False).
+    :param segmap_file_prefix: The prefix to use for writing the segmentation images.
+    :param segmap_output_key: The key to use for registering the segmentation output.
+    :param segcolormap_output_file_prefix: The prefix to use for writing the segmentation-color map csv.
+    :param segcolormap_output_key: The key to use for registering the segmentation-color map output.
+    :param nocs_file_prefix: The prefix to use for writing the NOCS images.
+    :param nocs_output_key: The key to use for registering the NOCS output.
+    :param forward_flow_output_file_prefix: The file prefix that should be used when writing forward flow to a file.
+    :param forward_flow_output_key: The key which should be used for storing forward optical flow values.
+    :param backward_flow_output_file_prefix: The file prefix that should be used when writing backward flow to a file.
+    :param backward_flow_output_key: The key which should be used for storing backward optical flow values.
+    :param return_data: Whether to load and return generated data.
+    :param verbose: If True, more details about the rendering process are printed.
+    :return: A dict containing the outputs of the segmentation (e.g. "instance_segmaps" and
+             "instance_attribute_maps"), the NOCS and the optical flow, depending on what has been requested.
+    """
+    if not (render_segmentation or render_nocs or get_forward_flow or get_backward_flow):
+        raise RuntimeError("At least one of segmentation, nocs, forward or backward flow has to be rendered.")
+
+    if output_dir is None:
+        output_dir = Utility.get_temporary_directory()
+    if temp_dir is None:
+        temp_dir = Utility.get_temporary_directory()
+    if default_values is None:
+        default_values = {"class": 0}
+
+    load_keys = set()
+    return_dict: Dict[str, Union[np.ndarray, List[np.ndarray]]] = {}
+    wrote_csv_files = False
+    with UndoAfterExecution():
+        # All objects share the NOCS material, which is also cheap to shade, if no NOCS is requested
+        nocs_material = _NOCSRendererUtility.create_nocs_material()
+        for obj in get_all_blender_mesh_objects():
+            if len(obj.material_slots) > 0:
+                for i in range(len(obj.material_slots)):
+                    obj.data.materials[i] = nocs_material.blender_obj
+            else:
+                obj.data.materials.append(nocs_material.blender_obj)
+
+        # Make sure the background is black
+        set_world_background([0, 0, 0])
+
+        # Set all fast rendering parameters with only one ray per pixel
+        RendererUtility.render_init()
+        # the amount of samples must be one and there can not be any noise threshold
+        RendererUtility.set_max_amount_of_samples(1)
+        RendererUtility.set_noise_threshold(0)
+        RendererUtility.set_denoiser(None)
+        RendererUtility.set_light_bounces(1, 0, 0, 1, 0, 8, 0)
+        bpy.context.scene.cycles.filter_width = 0.0
+
+        if render_segmentation:
+            # The object index pass is written into temp_dir, without registering it as output
+            objects = RendererUtility._enable_object_index_pass(get_all_blender_mesh_objects(), temp_dir, "gt_seg_")
+        if get_forward_flow or get_backward_flow:
+            _FlowRendererUtility.output_vector_field(get_forward_flow, get_backward_flow, temp_dir)
+
+        # Use exr as output format, as it uses a linear colorspace and uses float16
+        RendererUtility.set_output_format("OPEN_EXR", 16, enable_transparency=True)
+        if render_nocs:
+            RendererUtility.render(output_dir, nocs_file_prefix, nocs_output_key, load_keys=set(), return_data=False,
+                                   verbose=verbose)
+            load_keys.add(nocs_output_key)
+        else:
+            RendererUtility.render(temp_dir, "img_gt_temp_ignore_me_", None, load_keys=set(), return_data=False,
+                                   verbose=verbose)
+
+        if render_segmentation:
+            # The object ids are mapped to the attributes, while the objects still have their pass indices
+            return_dict, wrote_csv_files = _save_segmaps(os.path.join(temp_dir, "gt_seg_"), objects, None, 0, map_by,
+                                                         default_values, os.path.join(output_dir, segmap_file_prefix),
+                                                         output_dir, segcolormap_output_file_prefix, 0)
+
+        if get_forward_flow or get_backward_flow:
+            _FlowRendererUtility.save_optical_flow(temp_dir, output_dir, get_forward_flow, get_backward_flow,
+                                                   blender_image_coordinate_style, forward_flow_output_file_prefix,
+                                                   backward_flow_output_file_prefix)
+            load_keys |= _FlowRendererUtility.register_optical_flow_outputs(
+                output_dir, get_forward_flow, get_backward_flow, forward_flow_output_file_prefix,
+                forward_flow_output_key, backward_flow_output_file_prefix, backward_flow_output_key)
+
+    if render_segmentation:
+        Utility.register_output(output_dir, segmap_file_prefix, segmap_output_key, ".npy", "2.0.0")
+        if wrote_csv_files:
+            Utility.register_output(output_dir, segcolormap_output_file_prefix, segcolormap_output_key, ".csv",
+                                    "2.0.0")
+
+    if not return_data:
+        return {}
+    return_dict.update(_WriterUtility.load_registered_outputs(load_keys, keys_with_alpha_channel={nocs_output_key}))
+    return return_dict
@@ -3,11 +3,13 @@
 from contextlib import contextmanager
 import os
 import threading
-from typing import IO, Union, Dict, List, Set, Optional, Any
+from typing import IO, Union, Dict, List, Set, Optional, Any, Callable
 import math
 import sys
 import platform
 import time
+import csv
+import json
 
 import mathutils
 import bpy
@@ -20,7 +22,7 @@
 from blenderproc.python.utility.BlenderUtility import get_all_blender_mesh_objects
 from blenderproc.python.utility.DefaultConfig import DefaultConfig
 from blenderproc.python.utility.Utility import Utility, stdout_redirected
-from blenderproc.python.writer.WriterUtility import _WriterUtility
+from blenderproc.python.writer.WriterUtility import _WriterUtility, LazyFrameSequence
 
 
 def set_denoiser(denoiser: Optional[str]):
@@ -464,9 +466,39 @@ def enable_segmentation_output(map_by: Union[str, List[str]] = "category_id",
     :param file_prefix: The prefix to use for writing the files.
     :param output_key: The key to use for registering the segmentation output.
     """
+    if output_dir is None:
+        output_dir = Utility.get_temporary_directory()
+
+    _enable_object_index_pass(get_all_blender_mesh_objects(), output_dir, file_prefix, pass_alpha_threshold)
+    Utility.add_output_entry({
+        "key": output_key,
+        "path": os.path.join(output_dir, file_prefix) + "%04d" + ".exr",
+        "version": "3.0.0",
+        "trim_redundant_channels": True,
+        "is_semantic_segmentation": True,
+        "semantic_segmentation_mapping": map_by,
+        "semantic_segmentation_default_values": default_values
+    })
+
+
+def _enable_object_index_pass(objects: List[bpy.types.Object], output_dir: str, file_prefix: str,
+                              pass_alpha_threshold: float = 0.05) -> List[Union[bpy.types.Object, bpy.types.World]]:
+    """ Assigns an index to each object and writes the object index pass into 32-bit .exr files.
+
+    The materials of the objects are not changed. The written files are not registered as output.
+
+    :param objects: A list of objects, the first one gets the index one.
+    :param output_dir: The directory to write the .exr files to.
+    :param file_prefix: The prefix to use for writing the .exr files.
+    :param pass_alpha_threshold: Materials with a lower alpha value are considered transparent, see
+                                 `enable_segmentation_output()`.
+    :return: The list mapping indices in the image back to the objects, the world background has the index zero.
+    """
     # give all objects an id, background is always zero
-    for index, obj in enumerate(get_all_blender_mesh_objects()):
+    index_map: List[Union[bpy.types.Object, bpy.types.World]] = [bpy.context.scene.world]
+    for index, obj in enumerate(objects):
         obj.pass_index = index + 1
+        index_map.append(obj)
 
     # add the pass object index id to the rendering output
     bpy.context.scene.render.use_compositing = True
@@ -478,22 +510,12 @@ def enable_segmentation_output(map_by: Union[str, List[str]] = "category_id",
 
     render_layer_node = tree.nodes.get('Render Layers')
 
-    if output_dir is None:
-        output_dir = Utility.get_temporary_directory()
-
     output_node = tree.nodes.new('CompositorNodeOutputFile')
     output_node.base_path = output_dir
     output_node.format.file_format = "OPEN_EXR"
+    # float16 can only store the integers up to 2048 precisely
+    output_node.format.color_depth = "32"
     output_node.file_slots.values()[0].path = file_prefix
-    Utility.add_output_entry({
-        "key": output_key,
-        "path": os.path.join(output_dir, file_prefix) + "%04d" + ".exr",
-        "version": "3.0.0",
-        "trim_redundant_channels": True,
-        "is_semantic_segmentation": True,
-        "semantic_segmentation_mapping": map_by,
-        "semantic_segmentation_default_values": default_values
-    })
 
     # Feed the output through 'Combine Color' node, to create 3 channel RGB grayscale image as a lot of
     # EXR readers don't support single float channel EXR files and Blender writes depth as a single
@@ -501,11 +523,12 @@ def enable_segmentation_output(map_by: Union[str, List[str]] = "category_id",
     combine_color = tree.nodes.new("CompositorNodeCombineColor")
     combine_color.mode = "HSV"
     links.new(render_layer_node.outputs["IndexOB"], combine_color.inputs[2])
-    
+
     links.new(combine_color.outputs["Image"], output_node.inputs["Image"])
 
     # set the threshold low to avoid noise in alpha materials
     bpy.context.scene.view_layers["ViewLayer"].pass_alpha_threshold = pass_alpha_threshold
+    return index_map
 
 
 def enable_diffuse_color_output(output_dir: Optional[str] = None, file_prefix: str = "diffuse_",
@@ -558,13 +581,145 @@ def map_file_format_to_file_ending(file_format: str) -> str:
     raise RuntimeError(f"Unknown Image Type {file_format}")
 
 
-def _progress_bar_thread(pipe_out: int, stdout: IO, total_frames: int, num_samples: int):
+class _RenderStatsCollector:
+    """ Turns blenders render status lines into per frame render statistics. """
+
+    # The fields of every frame record, in the order they are written into the csv file
+    FIELDS = ["frame", "wall_time", "time_to_first_sample", "samples", "max_samples", "denoising_time",
+              "compositing_time", "peak_memory", "peak_device_memory"]
+
+    def __init__(self, callback: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        :param callback: If given, it is called with the record of every frame as soon as the frame is finished.
+                         It is called from the thread reading blenders debug messages.
+        """
+        self.callback = callback
+        # The first exception raised by the callback, it is re-raised after rendering, see `_render_progress_bar()`
+        self.callback_error: Optional[BaseException] = None
+        self.frames: List[Dict[str, Any]] = []
+        self._current: Optional[Dict[str, Any]] = None
+        self._frame_start = 0.0
+        self._phase: Optional[str] = None
+        self._phase_start = 0.0
+
+    @staticmethod
+    def _parse_memory(value: str) -> float:
+        """ Converts a memory value printed by blender, e.g. 25.49M, into megabytes.
+
+        :param value: The memory value with its unit.
+        :return: The memory in megabytes.
+        """
+        factor = {"K": 1 / 1024, "M": 1, "G": 1024}.get(value[-1:].upper())
+        if factor is None:
+            return float(value)
+        return float(value[:-1]) * factor
+
+    def _enter_phase(self, phase: Optional[str], timestamp: float):
+        """ Adds the time spent in the last phase to the current frame and starts the given phase.
+
+        :param phase: The new phase: "denoising", "compositing" or None for every other phase.
+        :param timestamp: The time at which the new phase starts.
+        """
+        if self._phase is not None:
+            self._current[self._phase + "_time"] += timestamp - self._phase_start
+        self._phase = phase
+        self._phase_start = timestamp
+
+    def _finish_frame(self, timestamp: float):
+        """ Finishes the record of the current frame.
+
+        :param timestamp: The time at which the current frame has been finished.
+        """
+        if self._current is None:
+            return
+        self._enter_phase(None, timestamp)
+        self._current["wall_time"] = timestamp - self._frame_start
+        self.frames.append(self._current)
+        # The reader thread has to keep draining the pipe, otherwise blender blocks as soon as the pipe is full
+        if self.callback is not None and self.callback_error is None:
+            # pylint: disable=broad-exception-caught
+            try:
+                self.callback(self._current)
+            except Exception as e:
+                self.callback_error = e
+            # pylint: enable=broad-exception-caught
+        self._current = None
+
+    def feed(self, line: str, timestamp: float):
+        """ Processes one status line printed by blender.
+
+        :param line: The status line, e.g. "Fra:1 Mem:25.49M (Peak 25.50M) | ... | Scene, ViewLayer | Sample 1/64".
+        :param timestamp: The time at which the line has been read.
+        """
+        if not line.startswith("Fra:"):
+            return
+        status_columns = [col.strip() for col in line.split("|")]
+        frame_number = int(status_columns[0].split()[0][len("Fra:"):])
+        if self._current is None or self._current["frame"] != frame_number:
+            self._finish_frame(timestamp)
+            self._current = {field: None for field in self.FIELDS}
+            self._current.update(frame=frame_number, denoising_time=0.0, compositing_time=0.0)
+            self._frame_start = timestamp
+            self._phase = None
+
+        for col in status_columns:
+            # The memory of blender itself, e.g. "Fra:1 Mem:25.49M (Peak 25.50M)"
+            if "(Peak " in col:
+                peak = self._parse_memory(col.split("(Peak ", maxsplit=1)[1].rstrip(")"))
+                self._current["peak_memory"] = max(self._current["peak_memory"] or 0.0, peak)
+            # The memory of the render device, e.g. "Mem:12.43M, Peak:12.43M"
+            elif col.startswith("Mem:") and ", Peak:" in col:
+                peak = self._parse_memory(col.split(", Peak:", maxsplit=1)[1])
+                self._current["peak_device_memory"] = max(self._current["peak_device_memory"] or 0.0, peak)
+
+        phase = None
+        if "Scene, ViewLayer" in status_columns:
+            status = " | ".join(status_columns[status_columns.index("Scene, ViewLayer") + 1:])
+            if status.startswith("Sample"):
+                if self._current["time_to_first_sample"] is None:
+                    self._current["time_to_first_sample"] = timestamp - self._frame_start
+                samples, max_samples = status[len("Sample"):].split("/", maxsplit=1)
+                self._current["samples"] = max(self._current["samples"] or 0, int(samples))
+                self._current["max_samples"] = int(max_samples.split()[0])
+            elif "Denois" in status:
+                phase = "denoising"
+        elif "Compositing" in status_columns:
+            phase = "compositing"
+        if phase != self._phase:
+            self._enter_phase(phase, timestamp)
+
+    def finish(self, timestamp: float):
+        """ Finishes the record of the last frame, needs to be called after the last line has been fed.
+
+        :param timestamp: The time at which rendering has been finished.
+        """
+        self._finish_frame(timestamp)
+
+    def write(self, file_path: str):
+        """ Writes the records of all frames into the given .json or .csv file.
+
+        :param file_path: The path of the file, its ending determines the format.
+        """
+        if file_path.endswith(".csv"):
+            with open(file_path, "w", newline="", encoding="utf-8") as file:
+                writer = csv.DictWriter(file, fieldnames=self.FIELDS)
+                writer.writeheader()
+                writer.writerows(self.frames)
+        else:
+            with open(file_path, "w", encoding="utf-8") as file:
+                json.dump(self.frames, file, indent=2)
+
+
+def _progress_bar_thread(pipe_out: int, stdout: IO, total_frames: int, num_samples: int,
+                         stats_collector: Optional[_RenderStatsCollector] = None, show_progress_bar: bool = True):
     """ The thread rendering the progress bar
 
     :param pipe_out: The pipe output delivering blenders debug messages.
     :param stdout: The stdout to which the progress bar should be written.
     :param total_frames: The number of frames that should be rendered.
     :param num_samples: The number of samples used to render each frame.
+    :param stats_collector: If given, every line is also fed into this collector.
+    :param show_progress_bar: If False, no progress bar is shown and all messages are forwarded to stdout instead.
     """
     # Define columns for progress bar
     columns = [
@@ -574,26 +729,32 @@ def _progress_bar_thread(pipe_out: int, stdout: IO, total_frames: int, num_sampl
         TextColumn("[progress.description]{task.fields[status]}"),
     ]
     # Initializes progress bar using given stdout
-    with Progress(*columns, console=Console(file=stdout), transient=True) as progress:
+    with Progress(*columns, console=Console(file=stdout), transient=True, disable=not show_progress_bar) as progress:
         complete_task = progress.add_task("[green]Total", total=total_frames, status="")
         frame_task = progress.add_task("[yellow]Current frame", total=num_samples, status="")
 
-        # Continuously read blenders debug messages
-        current_line = ""
+        # Continuously read blenders debug messages, whatever is available in the pipe is read at once
+        pending = b""
         starting_frame_number = bpy.context.scene.frame_start
-        while True:
-            # Read the next character
-            char = os.read(pipe_out, 1)
-            if not char:
-                break
-            char = chr(char[0])
+        finished = False
+        while not finished:
+            data = os.read(pipe_out, 65536)
+            timestamp = time.perf_counter()
             # If its the ending character, stop
-            if not char or "\b" == char:
-                break
-            # If the current line has ended
-            if char == "\n":
+            if not data or b"\b" in data:
+                data = data.split(b"\b", maxsplit=1)[0]
+                finished = True
+            lines = (pending + data).split(b"\n")
+            # The last part is not yet a complete line
+            pending = lines.pop()
+            for line in lines:
+                current_line = line.decode("utf-8", errors="replace")
+                if not show_progress_bar:
+                    stdout.write(current_line + "\n")
+                if stats_collector is not None:
+                    stats_collector.feed(current_line, timestamp)
                 # Check if its a line we can use (starts with "Fra:")
-                if current_line.startswith("Fra:"):
+                if show_progress_bar and current_line.startswith("Fra:"):
                     # Extract current frame number and use it to set the progress bar
                     frame_number = int(current_line.split()[0][len("Fra:"):])
                     frames_completed = frame_number - starting_frame_number
@@ -618,15 +779,17 @@ def _progress_bar_thread(pipe_out: int, stdout: IO, total_frames: int, num_sampl
                         status = status_columns[-1]
                     # Set status to progress bar
                     progress.update(frame_task, status=status)
-                # Start with next line
-                current_line = ""
-            else:
-                # Append char to current line
-                current_line += char
+        if not show_progress_bar and pending:
+            stdout.write(pending.decode("utf-8", errors="replace"))
+        if not show_progress_bar:
+            stdout.flush()
+        if stats_collector is not None:
+            stats_collector.finish(time.perf_counter())
 
 
 @contextmanager
-def _render_progress_bar(pipe_out: int, pipe_in: int, stdout: IO, total_frames: int, enabled: bool = True):
+def _render_progress_bar(pipe_out: int, pipe_in: int, stdout: IO, total_frames: int, enabled: bool = True,
+                         stats_collector: Optional[_RenderStatsCollector] = None, show_progress_bar: bool = True):
     """ Shows a progress bar visualizing the render progress.
 
     :param pipe_out: The pipe output delivering blenders debug messages.
@@ -634,10 +797,15 @@ def _render_progress_bar(pipe_out: int, pipe_in: int, stdout: IO, total_frames:
     :param stdout: The stdout to which the progress bar should be written.
     :param total_frames: The number of frames that should be rendered.
     :param enabled: If False, no progress bar is shown.
+    :param stats_collector: If given, blenders debug messages are also fed into this collector. If its callback
+                            raised an exception, it is re-raised after rendering has finished.
+    :param show_progress_bar: If False, blenders debug messages are forwarded to stdout instead of showing a
+                              progress bar.
     """
     if enabled:
         thread = threading.Thread(target=_progress_bar_thread,
-                                  args=(pipe_out, stdout, total_frames, bpy.context.scene.cycles.samples))
+                                  args=(pipe_out, stdout, total_frames, bpy.context.scene.cycles.samples,
+                                        stats_collector, show_progress_bar))
         thread.start()
         try:
             yield
@@ -647,14 +815,18 @@ def _render_progress_bar(pipe_out: int, pipe_in: int, stdout: IO, total_frames:
             w.write("\b")
             w.close()
             thread.join()
+        if stats_collector is not None and stats_collector.callback_error is not None:
+            raise stats_collector.callback_error
     else:
         yield
 
 
 def render(output_dir: Optional[str] = None, file_prefix: str = "rgb_", output_key: Optional[str] = "colors",
-           load_keys: Optional[Set[str]] = None, return_data: bool = True,
+           load_keys: Optional[Set[str]] = None, return_data: Union[bool, str] = True,
            keys_with_alpha_channel: Optional[Set[str]] = None,
-           verbose: bool = False) -> Dict[str, Union[np.ndarray, List[np.ndarray]]]:
+           verbose: bool = False, render_stats_format: Optional[str] = None,
+           render_stats_callback: Optional[Callable[[Dict[str, Any]], None]] = None, num_decode_threads: int = 0) \
+        -> Dict[str, Union[np.ndarray, List[np.ndarray], LazyFrameSequence]]:
     """ Render all frames.
 
     This will go through all frames from scene.frame_start to scene.frame_end and render each of them.
@@ -664,11 +836,30 @@ def render(output_dir: Optional[str] = None, file_prefix: str = "rgb_", output_k
     :param file_prefix: The prefix to use for writing the images.
     :param output_key: The key to use for registering the output.
     :param load_keys: Set of output keys to load when available
-    :param return_data: Whether to load and return generated data.
+    :param return_data: Whether to load and return generated data. If "lazy", the per frame outputs are returned as
+                        LazyFrameSequence, which only decodes a frame when it is accessed. This way, the writers
+                        can stream through the frames without holding all of them in memory.
     :param keys_with_alpha_channel: A set containing all keys whose alpha channels should be loaded.
     :param verbose: If True, more details about the rendering process are printed.
+    :param render_stats_format: If "json" or "csv", per frame render statistics are written into
+                                render_stats.json / render_stats.csv inside the output_dir. Every frame record
+                                contains the wall time, the time to the first sample, the reached and maximum
+                                number of samples, the time spent denoising and compositing and the peak memory
+                                of blender and of the render device (both in MB), as reported by cycles.
+    :param render_stats_callback: If given, it is called with the statistics record of every frame, as soon as the
+                                  frame is rendered. It is called from a background thread, which reads blenders
+                                  debug messages while rendering continues. If it raises an exception, it is not
+                                  called for the remaining frames and the exception is re-raised by `render()`
+                                  after all frames have been rendered.
+    :param num_decode_threads: If > 0, the rendered files are decoded by that many threads in parallel. The
+                               returned data stays the same. If return_data is "lazy", this is the number of frames
+                               which are decoded in advance while iterating.
     :return: dict of lists of raw renderer output. Keys can be 'distance', 'colors', 'normals'
     """
+    if render_stats_format not in [None, "json", "csv"]:
+        raise RuntimeError(f"Unknown render stats format {render_stats_format}, options are \"json\" and \"csv\".")
+    if return_data not in [True, False, "lazy"]:
+        raise RuntimeError(f"Unknown value for return_data: {return_data}, options are True, False and \"lazy\".")
     if output_dir is None:
         output_dir = Utility.get_temporary_directory()
     if load_keys is None:
@@ -705,8 +896,14 @@ def render(output_dir: Optional[str] = None, file_prefix: str = "rgb_", output_k
         # Define pipe to communicate blenders debug messages to progress bar
         pipe_out, pipe_in = os.pipe()
         begin = time.time()
-        with stdout_redirected(pipe_in, enabled=not verbose) as stdout:
-            with _render_progress_bar(pipe_out, pipe_in, stdout, total_frames, enabled=not verbose):
+        # In verbose mode, the debug messages are only captured if render statistics are requested
+        stats_collector = None
+        if render_stats_format is not None or render_stats_callback is not None:
+            stats_collector = _RenderStatsCollector(render_stats_callback)
+        capture_output = not verbose or stats_collector is not None
+        with stdout_redirected(pipe_in, enabled=capture_output) as stdout:
+            with _render_progress_bar(pipe_out, pipe_in, stdout, total_frames, enabled=capture_output,
+                                      stats_collector=stats_collector, show_progress_bar=not verbose):
                 bpy.ops.render.render(animation=True, write_still=True)
 
         # Close Pipes to prevent having unclosed file handles
@@ -720,13 +917,18 @@ def render(output_dir: Optional[str] = None, file_prefix: str = "rgb_", output_k
             pass
 
         print(f"Finished rendering after {time.time() - begin:.3f} seconds")
+        if stats_collector is not None and render_stats_format is not None:
+            stats_collector.write(os.path.join(output_dir, "render_stats." + render_stats_format))
         # Revert changes
         bpy.context.scene.frame_end += 1
     else:
         raise RuntimeError("No camera poses have been registered, therefore nothing can be rendered. A camera "
                            "pose can be registered via bproc.camera.add_camera_pose().")
 
-    return _WriterUtility.load_registered_outputs(load_keys, keys_with_alpha_channel) if return_data else {}
+    if not return_data:
+        return {}
+    return _WriterUtility.load_registered_outputs(load_keys, keys_with_alpha_channel, lazy=return_data == "lazy",
+                                                  num_threads=num_decode_threads)
 
 
 def set_output_format(file_format: Optional[str] = None, color_depth: Optional[int] = None,
@@ -1,8 +1,11 @@
 """Provides functionality to render a segmentation image."""
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import csv
+from functools import partial
 import os
-from typing import List, Tuple, Union, Dict, Optional, Any
+from typing import List, Tuple, Union, Dict, Optional, Any, Iterator
 
 import bpy
 import mathutils
@@ -19,7 +22,9 @@ def render_segmap(output_dir: Optional[str] = None, temp_dir: Optional[str] = No
                   default_values: Optional[Dict[str, int]] = None, file_prefix: str = "segmap_",
                   output_key: str = "segmap", segcolormap_output_file_prefix: str = "instance_attribute_map_",
                   segcolormap_output_key: str = "segcolormap", use_alpha_channel: bool = False,
-                  render_colorspace_size_per_dimension: int = 2048) -> Dict[str, Union[np.ndarray, List[np.ndarray]]]:
+                  render_colorspace_size_per_dimension: int = 2048,
+                  num_decode_threads: int = 0,
+                  segmentation_backend: str = "material") -> Dict[str, Union[np.ndarray, List[np.ndarray]]]:
     """ Renders segmentation maps for all frames
 
     :param output_dir: The directory to write images to.
@@ -36,6 +41,16 @@ def render_segmap(output_dir: Optional[str] = None, temp_dir: Optional[str] = No
                                                  blender does not allow negative values for colors, we use \
                                                  [0, 2048] ** 3 as our color space which allows ~8 billion \
                                                  different colors/objects. This should be enough.
+    :param num_decode_threads: The number of threads used to decode the rendered frames and to map them back to
+                               object ids, while the previous frames are post-processed. The decoded segmaps are
+                               shared with the main thread without any copies. If 0 is given, all frames are
+                               decoded sequentially (default).
+    :param segmentation_backend: How the object ids are rendered. "material" replaces the materials of all objects
+                                 with emission materials, whose colors encode the object ids. "object_index" keeps
+                                 the materials and writes the object ids via the integer object index pass, this
+                                 avoids creating one material per object and decoding the colors, which matters
+                                 for scenes with many objects. The alpha channel of the materials is then always
+                                 used, use_alpha_channel and render_colorspace_size_per_dimension are ignored.
     :return: dict of lists of segmaps and (for instance segmentation) segcolormaps
     """
 
@@ -54,199 +69,42 @@ def render_segmap(output_dir: Optional[str] = None, temp_dir: Optional[str] = No
         RendererUtility.set_denoiser(None)
         RendererUtility.set_light_bounces(1, 0, 0, 1, 0, 8, 0)
 
-        attributes = map_by
-        if 'class' in default_values:
-            default_values['cp_category_id'] = default_values['class']
-
         # Get objects with meshes (i.e. not lights or cameras)
         objs_with_mats = get_all_blender_mesh_objects()
 
-        result = _colorize_objects_for_instance_segmentation(objs_with_mats, use_alpha_channel,
-                                                             render_colorspace_size_per_dimension)
-        colors, num_splits_per_dimension, objects = result
+        if segmentation_backend == "material":
+            result = _colorize_objects_for_instance_segmentation(objs_with_mats, use_alpha_channel,
+                                                                 render_colorspace_size_per_dimension)
+            _, num_splits_per_dimension, objects = result
+            if use_alpha_channel:
+                MaterialLoaderUtility.add_alpha_channel_to_textures(blurry_edges=False)
+            render_prefix = "seg_"
+        elif segmentation_backend == "object_index":
+            objects = RendererUtility._enable_object_index_pass(objs_with_mats, temp_dir, "seg_")
+            num_splits_per_dimension = None
+            # The rendered image itself is not needed
+            render_prefix = "seg_render_temp_ignore_me_"
+        else:
+            raise RuntimeError(f"Unknown segmentation backend: {segmentation_backend}, options are \"material\" "
+                               f"and \"object_index\".")
 
         bpy.context.scene.cycles.filter_width = 0.0
 
-        if use_alpha_channel:
-            MaterialLoaderUtility.add_alpha_channel_to_textures(blurry_edges=False)
-
         # Determine path for temporary and for final output
         temporary_segmentation_file_path = os.path.join(temp_dir, "seg_")
         final_segmentation_file_path = os.path.join(output_dir, file_prefix)
 
         RendererUtility.set_output_format("OPEN_EXR", 16)
-        RendererUtility.render(temp_dir, "seg_", None, return_data=False)
-
-        # Find optimal dtype of output based on max index
-        for dtype in [np.uint8, np.uint16, np.uint32]:
-            optimal_dtype = dtype
-            if np.iinfo(optimal_dtype).max >= len(colors) - 1:
-                break
-
-        if isinstance(attributes, str):
-            # only one result is requested
-            result_channels = 1
-            attributes = [attributes]
-        elif isinstance(attributes, list):
-            result_channels = len(attributes)
-        else:
-            raise RuntimeError(f"The type of this is not supported here: {attributes}")
+        RendererUtility.render(temp_dir, render_prefix, None, return_data=False)
 
-        # define them for the avoid rendering case
-        there_was_an_instance_rendering = False
-        list_of_attributes: List[str] = []
-
-        # Check if stereo is enabled
-        if bpy.context.scene.render.use_multiview:
-            suffixes = ["_L", "_R"]
-        else:
-            suffixes = [""]
-
-        return_dict: Dict[str, Union[np.ndarray, List[np.ndarray]]] = {}
-
-        # After rendering
-        for frame in range(bpy.context.scene.frame_start, bpy.context.scene.frame_end):  # for each rendered frame
-            save_in_csv_attributes: Dict[int, Dict[str, Any]] = {}
-
-            there_was_an_instance_rendering = False
-            for suffix in suffixes:
-                file_path = temporary_segmentation_file_path + f"{frame:04d}" + suffix + ".exr"
-                segmentation = load_image(file_path)
-                print(file_path, segmentation.shape)
-
-                segmap = Utility.map_back_from_equally_spaced_equidistant_values(segmentation,
-                                                                                 num_splits_per_dimension,
-                                                                                 render_colorspace_size_per_dimension)
-                segmap = segmap.astype(optimal_dtype)
-
-                object_ids = np.unique(segmap)
-                max_id = np.max(object_ids)
-                if max_id >= len(objects):
-                    raise Exception("There are more object colors than there are objects")
-                combined_result_map = []
-                list_of_attributes = []
-                channels = []
-                for channel_id in range(result_channels):
-                    num_default_values = 0
-                    resulting_map = np.zeros((segmap.shape[0], segmap.shape[1]), dtype=optimal_dtype)
-                    was_used = False
-                    current_attribute = attributes[channel_id]
-                    org_attribute = current_attribute
-
-                    # if the class is used the category_id attribute is evaluated
-                    if current_attribute == "class":
-                        current_attribute = "cp_category_id"
-                    # in the instance case the resulting ids are directly used
-                    if current_attribute == "instance":
-                        there_was_an_instance_rendering = True
-                        resulting_map = segmap
-                        was_used = True
-                    else:
-                        if current_attribute != "cp_category_id":
-                            list_of_attributes.append(current_attribute)
-                        # for the current attribute remove cp_ and _csv, if present
-                        attribute = current_attribute
-                        if attribute.startswith("cp_"):
-                            attribute = attribute[len("cp_"):]
-                        # check if a default value was specified
-                        default_value_set = False
-                        if current_attribute in default_values or attribute in default_values:
-                            default_value_set = True
-                            if current_attribute in default_values:
-                                default_value = default_values[current_attribute]
-                            elif attribute in default_values:
-                                default_value = default_values[attribute]
-                        # iterate over all object ids
-                        for object_id in object_ids:
-                            # Convert np.uint8 to int, such that the save_in_csv_attributes dict can later be serialized
-                            object_id = int(object_id)
-                            # get the corresponding object via the id
-                            current_obj = objects[object_id]
-                            # if the current obj has a attribute with that name -> get it
-                            if hasattr(current_obj, attribute):
-                                value = getattr(current_obj, attribute)
-                            # if the current object has a custom property with that name -> get it
-                            elif current_attribute.startswith("cp_") and attribute in current_obj:
-                                value = current_obj[attribute]
-                            elif current_attribute.startswith("cf_"):
-                                if current_attribute == "cf_basename":
-                                    value = current_obj.name
-                                    if "." in value:
-                                        value = value[:value.rfind(".")]
-                            elif default_value_set:
-                                # if none of the above applies use the default value
-                                value = default_value
-                                num_default_values += 1
-                            else:
-                                # if the requested current_attribute is not a custom property or an attribute
-                                # or there is a default value stored
-                                # it throws an exception
-                                raise RuntimeError(f"The obj: {current_obj.name} does not have the "
-                                                   f"attribute: {current_attribute}, striped: {attribute}. "
-                                                   f"Maybe try a default value.")
-
-                            # save everything which is not instance also in the .csv
-                            if isinstance(value, (int, float, np.integer, np.floating)):
-                                was_used = True
-                                resulting_map[segmap == object_id] = value
-
-                            if object_id in save_in_csv_attributes:
-                                save_in_csv_attributes[object_id][attribute] = value
-                            else:
-                                save_in_csv_attributes[object_id] = {attribute: value}
-
-                    if was_used and num_default_values < len(object_ids):
-                        channels.append(org_attribute)
-                        combined_result_map.append(resulting_map)
-                        return_dict.setdefault(f"{org_attribute}_segmaps{suffix}", []).append(resulting_map)
-
-                fname = final_segmentation_file_path + f"{frame:04d}" + suffix
-                # combine all resulting images to one image
-                resulting_map = np.stack(combined_result_map, axis=2)
-                # remove the unneeded third dimension
-                if resulting_map.shape[2] == 1:
-                    resulting_map = resulting_map[:, :, 0]
-                # TODO: Remove unnecessary save when we give up backwards compatibility
-                np.save(fname, resulting_map)
-
-            if there_was_an_instance_rendering:
-                mappings = []
-                for object_id, attribute_dict in save_in_csv_attributes.items():
-                    mappings.append({"idx": object_id, **attribute_dict})
-                return_dict.setdefault("instance_attribute_maps", []).append(mappings)
-
-                # write color mappings to file
-                # TODO: Remove unnecessary csv file when we give up backwards compatibility
-                csv_file_path = os.path.join(output_dir, segcolormap_output_file_prefix + f"{frame:04d}.csv")
-                with open(csv_file_path, 'w', newline='', encoding="utf-8") as csvfile:
-                    # get from the first element the used field names
-                    fieldnames = ["idx"]
-                    # get all used object element keys
-                    for object_element in save_in_csv_attributes.values():
-                        fieldnames.extend(list(object_element.keys()))
-                        break
-                    for channel_name in channels:
-                        fieldnames.append(f"channel_{channel_name}")
-                    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                    writer.writeheader()
-                    # save for each object all values in one row
-                    for obj_idx, object_element in save_in_csv_attributes.items():
-                        object_element["idx"] = obj_idx
-                        for i, channel_name in enumerate(channels):
-                            object_element[f"channel_{channel_name}"] = i
-                        writer.writerow(object_element)
-            else:
-                if len(list_of_attributes) > 0:
-                    raise RuntimeError(f"There were attributes specified in the may_by, which could not be saved as "
-                                       f"there was no \"instance\" may_by key used. This is true for this/these "
-                                       f"keys: {', '.join(list_of_attributes)}")
-                # if there was no instance rendering no .csv file is generated!
-                # delete all saved info about .csv
-                save_in_csv_attributes = {}
+        return_dict, wrote_csv_files = _save_segmaps(temporary_segmentation_file_path, objects,
+                                                     num_splits_per_dimension, render_colorspace_size_per_dimension,
+                                                     map_by, default_values, final_segmentation_file_path, output_dir,
+                                                     segcolormap_output_file_prefix, num_decode_threads)
 
     Utility.register_output(output_dir, file_prefix, output_key, ".npy", "2.0.0")
 
-    if save_in_csv_attributes:
+    if wrote_csv_files:
         Utility.register_output(output_dir,
                                 segcolormap_output_file_prefix,
                                 segcolormap_output_key,
@@ -255,6 +113,288 @@ def render_segmap(output_dir: Optional[str] = None, temp_dir: Optional[str] = No
     return return_dict
 
 
+def _save_segmaps(temporary_segmentation_file_path: str, objects: List[Union[bpy.types.Object, bpy.types.World]],
+                  num_splits_per_dimension: Optional[int], render_colorspace_size_per_dimension: int,
+                  map_by: Union[str, List[str]], default_values: Dict[str, Any], final_segmentation_file_path: str,
+                  output_dir: str, segcolormap_output_file_prefix: str, num_decode_threads: int) \
+        -> Tuple[Dict[str, Union[np.ndarray, List[np.ndarray]]], bool]:
+    """ Decodes the rendered segmentation images, maps the object ids to the requested attributes and saves the
+    resulting segmaps as .npy files and the instance attribute maps as .csv files.
+
+    This reads the attributes of the given objects, so it has to be called before the scene changes.
+
+    :param temporary_segmentation_file_path: The path prefix of the rendered .exr files.
+    :param objects: The list mapping ids in the rendered images back to the objects.
+    :param num_splits_per_dimension: The number of splits per dimension of the used color space. If None, the images
+                                     contain the object index pass.
+    :param render_colorspace_size_per_dimension: The size per dimension of the used color space.
+    :param map_by: The attributes to be used for color mapping.
+    :param default_values: The default values used for the keys used in attributes.
+    :param final_segmentation_file_path: The path prefix of the .npy files to write.
+    :param output_dir: The directory to write the .csv files to.
+    :param segcolormap_output_file_prefix: The prefix to use for writing the segmentation-color map csv.
+    :param num_decode_threads: The number of threads used to decode the rendered frames, see render_segmap().
+    :return: The dict of lists of segmaps and (for instance segmentation) instance attribute maps and whether
+             .csv files have been written.
+    """
+    attributes = map_by
+    default_values = dict(default_values)
+    if 'class' in default_values:
+        default_values['cp_category_id'] = default_values['class']
+
+    # Find optimal dtype of output based on max index
+    for dtype in [np.uint8, np.uint16, np.uint32]:
+        optimal_dtype = dtype
+        if np.iinfo(optimal_dtype).max >= len(objects) - 1:
+            break
+
+    if isinstance(attributes, str):
+        # only one result is requested
+        result_channels = 1
+        attributes = [attributes]
+    elif isinstance(attributes, list):
+        result_channels = len(attributes)
+    else:
+        raise RuntimeError(f"The type of this is not supported here: {attributes}")
+
+    # define them for the avoid rendering case
+    there_was_an_instance_rendering = False
+    list_of_attributes: List[str] = []
+
+    # Check if stereo is enabled
+    if bpy.context.scene.render.use_multiview:
+        suffixes = ["_L", "_R"]
+    else:
+        suffixes = [""]
+
+    return_dict: Dict[str, Union[np.ndarray, List[np.ndarray]]] = {}
+
+    # The attribute values of the objects do not change between frames, so they are resolved only once per
+    # object and attribute and stored in lookup tables, which map object ids to the value of the attribute
+    resolved_attributes: Dict[str, Dict[int, Tuple[Any, bool]]] = {}
+    attribute_luts: Dict[str, np.ndarray] = {}
+
+    # Decoding the rendered frames does not access any blender data, so it can happen in parallel to the
+    # post-processing of the previous frames
+    file_paths = [temporary_segmentation_file_path + f"{frame:04d}" + suffix + ".exr"
+                  for frame in range(bpy.context.scene.frame_start, bpy.context.scene.frame_end)
+                  for suffix in suffixes]
+    decoded_segmaps = _iterate_decoded_segmaps(file_paths, num_splits_per_dimension,
+                                               render_colorspace_size_per_dimension, optimal_dtype,
+                                               num_decode_threads)
+
+    # After rendering
+    for frame in range(bpy.context.scene.frame_start, bpy.context.scene.frame_end):  # for each rendered frame
+        save_in_csv_attributes: Dict[int, Dict[str, Any]] = {}
+
+        there_was_an_instance_rendering = False
+        for suffix in suffixes:
+            file_path, segmap, object_id_counts = next(decoded_segmaps)
+            print(file_path, segmap.shape)
+
+            # The visible object ids have been determined in one pass over the segmap
+            if len(object_id_counts) > len(objects):
+                raise Exception("There are more object colors than there are objects")
+            object_ids = np.flatnonzero(object_id_counts)
+            combined_result_map = []
+            list_of_attributes = []
+            channels = []
+            for channel_id in range(result_channels):
+                num_default_values = 0
+                was_used = False
+                current_attribute = attributes[channel_id]
+                org_attribute = current_attribute
+
+                # if the class is used the category_id attribute is evaluated
+                if current_attribute == "class":
+                    current_attribute = "cp_category_id"
+                # in the instance case the resulting ids are directly used
+                if current_attribute == "instance":
+                    there_was_an_instance_rendering = True
+                    resulting_map = segmap
+                    was_used = True
+                else:
+                    if current_attribute != "cp_category_id":
+                        list_of_attributes.append(current_attribute)
+                    # for the current attribute remove cp_ and _csv, if present
+                    attribute = current_attribute
+                    if attribute.startswith("cp_"):
+                        attribute = attribute[len("cp_"):]
+                    # check if a default value was specified
+                    default_value_set = False
+                    default_value = None
+                    if current_attribute in default_values or attribute in default_values:
+                        default_value_set = True
+                        if current_attribute in default_values:
+                            default_value = default_values[current_attribute]
+                        elif attribute in default_values:
+                            default_value = default_values[attribute]
+
+                    resolved_values = resolved_attributes.setdefault(current_attribute, {})
+                    lut = attribute_luts.setdefault(current_attribute, np.zeros(len(objects), dtype=optimal_dtype))
+                    # iterate over all visible object ids
+                    for object_id in object_ids:
+                        # Convert np.uint8 to int, such that the save_in_csv_attributes dict can later be serialized
+                        object_id = int(object_id)
+                        if object_id not in resolved_values:
+                            value, is_default_value = _get_segmap_attribute_value(
+                                objects[object_id], current_attribute, attribute, default_value_set, default_value)
+                            resolved_values[object_id] = (value, is_default_value)
+                            if isinstance(value, (int, float, np.integer, np.floating)):
+                                lut[object_id] = value
+                        value, is_default_value = resolved_values[object_id]
+                        if is_default_value:
+                            num_default_values += 1
+
+                        # save everything which is not instance also in the .csv
+                        if isinstance(value, (int, float, np.integer, np.floating)):
+                            was_used = True
+
+                        if object_id in save_in_csv_attributes:
+                            save_in_csv_attributes[object_id][attribute] = value
+                        else:
+                            save_in_csv_attributes[object_id] = {attribute: value}
+
+                    # Map all pixels at once via the lookup table
+                    resulting_map = lut[segmap]
+
+                if was_used and num_default_values < len(object_ids):
+                    channels.append(org_attribute)
+                    combined_result_map.append(resulting_map)
+                    return_dict.setdefault(f"{org_attribute}_segmaps{suffix}", []).append(resulting_map)
+
+            fname = final_segmentation_file_path + f"{frame:04d}" + suffix
+            # combine all resulting images to one image
+            resulting_map = np.stack(combined_result_map, axis=2)
+            # remove the unneeded third dimension
+            if resulting_map.shape[2] == 1:
+                resulting_map = resulting_map[:, :, 0]
+            # TODO: Remove unnecessary save when we give up backwards compatibility
+            np.save(fname, resulting_map)
+
+        if there_was_an_instance_rendering:
+            mappings = []
+            for object_id, attribute_dict in save_in_csv_attributes.items():
+                mappings.append({"idx": object_id, **attribute_dict})
+            return_dict.setdefault("instance_attribute_maps", []).append(mappings)
+
+            # write color mappings to file
+            # TODO: Remove unnecessary csv file when we give up backwards compatibility
+            csv_file_path = os.path.join(output_dir, segcolormap_output_file_prefix + f"{frame:04d}.csv")
+            with open(csv_file_path, 'w', newline='', encoding="utf-8") as csvfile:
+                # get from the first element the used field names
+                fieldnames = ["idx"]
+                # get all used object element keys
+                for object_element in save_in_csv_attributes.values():
+                    fieldnames.extend(list(object_element.keys()))
+                    break
+                for channel_name in channels:
+                    fieldnames.append(f"channel_{channel_name}")
+                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                writer.writeheader()
+                # save for each object all values in one row
+                for obj_idx, object_element in save_in_csv_attributes.items():
+                    object_element["idx"] = obj_idx
+                    for i, channel_name in enumerate(channels):
+                        object_element[f"channel_{channel_name}"] = i
+                    writer.writerow(object_element)
+        else:
+            if len(list_of_attributes) > 0:
+                raise RuntimeError(f"There were attributes specified in the may_by, which could not be saved as "
+                                   f"there was no \"instance\" may_by key used. This is true for this/these "
+                                   f"keys: {', '.join(list_of_attributes)}")
+            # if there was no instance rendering no .csv file is generated!
+            # delete all saved info about .csv
+            save_in_csv_attributes = {}
+
+    return return_dict, bool(save_in_csv_attributes)
+
+
+def _decode_segmap(file_path: str, num_splits_per_dimension: Optional[int], render_colorspace_size_per_dimension: int,
+                   dtype: type) -> Tuple[str, np.ndarray, np.ndarray]:
+    """ Loads a rendered segmentation image and maps its colors back to object ids.
+
+    :param file_path: The path to the rendered .exr file.
+    :param num_splits_per_dimension: The number of splits per dimension of the used color space. If None, the image
+                                     contains the object index pass, whose values are directly used as ids.
+    :param render_colorspace_size_per_dimension: The size per dimension of the used color space.
+    :param dtype: The dtype of the resulting segmap.
+    :return: The file path, the segmap containing the object ids and the number of pixels per object id.
+    """
+    segmentation = load_image(file_path)
+    if num_splits_per_dimension is None:
+        segmap = np.rint(segmentation[:, :, 0]).astype(dtype)
+    else:
+        segmap = Utility.map_back_from_equally_spaced_equidistant_values(segmentation, num_splits_per_dimension,
+                                                                         render_colorspace_size_per_dimension)
+        segmap = segmap.astype(dtype)
+    return file_path, segmap, np.bincount(segmap.ravel())
+
+
+def _iterate_decoded_segmaps(file_paths: List[str], num_splits_per_dimension: Optional[int],
+                             render_colorspace_size_per_dimension: int, dtype: type,
+                             num_threads: int) -> Iterator[Tuple[str, np.ndarray, np.ndarray]]:
+    """ Decodes the given segmentation images, see _decode_segmap(), and yields them in the given order.
+
+    If threads are used, at most 2 * num_threads decoded segmaps are waiting to be consumed at the same time.
+
+    :param file_paths: The paths to the rendered .exr files.
+    :param num_splits_per_dimension: The number of splits per dimension of the used color space.
+    :param render_colorspace_size_per_dimension: The size per dimension of the used color space.
+    :param dtype: The dtype of the resulting segmaps.
+    :param num_threads: The number of threads to use for decoding. If 0, all images are decoded sequentially.
+    :return: An iterator over the file path, segmap and number of pixels per object id of each image.
+    """
+    decode = partial(_decode_segmap, num_splits_per_dimension=num_splits_per_dimension,
+                     render_colorspace_size_per_dimension=render_colorspace_size_per_dimension, dtype=dtype)
+    if num_threads <= 0:
+        for file_path in file_paths:
+            yield decode(file_path)
+        return
+
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        pending: deque = deque()
+        for file_path in file_paths:
+            if len(pending) >= 2 * num_threads:
+                yield pending.popleft().result()
+            pending.append(executor.submit(decode, file_path))
+        while pending:
+            yield pending.popleft().result()
+
+
+def _get_segmap_attribute_value(obj: bpy.types.Object, current_attribute: str, attribute: str,
+                                default_value_set: bool, default_value: Any) -> Tuple[Any, bool]:
+    """ Determines the value of the given map_by attribute for the given object.
+
+    :param obj: The object to get the value from.
+    :param current_attribute: The requested attribute, e.g. "cp_category_id" or "name".
+    :param attribute: The requested attribute without the "cp_" prefix.
+    :param default_value_set: True, if there is a default value for the attribute.
+    :param default_value: The default value which is used if the object does not have the attribute.
+    :return: The value and whether the default value has been used.
+    """
+    # if the current obj has a attribute with that name -> get it
+    if hasattr(obj, attribute):
+        return getattr(obj, attribute), False
+    # if the current object has a custom property with that name -> get it
+    if current_attribute.startswith("cp_") and attribute in obj:
+        return obj[attribute], False
+    if current_attribute == "cf_basename":
+        value = obj.name
+        if "." in value:
+            value = value[:value.rfind(".")]
+        return value, False
+    if default_value_set:
+        # if none of the above applies use the default value
+        return default_value, True
+    # if the requested current_attribute is not a custom property or an attribute
+    # or there is a default value stored
+    # it throws an exception
+    raise RuntimeError(f"The obj: {obj.name} does not have the "
+                       f"attribute: {current_attribute}, striped: {attribute}. "
+                       f"Maybe try a default value.")
+
+
 def _colorize_object(obj: bpy.types.Object, color: mathutils.Vector, use_alpha_channel: bool):
     """ Adjusts the materials of the given object, s.t. they are ready for rendering the seg map.
 
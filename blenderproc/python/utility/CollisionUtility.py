@@ -9,31 +9,270 @@
 from blenderproc.python.types.MeshObjectUtility import MeshObject
 
 
+class BroadPhaseIndex:
+    """
+    Broad-phase collision index over the world axis-aligned bounding boxes of mesh objects.
+
+    The boxes are kept sorted by their minimum along the x-axis (sweep and prune), so a query only compares the boxes
+    which start before the queried box ends. The box of an object is only recomputed when it is added or updated,
+    which has to be done whenever the object has been moved.
+    """
+
+    def __init__(self, objects: Optional[List[MeshObject]] = None):
+        """
+        :param objects: The objects which are initially added to the index.
+        """
+        self._objects: List[MeshObject] = []
+        self._object_set = set()
+        self._mins = np.empty((0, 3))
+        self._maxs = np.empty((0, 3))
+        if objects is not None:
+            for obj in objects:
+                self.update(obj)
+
+    def __len__(self) -> int:
+        return len(self._objects)
+
+    def __contains__(self, obj: MeshObject) -> bool:
+        return obj in self._object_set
+
+    @staticmethod
+    def compute_aabb(obj: MeshObject) -> Tuple[np.ndarray, np.ndarray]:
+        """ Computes the axis-aligned bounding box around the world bounding box of the given object.
+
+        :param obj: The mesh object.
+        :return: The minimum and the maximum point of the box.
+        """
+        bound_box = np.array(obj.get_bound_box())
+        return np.min(bound_box, axis=0), np.max(bound_box, axis=0)
+
+    def update(self, obj: MeshObject):
+        """ Adds the given object or recomputes its box, if it is already part of the index.
+
+        :param obj: The object to add or update.
+        """
+        self.remove(obj)
+        min_point, max_point = BroadPhaseIndex.compute_aabb(obj)
+        row = int(np.searchsorted(self._mins[:, 0], min_point[0], side="right"))
+        self._mins = np.insert(self._mins, row, min_point, axis=0)
+        self._maxs = np.insert(self._maxs, row, max_point, axis=0)
+        self._objects.insert(row, obj)
+        self._object_set.add(obj)
+
+    def remove(self, obj: MeshObject):
+        """ Removes the given object from the index, if it is part of it.
+
+        :param obj: The object to remove.
+        """
+        if obj in self._object_set:
+            row = self._objects.index(obj)
+            self._mins = np.delete(self._mins, row, axis=0)
+            self._maxs = np.delete(self._maxs, row, axis=0)
+            del self._objects[row]
+            self._object_set.remove(obj)
+
+    def query(self, obj: MeshObject) -> List[MeshObject]:
+        """ Returns all objects in the index whose boxes intersect with the box of the given object.
+
+        The box of the given object is computed from its current pose, the object itself is never returned.
+
+        :param obj: The object to check.
+        :return: The objects whose boxes intersect, touching boxes are also counted as intersecting.
+        """
+        min_point, max_point = BroadPhaseIndex.compute_aabb(obj)
+        # Only boxes which start before the queried box ends can intersect
+        end = np.searchsorted(self._mins[:, 0], max_point[0], side="right")
+        overlapping = np.all(self._maxs[:end] >= min_point, axis=1) & np.all(self._mins[:end] <= max_point, axis=1)
+        return [self._objects[row] for row in np.flatnonzero(overlapping) if self._objects[row] != obj]
+
+
+class BVHCache:
+    """
+    Cache of bvh trees of meshes.
+
+    The local space trees are keyed by the mesh data, so they stay valid when an object is moved and are shared between
+    all objects using the same mesh. For the overlap checks, a world space tree is built per object from the cached
+    local vertices and kept as long as the pose of the object does not change. So objects which have already been
+    placed only get their tree built once, while an object which is moved gets one new tree per pose, which is then
+    used for all of its checks. Points are transformed into the local space of an object to check if they are inside
+    of it.
+
+    Changes to the geometry of a mesh are only detected if they change the number of vertices or polygons. Therefore,
+    after editing the geometry of a mesh, its entry has to be removed via `invalidate`.
+    """
+
+    def __init__(self):
+        # mesh name -> (local bvh tree, local vertices [N, 3], triangles [M, 3], number of polygons)
+        self._entries: Dict[str, Tuple[mathutils.bvhtree.BVHTree, np.ndarray, np.ndarray, int]] = {}
+        # object name -> (mesh name, local2world matrix, world bvh tree)
+        self._world_trees: Dict[str, Tuple[str, np.ndarray, mathutils.bvhtree.BVHTree]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.world_tree_builds = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, obj: MeshObject) -> Tuple[mathutils.bvhtree.BVHTree, np.ndarray, np.ndarray]:
+        """ Returns the local space bvh tree of the mesh of the given object, builds it if necessary.
+
+        The cached tree is only rebuilt, if the number of vertices or polygons of the mesh has changed, see
+        `invalidate`.
+
+        :param obj: The mesh object.
+        :return: The bvh tree, the local vertices with shape [N, 3] and the triangles with shape [M, 3].
+        """
+        mesh = obj.get_mesh()
+        entry = self._entries.get(mesh.name)
+        if entry is not None and len(entry[1]) == len(mesh.vertices) and entry[3] == len(mesh.polygons):
+            self.hits += 1
+            return entry[:3]
+
+        self.misses += 1
+        # The world space trees have been built from the old geometry
+        self._remove_world_trees(mesh.name)
+        vertices = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", vertices)
+        vertices = vertices.reshape(-1, 3).astype(np.float64)
+        mesh.calc_loop_triangles()
+        triangles = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("vertices", triangles)
+        triangles = triangles.reshape(-1, 3)
+        bvh_tree = mathutils.bvhtree.BVHTree.FromPolygons(vertices.tolist(), triangles.tolist(), all_triangles=True)
+        self._entries[mesh.name] = (bvh_tree, vertices, triangles, len(mesh.polygons))
+        return bvh_tree, vertices, triangles
+
+    def get_world_tree(self, obj: MeshObject) -> mathutils.bvhtree.BVHTree:
+        """ Returns the bvh tree of the given object in world space, builds it if the object has been moved.
+
+        The tree is built by transforming the cached local vertices of the mesh, see `get`.
+
+        :param obj: The mesh object.
+        :return: The bvh tree in world space.
+        """
+        _, vertices, triangles = self.get(obj)
+        mesh_name = obj.get_mesh().name
+        local2world = np.array(obj.get_local2world_mat())
+        world_entry = self._world_trees.get(obj.get_name())
+        if world_entry is not None and world_entry[0] == mesh_name and np.array_equal(world_entry[1], local2world):
+            return world_entry[2]
+
+        self.world_tree_builds += 1
+        world_vertices = vertices @ local2world[:3, :3].T + local2world[:3, 3]
+        world_tree = mathutils.bvhtree.BVHTree.FromPolygons(world_vertices.tolist(), triangles.tolist(),
+                                                            all_triangles=True)
+        self._world_trees[obj.get_name()] = (mesh_name, local2world, world_tree)
+        return world_tree
+
+    def _remove_world_trees(self, mesh_name: str):
+        """ Removes the world space trees of all objects using the given mesh.
+
+        :param mesh_name: The name of the mesh.
+        """
+        for obj_name in [obj_name for obj_name, (world_mesh_name, _, _) in self._world_trees.items()
+                         if world_mesh_name == mesh_name]:
+            del self._world_trees[obj_name]
+
+    def invalidate(self, obj: MeshObject):
+        """ Removes the trees of the mesh of the given object, e.q. after its geometry has changed.
+
+        This also removes the world space trees of all objects using this mesh.
+
+        :param obj: The mesh object.
+        """
+        mesh_name = obj.get_mesh().name
+        self._entries.pop(mesh_name, None)
+        self._remove_world_trees(mesh_name)
+
+    def clear(self):
+        """ Removes all trees and resets the statistics. """
+        self._entries.clear()
+        self._world_trees.clear()
+        self.hits = 0
+        self.misses = 0
+        self.world_tree_builds = 0
+
+    def overlap(self, obj1: MeshObject, obj2: MeshObject) -> bool:
+        """ Checks if the meshes of the two objects overlap at their current poses.
+
+        :param obj1: The first mesh object.
+        :param obj2: The second mesh object.
+        :return: True, if the meshes overlap.
+        """
+        return len(self.get_world_tree(obj1).overlap(self.get_world_tree(obj2))) > 0
+
+    def is_point_inside(self, obj: MeshObject, point: Union[Vector, np.ndarray]) -> bool:
+        """ Checks whether the given point in world space is inside the given object.
+
+        This only works if the given object is watertight and has correct normals.
+
+        :param obj: The mesh object.
+        :param point: The point in world space.
+        :return: True, if the point is inside the object.
+        """
+        tree, _, _ = self.get(obj)
+        local_point = np.linalg.inv(obj.get_local2world_mat()) @ np.append(point, 1.0)
+        local_point = Vector(local_point[:3])
+        # Look for closest point on object
+        nearest, normal, _, _ = tree.find_nearest(local_point)
+        # The sign of the dot product between direction and normal is the same in local and in world space
+        return (nearest - local_point).dot(normal) >= 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """ Returns statistics about the cache.
+
+        The memory is the size of the cached vertex and triangle arrays the trees are built from, the trees
+        themselves have a size in the same order of magnitude.
+
+        :return: The number of hits and misses, the hit rate, the number of cached trees, the number of built and
+                 cached world space trees and the memory in bytes.
+        """
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests > 0 else 0.0,
+            "num_trees": len(self._entries),
+            "world_tree_builds": self.world_tree_builds,
+            "num_world_trees": len(self._world_trees),
+            "memory_bytes": sum(entry[1].nbytes + entry[2].nbytes for entry in self._entries.values())
+        }
+
+
 class CollisionUtility:
     """
     This class provides utility functions to check if two objects intersect with each other.
     """
 
     @staticmethod
-    def check_intersections(obj: MeshObject, bvh_cache: Optional[Dict[str, mathutils.bvhtree.BVHTree]],
+    def check_intersections(obj: MeshObject,
+                            bvh_cache: Optional[Union[Dict[str, mathutils.bvhtree.BVHTree], BVHCache]],
                             objects_to_check_against: List[MeshObject],
-                            list_of_objects_with_no_inside_check: List[MeshObject]):
+                            list_of_objects_with_no_inside_check: List[MeshObject],
+                            broad_phase: Optional[BroadPhaseIndex] = None):
         """ Checks if an object intersects with any object given in the list.
 
         The bvh_cache adds all current objects to the bvh tree, which increases the speed.
 
+        If a broad_phase index is given, the bounding boxes of all objects in it are not recomputed. Instead, only the
+        objects returned by the index are checked for mesh intersections.
+
         If an object is already in the cache it is removed, before performing the check.
 
         :param obj: Object which should be checked. Type: :class:`bpy.types.Object`
         :param bvh_cache: Dict of all the bvh trees, removes the `obj` from the cache before adding it again. \
+                          Alternatively, a `BVHCache`, whose trees stay valid when the objects are moved. \
                           Type: :class:`dict`
         :param objects_to_check_against: List of objects which the object is checked again \
                                          Type: :class:`list`
         :param list_of_objects_with_no_inside_check: List of objects on which no inside check is performed. \
                                                      This check is only done for the objects in \
                                                      `objects_to_check_against`. Type: :class:`list`
+        :param broad_phase: An index containing the up-to-date bounding boxes of (a subset of) the objects in
+                            `objects_to_check_against`. Objects which are not in the index are checked as usual.
         :return: Type: :class:`bool`, True if no collision was found, false if at least one collision was found
         """
+        broad_phase_candidates = set(broad_phase.query(obj)) if broad_phase is not None else set()
 
         no_collision = True
         # Now check for collisions
@@ -42,7 +281,10 @@ def check_intersections(obj: MeshObject, bvh_cache: Optional[Dict[str, mathutils
             if collision_obj == obj:
                 continue
             # First check if bounding boxes collides
-            intersection = CollisionUtility.check_bb_intersection(obj, collision_obj)
+            if broad_phase is not None and collision_obj in broad_phase:
+                intersection = collision_obj in broad_phase_candidates
+            else:
+                intersection = CollisionUtility.check_bb_intersection(obj, collision_obj)
             # if they do
             if intersection:
                 skip_inside_check = collision_obj in list_of_objects_with_no_inside_check
@@ -115,8 +357,8 @@ def is_overlapping_1D(x_min_1, x_max_1, x_min_2, x_max_2):
 
     @staticmethod
     def check_mesh_intersection(obj1: MeshObject, obj2: MeshObject, skip_inside_check: bool = False,
-                                bvh_cache: Optional[Dict[str, mathutils.bvhtree.BVHTree]] = None) \
-            -> Tuple[bool, Dict[str, mathutils.bvhtree.BVHTree]]:
+                                bvh_cache: Optional[Union[Dict[str, mathutils.bvhtree.BVHTree], BVHCache]] = None) \
+            -> Tuple[bool, Union[Dict[str, mathutils.bvhtree.BVHTree], BVHCache]]:
         """
         Checks if the two objects are intersecting.
 
@@ -130,6 +372,7 @@ def check_mesh_intersection(obj1: MeshObject, obj2: MeshObject, skip_inside_chec
         :param obj2: object 2 to check for intersection, must be a mesh
         :param skip_inside_check: Disables checking whether one object is completely inside the other.
         :param bvh_cache: Dict of all the bvh trees, removes the `obj` from the cache before adding it again.
+                          Alternatively, a `BVHCache`, whose trees stay valid when the objects are moved.
         :return: True, if they are intersecting
         """
 
@@ -140,28 +383,40 @@ def check_mesh_intersection(obj1: MeshObject, obj2: MeshObject, skip_inside_chec
         if len(obj1.get_mesh().vertices) == 0 or len(obj2.get_mesh().vertices) == 0:
             return False, bvh_cache
 
-        # create bvhtree for obj1
-        if obj1.get_name() not in bvh_cache:
-            obj1_BVHtree = obj1.create_bvh_tree()
-            bvh_cache[obj1.get_name()] = obj1_BVHtree
-        else:
-            obj1_BVHtree = bvh_cache[obj1.get_name()]
+        if isinstance(bvh_cache, BVHCache):
+            # Check whether both meshes intersect
+            inter = bvh_cache.overlap(obj1, obj2)
 
-        # create bvhtree for obj2
-        if obj2.get_name() not in bvh_cache:
-            obj2_BVHtree = obj2.create_bvh_tree()
-            bvh_cache[obj2.get_name()] = obj2_BVHtree
+            def is_inside(obj: MeshObject, other_obj: MeshObject) -> bool:
+                local2world = other_obj.get_local2world_mat()
+                point = local2world[:3, :3] @ bvh_cache.get(other_obj)[1][0] + local2world[:3, 3]
+                return bvh_cache.is_point_inside(obj, point)
         else:
-            obj2_BVHtree = bvh_cache[obj2.get_name()]
-
-        # Check whether both meshes intersect
-        inter = len(obj1_BVHtree.overlap(obj2_BVHtree)) > 0
+            # create bvhtree for obj1
+            if obj1.get_name() not in bvh_cache:
+                obj1_BVHtree = obj1.create_bvh_tree()
+                bvh_cache[obj1.get_name()] = obj1_BVHtree
+            else:
+                obj1_BVHtree = bvh_cache[obj1.get_name()]
+
+            # create bvhtree for obj2
+            if obj2.get_name() not in bvh_cache:
+                obj2_BVHtree = obj2.create_bvh_tree()
+                bvh_cache[obj2.get_name()] = obj2_BVHtree
+            else:
+                obj2_BVHtree = bvh_cache[obj2.get_name()]
+
+            # Check whether both meshes intersect
+            inter = len(obj1_BVHtree.overlap(obj2_BVHtree)) > 0
+
+            def is_inside(obj: MeshObject, other_obj: MeshObject) -> bool:
+                return CollisionUtility.is_point_inside_object(obj, obj1_BVHtree if obj == obj1 else obj2_BVHtree,
+                                                               Matrix(other_obj.get_local2world_mat()) @
+                                                               other_obj.get_mesh().vertices[0].co)
 
         # Optionally check whether obj2 is contained in obj1
         if not inter and not skip_inside_check:
-            inter = CollisionUtility.is_point_inside_object(obj1, obj1_BVHtree,
-                                                            Matrix(obj2.get_local2world_mat()) @
-                                                            obj2.get_mesh().vertices[0].co)
+            inter = is_inside(obj1, obj2)
             if inter:
                 print("Warning: Detected that " + obj2.get_name() + " is completely inside " + obj1.get_name() +
                       ". This might be wrong, if " + obj1.get_name() +
@@ -170,8 +425,7 @@ def check_mesh_intersection(obj1: MeshObject, obj2: MeshObject, skip_inside_chec
 
         # Optionally check whether obj1 is contained in obj2
         if not inter and not skip_inside_check:
-            inter = CollisionUtility.is_point_inside_object(obj2, obj2_BVHtree, Matrix(obj1.get_local2world_mat())
-                                                            @ obj1.get_mesh().vertices[0].co)
+            inter = is_inside(obj2, obj1)
             if inter:
                 print("Warning: Detected that " + obj1.get_name() + " is completely inside " + obj2.get_name() +
                       ". This might be wrong, if " + obj2.get_name() + " is not water tight or has incorrect "
@@ -1,5 +1,7 @@
 """Allows rendering the content of the scene in the bop file format."""
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 import json
 from multiprocessing import Pool
@@ -34,14 +36,15 @@ def write_bop(output_dir: str, target_objects: Optional[List[MeshObject]] = None
               depth_scale: float = 1.0, jpg_quality: int = 95, save_world2cam: bool = True,
               ignore_dist_thres: float = 100., m2mm: Optional[bool] = None, annotation_unit: str = 'mm',
               frames_per_chunk: int = 1000, calc_mask_info_coco: bool = True, delta: float = 0.015,
-              num_worker: Optional[int] = 0):
+              num_worker: Optional[int] = 0, num_encode_workers: int = 0,
+              max_pending_encodes: Optional[int] = None, fuse_gt_calculation: bool = False):
     """Write the BOP data
 
     :param output_dir: Path to the output directory.
     :param target_objects: Objects for which to save ground truth poses in BOP format. Default: Save all objects or
                            from specified dataset
-    :param depths: List of depth images in m to save
-    :param colors: List of color images to save
+    :param depths: List of depth images in m to save, can also be a LazyFrameSequence returned by `render()`.
+    :param colors: List of color images to save, can also be a LazyFrameSequence returned by `render()`.
     :param color_file_format: File type to save color images. Available: "PNG", "JPEG"
     :param jpg_quality: If color_file_format is "JPEG", save with the given quality.
     :param dataset: Only save annotations for objects of the specified bop dataset. Saves all object poses if undefined.
@@ -61,6 +64,17 @@ def write_bop(output_dir: str, target_objects: Optional[List[MeshObject]] = None
     :param delta: Tolerance used for estimation of the visibility masks (in [m]).
     :param num_worker: The number of processes to use to calculate gt_masks and gt_info. If None is given, number of cores is used.
                        If 0 is given, no multiprocessing at all is used (default).
+    :param num_encode_workers: The number of threads used to encode and write the rgb and depth images, while the
+                               ground truth of the next frames is collected on the main thread. If 0 is given, all
+                               images are written serially (default).
+    :param max_pending_encodes: The maximum number of frames whose images are queued for encoding at the same time.
+                                The images are handed to the encoding threads without copying them, so they must
+                                not be modified until write_bop returns. For lazily loaded outputs, this bounds the
+                                number of decoded frames which are kept in memory by the queue.
+                                Default: 2 * num_encode_workers.
+    :param fuse_gt_calculation: If true, gt masks, gt info and gt coco annotations are calculated together in one
+                                sweep over the frames: all objects of a frame are handled by one worker task, each
+                                depth image is decoded once and each object is rendered only once.
     """
 
     # Output paths.
@@ -112,11 +126,10 @@ def write_bop(output_dir: str, target_objects: Optional[List[MeshObject]] = None
         starting_frame_id = 0
         if last_chunk_dir:
             last_chunk_gt_fpath = os.path.join(last_chunk_dir, 'scene_gt.json')
-            chunk_gt = _BopWriterUtility.load_json(last_chunk_gt_fpath, keys_to_int=True)
 
             # Current chunk and frame ID's.
             starting_chunk_id = int(os.path.basename(last_chunk_dir))
-            starting_frame_id = int(sorted(chunk_gt.keys())[-1]) + 1
+            starting_frame_id = _BopWriterUtility.get_last_json_key(last_chunk_gt_fpath) + 1
 
             if starting_frame_id % frames_per_chunk == 0:
                 starting_chunk_id += 1
@@ -130,10 +143,14 @@ def write_bop(output_dir: str, target_objects: Optional[List[MeshObject]] = None
     if m2mm is not None:
         warnings.warn("WARNING: `m2mm` is deprecated, please use `annotation_scale='mm'` instead!")
         annotation_scale = 1000.
-    _BopWriterUtility.write_frames(chunks_dir, dataset_objects=dataset_objects, depths=depths, colors=colors,
-                                   color_file_format=color_file_format, frames_per_chunk=frames_per_chunk,
-                                   annotation_scale=annotation_scale, ignore_dist_thres=ignore_dist_thres,
-                                   save_world2cam=save_world2cam, depth_scale=depth_scale, jpg_quality=jpg_quality)
+    new_annotations = _BopWriterUtility.write_frames(chunks_dir, dataset_objects=dataset_objects, depths=depths,
+                                                     colors=colors, color_file_format=color_file_format,
+                                                     frames_per_chunk=frames_per_chunk,
+                                                     annotation_scale=annotation_scale,
+                                                     ignore_dist_thres=ignore_dist_thres,
+                                                     save_world2cam=save_world2cam, depth_scale=depth_scale,
+                                                     jpg_quality=jpg_quality, num_encode_workers=num_encode_workers,
+                                                     max_pending_encodes=max_pending_encodes)
 
     if calc_mask_info_coco:
         # Set up the bop toolkit
@@ -176,15 +193,24 @@ def write_bop(output_dir: str, target_objects: Optional[List[MeshObject]] = None
         else:
             pool = Pool(num_worker, initializer=_BopWriterUtility._pyrender_init, initargs=[width, height, trimesh_objects])
 
-        _BopWriterUtility.calc_gt_masks(chunk_dirs=chunk_dirs, starting_frame_id=starting_frame_id,
-                                        annotation_scale=annotation_scale, delta=delta, pool=pool)
-         
-        _BopWriterUtility.calc_gt_info(chunk_dirs=chunk_dirs, starting_frame_id=starting_frame_id,
-                                       annotation_scale=annotation_scale, delta=delta, pool=pool)
+        if fuse_gt_calculation:
+            _BopWriterUtility.calc_gt_masks_info_coco(chunk_dirs=chunk_dirs, dataset_objects=dataset_objects,
+                                                      starting_frame_id=starting_frame_id,
+                                                      annotation_scale=annotation_scale, delta=delta, pool=pool,
+                                                      new_annotations=new_annotations)
+        else:
+            _BopWriterUtility.calc_gt_masks(chunk_dirs=chunk_dirs, starting_frame_id=starting_frame_id,
+                                            annotation_scale=annotation_scale, delta=delta, pool=pool,
+                                            new_annotations=new_annotations)
+
+            new_gt_infos = _BopWriterUtility.calc_gt_info(chunk_dirs=chunk_dirs, starting_frame_id=starting_frame_id,
+                                                          annotation_scale=annotation_scale, delta=delta, pool=pool,
+                                                          new_annotations=new_annotations)
+
+            _BopWriterUtility.calc_gt_coco(chunk_dirs=chunk_dirs, dataset_objects=dataset_objects,
+                                           starting_frame_id=starting_frame_id, new_annotations=new_annotations,
+                                           new_gt_infos=new_gt_infos)
 
-        _BopWriterUtility.calc_gt_coco(chunk_dirs=chunk_dirs, dataset_objects=dataset_objects,
-                                       starting_frame_id=starting_frame_id)
-        
         if pool is not None:
             pool.close()
             pool.join()
@@ -271,6 +297,98 @@ def save_json(path, content):
             else:
                 json.dump(content, file, sort_keys=True)
 
+    @staticmethod
+    def get_last_json_key(path: str) -> Optional[int]:
+        """ Returns the last (largest) integer key of a JSON dict written via save_json() without parsing the
+        whole file. Only the tail of the file, containing the last entry, is read.
+
+        :param path: Path to the JSON file.
+        :return: The last key or None, if the dict is empty.
+        """
+        with open(path, 'rb') as file:
+            file.seek(0, os.SEEK_END)
+            file_size = file.tell()
+            block_size = min(4096, file_size)
+            while True:
+                file.seek(file_size - block_size)
+                tail = file.read(block_size)
+                # Every entry is written in its own line, which starts with the key
+                entry_start = tail.rfind(b'\n  "')
+                if entry_start != -1:
+                    key_start = entry_start + len(b'\n  "')
+                    key = tail[key_start:tail.index(b'"', key_start)]
+                    if key.lstrip(b'-').isdigit():
+                        return int(key)
+                    break
+                if block_size == file_size:
+                    if tail.strip() == b'{\n}' or tail.strip() == b'{}':
+                        return None
+                    break
+                block_size = min(2 * block_size, file_size)
+
+        # The file has not been written via save_json(), fall back to parsing it completely
+        keys = _BopWriterUtility.load_json(path, keys_to_int=True).keys()
+        return max(keys) if keys else None
+
+    @staticmethod
+    def append_json(path: str, content: Dict[int, object]):
+        """ Appends entries to a JSON dict written via save_json() without loading or rewriting the existing entries.
+
+        The resulting file is identical to the one save_json() would write for the merged dict, as long as all new
+        keys are larger than the existing ones. If the file does not exist yet, it is created.
+
+        :param path: Path to the JSON file.
+        :param content: The entries to append.
+        """
+        if not os.path.exists(path):
+            _BopWriterUtility.save_json(path, content)
+            return
+        if not content:
+            return
+
+        text = ""
+        with open(path, 'rb+') as file:
+            file.seek(0, os.SEEK_END)
+            tail_start = max(file.tell() - 64, 0)
+            file.seek(tail_start)
+            tail = file.read()
+            # Everything in front of the closing bracket of the dict
+            body = tail[:tail.rindex(b'}')].rstrip()
+            if not body.endswith(b'{'):
+                # Separate the new entries from the existing ones, if the existing dict is not empty
+                text += ','
+
+            content_sorted = sorted(content.items(), key=lambda x: x[0])
+            for elem_id, (k, v) in enumerate(content_sorted):
+                text += f'\n  "{k}": {json.dumps(v, sort_keys=True)}'
+                if elem_id != len(content) - 1:
+                    text += ','
+            text += '\n}'
+
+            file.seek(tail_start + len(body))
+            file.write(text.encode("utf-8"))
+            file.truncate()
+
+    @staticmethod
+    def append_json_line(path: str, content: object):
+        """ Appends the given content as one line to a JSON-lines file.
+
+        :param path: Path to the JSON-lines file.
+        :param content: The content to append.
+        """
+        with open(path, 'a', encoding="utf-8") as file:
+            file.write(json.dumps(content, sort_keys=True) + '\n')
+
+    @staticmethod
+    def load_json_lines(path: str) -> List[object]:
+        """ Loads all lines of a JSON-lines file.
+
+        :param path: Path to the JSON-lines file.
+        :return: The content of each line.
+        """
+        with open(path, 'r', encoding="utf-8") as file:
+            return [json.loads(line) for line in file if line.strip()]
+
     @staticmethod
     def save_depth(path: str, im: np.ndarray):
         """Saves a depth image (16-bit) to a PNG file.
@@ -400,7 +518,8 @@ def get_frame_camera(save_world2cam: bool, depth_scale: float = 1.0, unit_scalin
     def write_frames(chunks_dir: str, dataset_objects: list, depths: List[np.ndarray],
                      colors: List[np.ndarray], color_file_format: str = "PNG",
                      depth_scale: float = 1.0, frames_per_chunk: int = 1000, annotation_scale: float = 1000.,
-                     ignore_dist_thres: float = 100., save_world2cam: bool = True, jpg_quality: int = 95):
+                     ignore_dist_thres: float = 100., save_world2cam: bool = True, jpg_quality: int = 95,
+                     num_encode_workers: int = 0, max_pending_encodes: Optional[int] = None):
         """Write each frame's ground truth into chunk directory in BOP format
 
         :param chunks_dir: Path to the output directory of the current chunk.
@@ -417,6 +536,11 @@ def write_frames(chunks_dir: str, dataset_objects: list, depths: List[np.ndarray
         :param annotation_scale: The scale factor applied to the calculated annotations (in [m]) to get them into the
                                  specified format (see `annotation_format` in `write_bop` for further details).
         :param frames_per_chunk: Number of frames saved in each chunk (called scene in BOP)
+        :param num_encode_workers: The number of threads used to encode and write the images. If 0 is given, all
+                                   images are written serially on the main thread.
+        :param max_pending_encodes: The maximum number of frames queued for encoding at the same time.
+                                    Default: 2 * num_encode_workers.
+        :return: The GT annotations and camera info of all new frames, mapped from the chunk id.
         """
 
         # Format of the depth images.
@@ -426,6 +550,7 @@ def write_frames(chunks_dir: str, dataset_objects: list, depths: List[np.ndarray
         depth_tpath = os.path.join(chunks_dir, '{chunk_id:06d}', 'depth', '{im_id:06d}' + depth_ext)
         chunk_camera_tpath = os.path.join(chunks_dir, '{chunk_id:06d}', 'scene_camera.json')
         chunk_gt_tpath = os.path.join(chunks_dir, '{chunk_id:06d}', 'scene_gt.json')
+        chunk_journal_tpath = os.path.join(chunks_dir, '{chunk_id:06d}', 'scene_journal.jsonl')
 
         # Paths to the already existing chunk folders (such folders may exist
         # when appending to an existing dataset).
@@ -437,12 +562,16 @@ def write_frames(chunks_dir: str, dataset_objects: list, depths: List[np.ndarray
         curr_frame_id = 0
         if len(chunk_dirs):
             last_chunk_dir = sorted(chunk_dirs)[-1]
-            last_chunk_gt_fpath = os.path.join(last_chunk_dir, 'scene_gt.json')
-            chunk_gt = _BopWriterUtility.load_json(last_chunk_gt_fpath, keys_to_int=True)
 
-            # Last chunk and frame ID's.
+            # Frames of an interrupted run have never been materialized into the chunk, so they are overwritten
+            last_chunk_journal_fpath = os.path.join(last_chunk_dir, 'scene_journal.jsonl')
+            if os.path.exists(last_chunk_journal_fpath):
+                warnings.warn(f"Discarding the unfinished frames of a previous run: {last_chunk_journal_fpath}")
+                os.remove(last_chunk_journal_fpath)
+
+            # Last chunk and frame ID's, only the last entry of the scene_gt.json is read.
             last_chunk_id = int(os.path.basename(last_chunk_dir))
-            last_frame_id = int(sorted(chunk_gt.keys())[-1])
+            last_frame_id = _BopWriterUtility.get_last_json_key(os.path.join(last_chunk_dir, 'scene_gt.json'))
 
             # Current chunk and frame ID's.
             curr_chunk_id = last_chunk_id
@@ -451,15 +580,8 @@ def write_frames(chunks_dir: str, dataset_objects: list, depths: List[np.ndarray
                 curr_chunk_id += 1
                 curr_frame_id = 0
 
-        # Initialize structures for the GT annotations and camera info.
-        chunk_gt = {}
-        chunk_camera = {}
-        if curr_frame_id != 0:
-            # Load GT and camera info of the chunk we are appending to.
-            chunk_gt = _BopWriterUtility.load_json(
-                chunk_gt_tpath.format(chunk_id=curr_chunk_id), keys_to_int=True)
-            chunk_camera = _BopWriterUtility.load_json(
-                chunk_camera_tpath.format(chunk_id=curr_chunk_id), keys_to_int=True)
+        # The annotations of all new frames, per chunk
+        new_annotations = {}
 
         # Go through all frames.
         num_new_frames = bpy.context.scene.frame_end - bpy.context.scene.frame_start
@@ -468,62 +590,153 @@ def write_frames(chunks_dir: str, dataset_objects: list, depths: List[np.ndarray
             raise Exception("The amount of images stored in the depths/colors does not correspond to the amount"
                             "of images specified by frame_start to frame_end.")
 
-        for frame_id in range(bpy.context.scene.frame_start, bpy.context.scene.frame_end):
-            # Activate frame.
-            bpy.context.scene.frame_set(frame_id)
-
-            # Reset data structures and prepare folders for a new chunk.
-            if curr_frame_id == 0:
-                chunk_gt = {}
-                chunk_camera = {}
-                os.makedirs(os.path.dirname(
-                    rgb_tpath.format(chunk_id=curr_chunk_id, im_id=0, im_type='PNG')))
-                os.makedirs(os.path.dirname(
-                    depth_tpath.format(chunk_id=curr_chunk_id, im_id=0)))
-
-            # Get GT annotations and camera info for the current frame.
-            chunk_gt[curr_frame_id] = _BopWriterUtility.get_frame_gt(dataset_objects, annotation_scale,
-                                                                     ignore_dist_thres)
-            chunk_camera[curr_frame_id] = _BopWriterUtility.get_frame_camera(save_world2cam, depth_scale,
-                                                                             annotation_scale)
-
-            color_rgb = colors[frame_id]
-            color_bgr = color_rgb.copy()
-            color_bgr[..., :3] = color_bgr[..., :3][..., ::-1]
-            if color_file_format == 'PNG':
-                rgb_fpath = rgb_tpath.format(chunk_id=curr_chunk_id, im_id=curr_frame_id, im_type='.png')
-                cv2.imwrite(rgb_fpath, color_bgr)
-            elif color_file_format == 'JPEG':
-                rgb_fpath = rgb_tpath.format(chunk_id=curr_chunk_id, im_id=curr_frame_id, im_type='.jpg')
-                cv2.imwrite(rgb_fpath, color_bgr, [int(cv2.IMWRITE_JPEG_QUALITY), jpg_quality])
-
-            depth = depths[frame_id]
-
-            # Scale the depth to retain a higher precision (the depth is saved
-            # as a 16-bit PNG image with range 0-65535).
-            depth_mm = 1000.0 * depth  # [m] -> [mm]
-            depth_mm_scaled = depth_mm / float(depth_scale)
-
-            # Save the scaled depth image.
-            depth_fpath = depth_tpath.format(chunk_id=curr_chunk_id, im_id=curr_frame_id)
-            _BopWriterUtility.save_depth(depth_fpath, depth_mm_scaled)
-
-            # Save the chunk info if we are at the end of a chunk or at the last new frame.
-            if ((curr_frame_id + 1) % frames_per_chunk == 0) or \
-                    (frame_id == num_new_frames - 1):
-
-                # Save GT annotations.
-                _BopWriterUtility.save_json(chunk_gt_tpath.format(chunk_id=curr_chunk_id), chunk_gt)
-
-                # Save camera info.
-                _BopWriterUtility.save_json(chunk_camera_tpath.format(chunk_id=curr_chunk_id), chunk_camera)
-
-                # Update ID's.
-                curr_chunk_id += 1
-                curr_frame_id = 0
-            else:
-                curr_frame_id += 1
-        
+        # Images are encoded either directly or by a bounded pool of threads, which allows to collect the ground
+        # truth of the next frames while the previous ones are still being encoded.
+        executor = ThreadPoolExecutor(max_workers=num_encode_workers) if num_encode_workers > 0 else None
+        if max_pending_encodes is None:
+            max_pending_encodes = 2 * num_encode_workers
+        pending_encodes: deque = deque()
+
+        try:
+            # Iterate over the images, instead of indexing them, so lazy sequences can decode the next frames in the
+            # background
+            for frame_id, color, depth in zip(range(bpy.context.scene.frame_start, bpy.context.scene.frame_end),
+                                              colors, depths):
+                # Activate frame.
+                bpy.context.scene.frame_set(frame_id)
+
+                # Prepare folders for a new chunk.
+                if curr_frame_id == 0:
+                    os.makedirs(os.path.dirname(
+                        rgb_tpath.format(chunk_id=curr_chunk_id, im_id=0, im_type='PNG')))
+                    os.makedirs(os.path.dirname(
+                        depth_tpath.format(chunk_id=curr_chunk_id, im_id=0)))
+
+                # Get GT annotations and camera info for the current frame and record them in the journal of the
+                # chunk, so appending new frames does not require to load the existing annotations.
+                _BopWriterUtility.append_json_line(chunk_journal_tpath.format(chunk_id=curr_chunk_id), {
+                    'im_id': curr_frame_id,
+                    'scene_gt': _BopWriterUtility.get_frame_gt(dataset_objects, annotation_scale, ignore_dist_thres),
+                    'scene_camera': _BopWriterUtility.get_frame_camera(save_world2cam, depth_scale, annotation_scale)
+                })
+
+                im_type = '.png' if color_file_format == 'PNG' else '.jpg'
+                rgb_fpath = rgb_tpath.format(chunk_id=curr_chunk_id, im_id=curr_frame_id, im_type=im_type)
+                depth_fpath = depth_tpath.format(chunk_id=curr_chunk_id, im_id=curr_frame_id)
+                if executor is None:
+                    _BopWriterUtility._write_frame_images(rgb_fpath, color, color_file_format,
+                                                          jpg_quality, depth_fpath, depth, depth_scale)
+                else:
+                    # Block until the oldest frame has been written, if too many frames are waiting to be encoded.
+                    while len(pending_encodes) >= max(max_pending_encodes, 1):
+                        pending_encodes.popleft().result()
+                    pending_encodes.append(executor.submit(_BopWriterUtility._write_frame_images, rgb_fpath,
+                                                           color, color_file_format, jpg_quality,
+                                                           depth_fpath, depth, depth_scale))
+
+                # Save the chunk info if we are at the end of a chunk or at the last new frame.
+                if ((curr_frame_id + 1) % frames_per_chunk == 0) or \
+                        (frame_id == num_new_frames - 1):
+
+                    # Append the GT annotations and camera info of the new frames to the chunk.
+                    new_annotations[curr_chunk_id] = _BopWriterUtility.materialize_chunk_journal(
+                        chunk_journal_tpath.format(chunk_id=curr_chunk_id),
+                        chunk_gt_tpath.format(chunk_id=curr_chunk_id),
+                        chunk_camera_tpath.format(chunk_id=curr_chunk_id))
+
+                    # Update ID's.
+                    curr_chunk_id += 1
+                    curr_frame_id = 0
+                else:
+                    curr_frame_id += 1
+
+            # Make sure all images have been written, this also raises any exception thrown inside the threads
+            while pending_encodes:
+                pending_encodes.popleft().result()
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+        return new_annotations
+
+    @staticmethod
+    def materialize_chunk_journal(journal_path: str, chunk_gt_path: str,
+                                  chunk_camera_path: str) -> Tuple[Dict[int, list], Dict[int, dict]]:
+        """ Appends the frames recorded in the journal of a chunk to its scene_gt.json and scene_camera.json and
+        removes the journal afterwards.
+
+        Only the new frames are written, the existing annotations of the chunk are neither loaded nor rewritten.
+
+        :param journal_path: Path to the JSON-lines journal of the chunk.
+        :param chunk_gt_path: Path to the scene_gt.json of the chunk.
+        :param chunk_camera_path: Path to the scene_camera.json of the chunk.
+        :return: The GT annotations and camera info of the new frames.
+        """
+        chunk_gt, chunk_camera = {}, {}
+        for frame in _BopWriterUtility.load_json_lines(journal_path):
+            chunk_gt[frame['im_id']] = frame['scene_gt']
+            chunk_camera[frame['im_id']] = frame['scene_camera']
+
+        _BopWriterUtility.append_json(chunk_gt_path, chunk_gt)
+        _BopWriterUtility.append_json(chunk_camera_path, chunk_camera)
+        os.remove(journal_path)
+        return chunk_gt, chunk_camera
+
+    @staticmethod
+    def _write_frame_images(rgb_fpath: str, color_rgb: np.ndarray, color_file_format: str, jpg_quality: int,
+                            depth_fpath: str, depth: np.ndarray, depth_scale: float):
+        """ Encodes and writes the color and depth image of one frame.
+
+        Does not access any blender data and can therefore be run in a separate thread.
+
+        :param rgb_fpath: Path to the output color image.
+        :param color_rgb: The color image to save.
+        :param color_file_format: File type to save color images. Available: "PNG", "JPEG"
+        :param jpg_quality: If color_file_format is "JPEG", save with the given quality.
+        :param depth_fpath: Path to the output depth image.
+        :param depth: The depth image in m to save.
+        :param depth_scale: Multiply the uint16 output depth image with this factor to get depth in mm.
+        """
+        color_bgr = color_rgb.copy()
+        color_bgr[..., :3] = color_bgr[..., :3][..., ::-1]
+        if color_file_format == 'PNG':
+            cv2.imwrite(rgb_fpath, color_bgr)
+        elif color_file_format == 'JPEG':
+            cv2.imwrite(rgb_fpath, color_bgr, [int(cv2.IMWRITE_JPEG_QUALITY), jpg_quality])
+
+        # Scale the depth to retain a higher precision (the depth is saved
+        # as a 16-bit PNG image with range 0-65535).
+        depth_mm = 1000.0 * depth  # [m] -> [mm]
+        depth_mm_scaled = depth_mm / float(depth_scale)
+
+        # Save the scaled depth image.
+        _BopWriterUtility.save_depth(depth_fpath, depth_mm_scaled)
+
+    @staticmethod
+    def load_new_chunk_annotations(chunk_dir: str, first_frame_id: int = 0,
+                                   new_annotations: Optional[Dict[int, Tuple[dict, dict]]] = None) \
+            -> Tuple[Dict[int, list], Dict[int, dict]]:
+        """ Returns the GT annotations and camera info of all frames of the chunk starting at the given frame id.
+
+        If the annotations have been returned by write_frames(), they are reused instead of parsing the
+        scene_gt.json and scene_camera.json of the chunk again.
+
+        :param chunk_dir: The chunk directory.
+        :param first_frame_id: The first frame id whose annotations should be returned.
+        :param new_annotations: The annotations of the new frames, as returned by write_frames().
+        :return: The GT annotations and camera info, mapped from the frame id.
+        """
+        chunk_id = int(os.path.basename(chunk_dir))
+        if new_annotations is not None and chunk_id in new_annotations:
+            scene_gt, scene_camera = new_annotations[chunk_id]
+        else:
+            scene_gt = _BopWriterUtility.load_json(os.path.join(chunk_dir, 'scene_gt.json'), keys_to_int=True)
+            scene_camera = _BopWriterUtility.load_json(os.path.join(chunk_dir, 'scene_camera.json'),
+                                                       keys_to_int=True)
+
+        scene_gt = {im_id: gt for im_id, gt in scene_gt.items() if im_id >= first_frame_id}
+        scene_camera = {im_id: camera for im_id, camera in scene_camera.items() if im_id >= first_frame_id}
+        return scene_gt, scene_camera
 
     @staticmethod
     def _pyrender_init(ren_width: int, ren_height: int, trimesh_objects: Dict[int, trimesh.Trimesh]):
@@ -635,7 +848,8 @@ def _calc_gt_masks_iteration(annotation_scale: float, K: np.ndarray, delta: floa
 
     @staticmethod
     def calc_gt_masks(pool: Pool, chunk_dirs: List[str], starting_frame_id: int = 0,
-                      annotation_scale: float = 1000., delta: float = 0.015):
+                      annotation_scale: float = 1000., delta: float = 0.015,
+                      new_annotations: Optional[Dict[int, Tuple[dict, dict]]] = None):
         """ Calculates the ground truth masks.
         From the BOP toolkit (https://github.com/thodan/bop_toolkit), with the difference of using pyrender for depth
         rendering.
@@ -646,6 +860,8 @@ def calc_gt_masks(pool: Pool, chunk_dirs: List[str], starting_frame_id: int = 0,
         :param annotation_scale: The scale factor applied to the calculated annotations (in [m]) to get them into the
                                  specified format (see `annotation_format` in `write_bop` for further details).
         :param delta: Tolerance used for estimation of the visibility masks.
+        :param new_annotations: The annotations of the new frames, as returned by write_frames(). If not given, they
+                                are loaded from the chunk directories.
         """
         # This import is done inside to avoid having the requirement that BlenderProc depends on the bop_toolkit
         # pylint: disable=import-outside-toplevel
@@ -653,10 +869,9 @@ def calc_gt_masks(pool: Pool, chunk_dirs: List[str], starting_frame_id: int = 0,
         # pylint: enable=import-outside-toplevel
 
         for dir_counter, chunk_dir in enumerate(chunk_dirs):
-            last_chunk_gt_fpath = os.path.join(chunk_dir, 'scene_gt.json')
-            last_chunk_camera_fpath = os.path.join(chunk_dir, 'scene_camera.json')
-            scene_gt = _BopWriterUtility.load_json(last_chunk_gt_fpath, keys_to_int=True)
-            scene_camera = _BopWriterUtility.load_json(last_chunk_camera_fpath, keys_to_int=True)
+            # append to existing output
+            scene_gt, scene_camera = _BopWriterUtility.load_new_chunk_annotations(
+                chunk_dir, starting_frame_id if dir_counter == 0 else 0, new_annotations)
 
             # Create folders for the output masks (if they do not exist yet).
             mask_dir_path = os.path.dirname(os.path.join(chunk_dir, 'mask', '000000_000000.png'))
@@ -667,10 +882,6 @@ def calc_gt_masks(pool: Pool, chunk_dirs: List[str], starting_frame_id: int = 0,
 
             im_ids = sorted(scene_gt.keys())
 
-            # append to existing output
-            if dir_counter == 0:
-                im_ids = im_ids[starting_frame_id:]
-
             for im_counter, im_id in enumerate(im_ids):
                 if im_counter % 100 == 0:
                     misc.log(f'Calculating GT masks - {chunk_dir}, {im_counter}')
@@ -752,6 +963,28 @@ def _calc_gt_info_iteration(annotation_scale: float, ren_cy_offset: int, ren_cx_
         visib_gt = visibility.estimate_visib_mask_gt(
             dist_im, dist_gt, delta, visib_mode='bop19')
 
+        return _BopWriterUtility._gt_info_from_rendering(depth_gt_large, dist_gt, dist_im, visib_gt,
+                                                         ren_cy_offset, ren_cx_offset, im_size)
+
+    @staticmethod
+    def _gt_info_from_rendering(depth_gt_large: np.ndarray, dist_gt: np.ndarray, dist_im: np.ndarray,
+                                visib_gt: np.ndarray, ren_cy_offset: int, ren_cx_offset: int,
+                                im_size: Tuple[int, int]) -> Dict[str, object]:
+        """ Calculates the gt info of one object from its rendered depth image.
+
+        :param depth_gt_large: The depth image of the object rendered with the enlarged image plane.
+        :param dist_gt: The distance image of the object, cropped to the actual image plane.
+        :param dist_im: The distance image of the frame.
+        :param visib_gt: The visibility mask of the object.
+        :param ren_cy_offset: The y offset for cropping the rendered image.
+        :param ren_cx_offset: The x offset for cropping the rendered image.
+        :param im_size: The size (width, height) of the actual image.
+        :return: The gt info for the scene_gt_info.json.
+        """
+        # pylint: disable=import-outside-toplevel
+        from bop_toolkit_lib import misc
+        # pylint: enable=import-outside-toplevel
+
         # Mask of the object in the GT pose.
         obj_mask_gt_large = depth_gt_large > 0
         obj_mask_gt = dist_gt > 0
@@ -800,7 +1033,8 @@ def _calc_gt_info_iteration(annotation_scale: float, ren_cy_offset: int, ren_cx_
 
     @staticmethod
     def calc_gt_info(pool, chunk_dirs: List[str], starting_frame_id: int = 0,
-                     annotation_scale: float = 1000., delta: float = 0.015):
+                     annotation_scale: float = 1000., delta: float = 0.015,
+                     new_annotations: Optional[Dict[int, Tuple[dict, dict]]] = None) -> Dict[int, Dict[int, list]]:
         """ Calculates the ground truth masks.
         From the BOP toolkit (https://github.com/thodan/bop_toolkit), with the difference of using pyrender for depth
         rendering.
@@ -810,6 +1044,9 @@ def calc_gt_info(pool, chunk_dirs: List[str], starting_frame_id: int = 0,
         :param annotation_scale: The scale factor applied to the calculated annotations (in [m]) to get them into the
                                  specified format (see `annotation_format` in `write_bop` for further details).
         :param delta: Tolerance used for estimation of the visibility masks.
+        :param new_annotations: The annotations of the new frames, as returned by write_frames(). If not given, they
+                                are loaded from the chunk directories.
+        :return: The gt info of the new frames, mapped from the chunk id.
         """
         # This import is done inside to avoid having the requirement that BlenderProc depends on the bop_toolkit
         # pylint: disable=import-outside-toplevel
@@ -819,26 +1056,16 @@ def calc_gt_info(pool, chunk_dirs: List[str], starting_frame_id: int = 0,
         im_width, im_height = bpy.context.scene.render.resolution_x, bpy.context.scene.render.resolution_y
         ren_cx_offset, ren_cy_offset = im_width, im_height
 
+        new_gt_infos = {}
         for dir_counter, chunk_dir in enumerate(chunk_dirs):
-            last_chunk_gt_fpath = os.path.join(chunk_dir, 'scene_gt.json')
-            last_chunk_camera_fpath = os.path.join(chunk_dir, 'scene_camera.json')
-            scene_gt = _BopWriterUtility.load_json(last_chunk_gt_fpath, keys_to_int=True)
-            scene_camera = _BopWriterUtility.load_json(last_chunk_camera_fpath, keys_to_int=True)
-
-            # load existing gt info
-            if dir_counter == 0 and starting_frame_id > 0:
-                misc.log(f"Loading gt info from existing chunk dir - {chunk_dir}")
-                scene_gt_info = _BopWriterUtility.load_json(os.path.join(chunk_dir, 'scene_gt_info.json'),
-                                                            keys_to_int=True)
-            else:
-                scene_gt_info = {}
+            # append to existing output
+            appending = dir_counter == 0 and starting_frame_id > 0
+            scene_gt, scene_camera = _BopWriterUtility.load_new_chunk_annotations(
+                chunk_dir, starting_frame_id if dir_counter == 0 else 0, new_annotations)
+            scene_gt_info = {}
 
             im_ids = sorted(scene_gt.keys())
 
-            # append to existing output
-            if dir_counter == 0:
-                im_ids = im_ids[starting_frame_id:]
-
             for im_counter, im_id in enumerate(im_ids):
                 if im_counter % 100 == 0:
                     misc.log(f'Calculating GT info - {chunk_dir}, {im_counter}')
@@ -856,67 +1083,289 @@ def calc_gt_info(pool, chunk_dirs: List[str], starting_frame_id: int = 0,
                 scene_gt_info[im_id] = list(map_fun(partial(_BopWriterUtility._calc_gt_info_iteration, annotation_scale, ren_cy_offset, ren_cx_offset, im_height, im_width, K, delta, depth), scene_gt[im_id]))
                     
 
-            # Save the info for the current scene.
+            # Save the info for the current scene, the info of existing frames is kept as it is.
             scene_gt_info_path = os.path.join(chunk_dir, 'scene_gt_info.json')
             misc.ensure_dir(os.path.dirname(scene_gt_info_path))
-            inout.save_json(scene_gt_info_path, scene_gt_info)
+            if appending:
+                misc.log(f"Appending gt info to existing chunk dir - {chunk_dir}")
+                _BopWriterUtility.append_json(scene_gt_info_path, scene_gt_info)
+            else:
+                inout.save_json(scene_gt_info_path, scene_gt_info)
+            new_gt_infos[int(os.path.basename(chunk_dir))] = scene_gt_info
+
+        return new_gt_infos
 
     @staticmethod
-    def calc_gt_coco(chunk_dirs: List[str], dataset_objects: List[MeshObject], starting_frame_id: int = 0):
-        """ Calculates the COCO annotations.
-        From the BOP toolkit (https://github.com/thodan/bop_toolkit).
+    def _calc_gt_frame_iteration(annotation_scale: float, ren_cy_offset: int, ren_cx_offset: int, delta: float,
+                                 chunk_dir: str, frame_data: Tuple[int, List[float], float, List[Dict[str, int]]]) \
+            -> Tuple[List[Dict[str, object]], List[Optional[dict]]]:
+        """ Calculates the gt masks, gt info and coco annotations of all objects in one frame, executed inside a
+        worker process.
 
-        :param chunk_dirs: List of directories to calculate the gt coco annotations for.
+        All objects share one scene and camera. Every object is rendered only once with the enlarged image plane,
+        the masks are cropped from that same rendering, which is also used for the gt info. The coco annotations
+        are calculated from the masks in memory, so they do not need to be loaded again.
+
+        :param annotation_scale: The scale factor applied to the calculated annotations (in [m]) to get them into the
+                                 specified format (see `annotation_format` in `write_bop` for further details).
+        :param ren_cy_offset: The y offset for cropping the rendered image.
+        :param ren_cx_offset: The x offset for cropping the rendered image.
+        :param delta: Tolerance used for estimation of the visibility masks.
+        :param chunk_dir: The chunk dir where to store the resulting images.
+        :param frame_data: The id, the flattened camera intrinsics, the depth scale and the GT annotations of the frame.
+        :return: The gt info of all objects in the frame and their coco annotations. The coco annotation of an object
+                 is None, if it is not visible. The ids of the coco annotations still have to be assigned.
+        """
+        # Import pyrender only inside the multiprocesses, otherwise this leads to an opengl error
+        # https://github.com/mmatl/pyrender/issues/200#issuecomment-1123713055
+        # pylint: disable=import-outside-toplevel
+        import pyrender
+        from bop_toolkit_lib import inout, misc, visibility, pycoco_utils
+        # pylint: enable=import-outside-toplevel
+
+        global renderer_large, dataset_objects, renderer
+
+        # Only the large renderer is used, so make sure the pyrender Meshes are not bound to the other one
+        if renderer._renderer is not None:
+            renderer._renderer.delete()
+            renderer._renderer = None
+
+        im_id, cam_K, depth_scale, frame_gt = frame_data
+        K = np.array(cam_K).reshape(3, 3)
+
+        # Load depth image, inside the worker so it does not have to be transferred to it
+        depth_path = os.path.join(chunk_dir, 'depth', '{im_id:06d}.png').format(im_id=im_id)
+        depth = inout.load_depth(depth_path)
+        depth *= depth_scale  # to [mm]
+        depth /= 1000.  # to [m]
+        dist_im = misc.depth_im_to_dist_im_fast(depth, K)
+        im_height, im_width = depth.shape
+        im_size = (im_width, im_height)
+
+        # Init pyrender camera and a scene which is shared by all objects of the frame
+        fx, fy, cx, cy = K[0, 0], K[1, 1], K[0, 2], K[1, 2]
+        camera = pyrender.IntrinsicsCamera(fx=fx, fy=fy, cx=cx + ren_cx_offset, cy=cy + ren_cy_offset, znear=0.1,
+                                           zfar=100000)
+        scene = pyrender.Scene()
+        scene.add(camera)
+
+        frame_gt_info = []
+        frame_coco_annotations = []
+        for gt_id, gt in enumerate(frame_gt):
+            t = np.array(gt['cam_t_m2c'])
+            # rescale translation depending on initial saving format
+            t /= annotation_scale
+            pose = bop_pose_to_pyrender_coordinate_system(cam_R_m2c=np.array(gt['cam_R_m2c']).reshape(3, 3),
+                                                          cam_t_m2c=t)
+            object_node = scene.add(dataset_objects[gt['obj_id']], pose=pose)
+
+            # Render the depth image of the current object only
+            _, depth_gt_large = renderer_large.render(scene=scene)
+            scene.remove_node(object_node)
+
+            depth_gt = depth_gt_large[
+                       ren_cy_offset:(ren_cy_offset + im_height),
+                       ren_cx_offset:(ren_cx_offset + im_width)]
+
+            # Convert depth image to distance image.
+            dist_gt = misc.depth_im_to_dist_im_fast(depth_gt, K)
+
+            # Mask of the full object silhouette.
+            mask = dist_gt > 0
+
+            # Mask of the visible part of the object silhouette.
+            mask_visib = visibility.estimate_visib_mask_gt(dist_im, dist_gt, delta, visib_mode='bop19')
+
+            # Save the calculated masks.
+            mask_path = os.path.join(
+                chunk_dir, 'mask', '{im_id:06d}_{gt_id:06d}.png').format(im_id=im_id, gt_id=gt_id)
+            inout.save_im(mask_path, 255 * mask.astype(np.uint8))
+
+            mask_visib_path = os.path.join(
+                chunk_dir, 'mask_visib', '{im_id:06d}_{gt_id:06d}.png').format(im_id=im_id, gt_id=gt_id)
+            inout.save_im(mask_visib_path, 255 * mask_visib.astype(np.uint8))
+
+            gt_info = _BopWriterUtility._gt_info_from_rendering(depth_gt_large, dist_gt, dist_im, mask_visib,
+                                                                ren_cy_offset, ren_cx_offset, im_size)
+            frame_gt_info.append(gt_info)
+
+            # Coco annotation, objects which are not visible at all are skipped (same as in calc_gt_coco())
+            if mask_visib.sum() < 1 or mask.sum() < 1:
+                frame_coco_annotations.append(None)
+                continue
+            # use `amodal` bbox type per default
+            bounding_box = pycoco_utils.bbox_from_binary_mask(mask)
+            # Add ignore flag for objects smaller than 10% visible
+            annotation_info = pycoco_utils.create_annotation_info(
+                0, im_id, gt['obj_id'], mask_visib, bounding_box, tolerance=2, ignore=gt_info['visib_fract'] < 0.1)
+            # The annotation might still be None, but it still consumes a segmentation id
+            frame_coco_annotations.append({} if annotation_info is None else annotation_info)
+
+        return frame_gt_info, frame_coco_annotations
+
+    @staticmethod
+    def calc_gt_masks_info_coco(pool: Optional[Pool], chunk_dirs: List[str], dataset_objects: List[MeshObject],
+                                starting_frame_id: int = 0, annotation_scale: float = 1000., delta: float = 0.015,
+                                new_annotations: Optional[Dict[int, Tuple[dict, dict]]] = None):
+        """ Calculates the ground truth masks, the gt info and the coco annotations in one sweep over the frames.
+
+        Produces the same outputs as calc_gt_masks(), calc_gt_info() and calc_gt_coco(), but processes whole frames
+        instead of single objects: Each worker task covers all objects of one frame, the depth image is decoded only
+        once per frame, every object is rendered only once and the masks are kept in memory for the coco
+        annotations instead of being loaded again. At most one frame per worker is kept in memory.
+
+        :param pool: The pool of worker processes to use for the calculations.
+        :param chunk_dirs: List of directories to calculate the gt masks, gt info and coco annotations for.
         :param dataset_objects: List containing all objects to save the annotations for.
         :param starting_frame_id: The first frame id the writer has written during this run.
+        :param annotation_scale: The scale factor applied to the calculated annotations (in [m]) to get them into the
+                                 specified format (see `annotation_format` in `write_bop` for further details).
+        :param delta: Tolerance used for estimation of the visibility masks.
+        :param new_annotations: The annotations of the new frames, as returned by write_frames(). If not given, they
+                                are loaded from the chunk directories.
         """
         # This import is done inside to avoid having the requirement that BlenderProc depends on the bop_toolkit
         # pylint: disable=import-outside-toplevel
         from bop_toolkit_lib import inout, misc, pycoco_utils
         # pylint: enable=import-outside-toplevel
 
+        im_width, im_height = bpy.context.scene.render.resolution_x, bpy.context.scene.render.resolution_y
+        ren_cx_offset, ren_cy_offset = im_width, im_height
+
         for dir_counter, chunk_dir in enumerate(chunk_dirs):
-            dataset_name = chunk_dir.split('/')[-3]
-
-            CATEGORIES = [{'id': obj.get_cp('category_id'), 'name': str(obj.get_cp('category_id')), 'supercategory':
-                          dataset_name} for obj in dataset_objects]
-
-            # Remove all duplicate dicts from list.
-            # Ref: https://stackoverflow.com/questions/9427163/remove-duplicate-dict-in-list-in-python
-            CATEGORIES = list({frozenset(item.items()):item for item in CATEGORIES}.values())
-
-            INFO = {
-                "description": dataset_name + '_train',
-                "url": "https://github.com/thodan/bop_toolkit",
-                "version": "0.1.0",
-                "year": datetime.date.today().year,
-                "contributor": "",
-                "date_created": datetime.datetime.utcnow().isoformat(' ')
-            }
+            # append to existing output
+            appending = dir_counter == 0 and starting_frame_id > 0
+            scene_gt, scene_camera = _BopWriterUtility.load_new_chunk_annotations(
+                chunk_dir, starting_frame_id if dir_counter == 0 else 0, new_annotations)
+            coco_scene_output, segmentation_id = _BopWriterUtility._load_or_create_coco_scene_output(
+                chunk_dir, dataset_objects, appending)
+            coco_gt_path = os.path.join(chunk_dir, 'scene_gt_coco.json')
 
-            # load existing coco annotations
-            if dir_counter == 0 and starting_frame_id > 0:
-                misc.log(f"Loading coco annotations from existing chunk dir - {chunk_dir}")
-                coco_scene_output = _BopWriterUtility.load_json(os.path.join(chunk_dir, 'scene_gt_coco.json'))
-                if coco_scene_output["annotations"]:
-                    segmentation_id = coco_scene_output["annotations"][-1]['id'] + 1
-                else:
-                    segmentation_id = 1
+            # Create folders for the output masks (if they do not exist yet).
+            misc.ensure_dir(os.path.join(chunk_dir, 'mask'))
+            misc.ensure_dir(os.path.join(chunk_dir, 'mask_visib'))
+
+            misc.log(f'Calculating GT masks, GT info and COCO annotations - {chunk_dir}')
+            im_ids = sorted(scene_gt.keys())
+            frames_data = [(im_id, scene_camera[im_id]['cam_K'], scene_camera[im_id]['depth_scale'], scene_gt[im_id])
+                           for im_id in im_ids]
+
+            # Results are consumed in order while the workers continue with the next frames
+            map_fun = map if pool is None else pool.imap
+            frame_results = map_fun(partial(_BopWriterUtility._calc_gt_frame_iteration, annotation_scale,
+                                            ren_cy_offset, ren_cx_offset, delta, chunk_dir), frames_data)
+
+            scene_gt_info = {}
+            for im_id, (frame_gt_info, frame_coco_annotations) in zip(im_ids, frame_results):
+                scene_gt_info[im_id] = frame_gt_info
+
+                img_path = os.path.join(chunk_dir, 'rgb', '{im_id:06d}.jpg').format(im_id=im_id)
+                relative_img_path = os.path.relpath(img_path, os.path.dirname(coco_gt_path))
+                coco_scene_output["images"].append(pycoco_utils.create_image_info(im_id, relative_img_path,
+                                                                                  (im_width, im_height)))
+                for annotation_info in frame_coco_annotations:
+                    if annotation_info is None:
+                        continue
+                    if annotation_info:
+                        annotation_info['id'] = segmentation_id
+                        coco_scene_output["annotations"].append(annotation_info)
+                    segmentation_id += 1
+
+            # Save the info for the current scene, the info of existing frames is kept as it is.
+            scene_gt_info_path = os.path.join(chunk_dir, 'scene_gt_info.json')
+            if appending:
+                _BopWriterUtility.append_json(scene_gt_info_path, scene_gt_info)
+            else:
+                inout.save_json(scene_gt_info_path, scene_gt_info)
+
+            with open(coco_gt_path, 'w', encoding='utf-8') as output_json_file:
+                json.dump(coco_scene_output, output_json_file)
+
+    @staticmethod
+    def _load_or_create_coco_scene_output(chunk_dir: str, dataset_objects: List[MeshObject],
+                                          appending: bool) -> Tuple[dict, int]:
+        """ Loads the existing coco annotations of a chunk or creates new ones.
+
+        :param chunk_dir: The chunk directory.
+        :param dataset_objects: List containing all objects to save the annotations for.
+        :param appending: If true, the existing coco annotations of the chunk are loaded.
+        :return: The coco annotations and the next free segmentation id.
+        """
+        # This import is done inside to avoid having the requirement that BlenderProc depends on the bop_toolkit
+        # pylint: disable=import-outside-toplevel
+        from bop_toolkit_lib import misc
+        # pylint: enable=import-outside-toplevel
+
+        dataset_name = chunk_dir.split('/')[-3]
+
+        CATEGORIES = [{'id': obj.get_cp('category_id'), 'name': str(obj.get_cp('category_id')), 'supercategory':
+                      dataset_name} for obj in dataset_objects]
+
+        # Remove all duplicate dicts from list.
+        # Ref: https://stackoverflow.com/questions/9427163/remove-duplicate-dict-in-list-in-python
+        CATEGORIES = list({frozenset(item.items()):item for item in CATEGORIES}.values())
+
+        INFO = {
+            "description": dataset_name + '_train',
+            "url": "https://github.com/thodan/bop_toolkit",
+            "version": "0.1.0",
+            "year": datetime.date.today().year,
+            "contributor": "",
+            "date_created": datetime.datetime.utcnow().isoformat(' ')
+        }
+
+        # load existing coco annotations
+        if appending:
+            misc.log(f"Loading coco annotations from existing chunk dir - {chunk_dir}")
+            coco_scene_output = _BopWriterUtility.load_json(os.path.join(chunk_dir, 'scene_gt_coco.json'))
+            if coco_scene_output["annotations"]:
+                segmentation_id = coco_scene_output["annotations"][-1]['id'] + 1
             else:
-                coco_scene_output = {
-                    "info": INFO,
-                    "licenses": [],
-                    "categories": CATEGORIES,
-                    "images": [],
-                    "annotations": []
-                }
                 segmentation_id = 1
+        else:
+            coco_scene_output = {
+                "info": INFO,
+                "licenses": [],
+                "categories": CATEGORIES,
+                "images": [],
+                "annotations": []
+            }
+            segmentation_id = 1
+        return coco_scene_output, segmentation_id
+
+    @staticmethod
+    def calc_gt_coco(chunk_dirs: List[str], dataset_objects: List[MeshObject], starting_frame_id: int = 0,
+                     new_annotations: Optional[Dict[int, Tuple[dict, dict]]] = None,
+                     new_gt_infos: Optional[Dict[int, Dict[int, list]]] = None):
+        """ Calculates the COCO annotations.
+        From the BOP toolkit (https://github.com/thodan/bop_toolkit).
+
+        :param chunk_dirs: List of directories to calculate the gt coco annotations for.
+        :param dataset_objects: List containing all objects to save the annotations for.
+        :param starting_frame_id: The first frame id the writer has written during this run.
+        :param new_annotations: The annotations of the new frames, as returned by write_frames(). If not given, they
+                                are loaded from the chunk directories.
+        :param new_gt_infos: The gt info of the new frames, as returned by calc_gt_info(). If not given, it is
+                             loaded from the chunk directories.
+        """
+        # This import is done inside to avoid having the requirement that BlenderProc depends on the bop_toolkit
+        # pylint: disable=import-outside-toplevel
+        from bop_toolkit_lib import inout, misc, pycoco_utils
+        # pylint: enable=import-outside-toplevel
+
+        for dir_counter, chunk_dir in enumerate(chunk_dirs):
+            coco_scene_output, segmentation_id = _BopWriterUtility._load_or_create_coco_scene_output(
+                chunk_dir, dataset_objects, appending=dir_counter == 0 and starting_frame_id > 0)
 
             # Load info about the GT poses (e.g. visibility) for the current scene.
-            last_chunk_gt_fpath = os.path.join(chunk_dir, 'scene_gt.json')
-            scene_gt = _BopWriterUtility.load_json(last_chunk_gt_fpath, keys_to_int=True)
-            last_chunk_gt_info_fpath = os.path.join(chunk_dir, 'scene_gt_info.json')
-            scene_gt_info = inout.load_json(last_chunk_gt_info_fpath, keys_to_int=True)
+            scene_gt, _ = _BopWriterUtility.load_new_chunk_annotations(
+                chunk_dir, starting_frame_id if dir_counter == 0 else 0, new_annotations)
+            chunk_id = int(os.path.basename(chunk_dir))
+            if new_gt_infos is not None and chunk_id in new_gt_infos:
+                scene_gt_info = new_gt_infos[chunk_id]
+            else:
+                last_chunk_gt_info_fpath = os.path.join(chunk_dir, 'scene_gt_info.json')
+                scene_gt_info = inout.load_json(last_chunk_gt_info_fpath, keys_to_int=True)
             # Output coco path
             coco_gt_path = os.path.join(chunk_dir, 'scene_gt_coco.json')
             misc.log(f'Calculating COCO annotations - {chunk_dir}')
@@ -0,0 +1,78 @@
+"""Merges the coco annotation shards written by `write_coco_annotations(..., sharded_output=True)`.
+
+This module does not depend on blender, so it can also be used via `blenderproc compact coco`.
+"""
+
+import json
+import os
+import shutil
+from typing import Optional, Union
+
+
+def compact_coco_annotations(output_dir: str, indent: Optional[Union[int, str]] = None,
+                             remove_shards: bool = True):
+    """ Merges all coco annotation shards, written via `write_coco_annotations(..., sharded_output=True)`, together
+    with an already existing coco_annotations.json into one standard coco_annotations.json.
+
+    The ids inside the shards are already globally unique, so the shards are only concatenated. If the shards are
+    kept, the id of the last merged shard is recorded in coco_annotations_shards/compacted.json, so the next
+    compaction only merges the shards which have been written since then.
+
+    :param output_dir: The output directory of the coco writer.
+    :param indent: The indent level used for pretty-printing the resulting json file, see `write_coco_annotations`.
+    :param remove_shards: If true, the shards are removed after they have been merged.
+    """
+    shard_dir = os.path.join(output_dir, "coco_annotations_shards")
+    index_path = os.path.join(shard_dir, "index.jsonl")
+    compacted_path = os.path.join(shard_dir, "compacted.json")
+    coco_annotations_path = os.path.join(output_dir, "coco_annotations.json")
+    if not os.path.exists(index_path):
+        print(f"There are no coco annotation shards to compact in {output_dir}")
+        return
+
+    # Shards which have been merged by a previous compaction are already part of the coco_annotations.json
+    if os.path.exists(compacted_path):
+        with open(compacted_path, 'r', encoding="utf-8") as fp:
+            last_compacted_shard_id = json.load(fp)["shard_id"]
+    else:
+        last_compacted_shard_id = -1
+
+    with open(index_path, 'r', encoding="utf-8") as fp:
+        shard_entries = [json.loads(line) for line in fp if line.strip()]
+    shard_entries = [shard_entry for shard_entry in shard_entries if shard_entry["shard_id"] > last_compacted_shard_id]
+
+    if shard_entries:
+        if os.path.exists(coco_annotations_path):
+            with open(coco_annotations_path, 'r', encoding="utf-8") as fp:
+                coco_annotations = json.load(fp)
+        else:
+            coco_annotations = None
+
+        for shard_entry in shard_entries:
+            with open(os.path.join(shard_dir, shard_entry["shard"]), 'r', encoding="utf-8") as fp:
+                shard = json.load(fp)
+
+            if coco_annotations is None:
+                coco_annotations = shard
+            else:
+                # Concatenate category sections
+                for cat_dict in shard["categories"]:
+                    if cat_dict not in coco_annotations["categories"]:
+                        coco_annotations["categories"].append(cat_dict)
+                coco_annotations["images"].extend(shard["images"])
+                coco_annotations["annotations"].extend(shard["annotations"])
+
+        print(f"Writing {len(shard_entries)} compacted coco annotation shards to {coco_annotations_path}")
+        # Write to a temporary file first, so the existing annotations are not lost if writing fails
+        with open(coco_annotations_path + ".tmp", 'w', encoding="utf-8") as fp:
+            json.dump(coco_annotations, fp, indent=indent)
+        os.replace(coco_annotations_path + ".tmp", coco_annotations_path)
+    else:
+        print(f"All coco annotation shards in {output_dir} have already been compacted")
+
+    if remove_shards:
+        shutil.rmtree(shard_dir)
+    elif shard_entries:
+        with open(compacted_path + ".tmp", 'w', encoding="utf-8") as fp:
+            json.dump({"shard_id": shard_entries[-1]["shard_id"]}, fp)
+        os.replace(compacted_path + ".tmp", compacted_path)
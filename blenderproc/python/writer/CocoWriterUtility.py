@@ -1,12 +1,13 @@
 """Allows rendering the content of the scene in the coco file format."""
 
 import datetime
-from itertools import groupby
 import json
 import os
+import shutil
 from typing import Optional, Dict, Union, Tuple, List
 
 import numpy as np
+from scipy import ndimage
 from skimage import measure
 import cv2
 import bpy
@@ -20,7 +21,8 @@ def write_coco_annotations(output_dir: str, instance_segmaps: List[np.ndarray],
                            mask_encoding_format: str = "rle", supercategory: str = "coco_annotations",
                            append_to_existing_output: bool = True,
                            jpg_quality: int = 95, label_mapping: Optional[LabelIdMapping] = None,
-                           file_prefix: str = "", indent: Optional[Union[int, str]] = None):
+                           file_prefix: str = "", indent: Optional[Union[int, str]] = None,
+                           sharded_output: bool = False):
     """ Writes coco annotations in the following steps:
     1. Locate the seg images
     2. Locate the rgb maps
@@ -29,9 +31,11 @@ def write_coco_annotations(output_dir: str, instance_segmaps: List[np.ndarray],
     5. For each frame write the coco annotation
 
     :param output_dir: Output directory to write the coco annotations
-    :param instance_segmaps: List of instance segmentation maps
+    :param instance_segmaps: List of instance segmentation maps, can also be a LazyFrameSequence returned by
+                             `render()`.
     :param instance_attribute_maps: per-frame mappings with idx, class and optionally supercategory/bop_dataset_name
     :param colors: List of color images. Does not support stereo images, enter left and right inputs subsequently.
+                   Can also be a LazyFrameSequence returned by `render()`.
     :param color_file_format: Format to save color images in
     :param mask_encoding_format: Encoding format of the binary masks. Default: 'rle'. Available: 'rle', 'polygon'.
     :param supercategory: name of the dataset/supercategory to filter for, e.g. a specific BOP dataset set
@@ -49,6 +53,11 @@ def write_coco_annotations(output_dir: str, instance_segmaps: List[np.ndarray],
                    only insert newlines. None (the default) selects the most compact representation.
                    Using a positive integer indent indents that many spaces per level.
                    If indent is a string (such as "\t"), that string is used to indent each level.
+    :param sharded_output: If true, the coco annotations of this call are written into a separate shard inside the
+                           coco_annotations_shards folder instead of rewriting the whole coco_annotations.json.
+                           This way, the cost of appending does not grow with the size of the dataset. The shards
+                           can be merged into one coco_annotations.json via `compact_coco_annotations` or the
+                           command `blenderproc compact coco <output_dir>`.
     """
 
     if len(colors) > 0 and len(colors[0].shape) == 4:
@@ -59,8 +68,20 @@ def write_coco_annotations(output_dir: str, instance_segmaps: List[np.ndarray],
     os.makedirs(os.path.join(output_dir, 'images'), exist_ok=True)
 
     coco_annotations_path = os.path.join(output_dir, "coco_annotations.json")
+    shard_dir = os.path.join(output_dir, "coco_annotations_shards")
     # Calculate image numbering offset, if append_to_existing_output is activated and coco data exists
-    if append_to_existing_output and os.path.exists(coco_annotations_path):
+    if sharded_output:
+        if not append_to_existing_output:
+            # Start from scratch, same as overwriting the coco_annotations.json in the non-sharded mode
+            if os.path.exists(shard_dir):
+                shutil.rmtree(shard_dir)
+            if os.path.exists(coco_annotations_path):
+                os.remove(coco_annotations_path)
+        os.makedirs(shard_dir, exist_ok=True)
+        last_shard_entry = _CocoWriterUtility.get_last_shard_entry(output_dir)
+        image_offset = last_shard_entry["next_image_id"]
+        existing_coco_annotations = None
+    elif append_to_existing_output and os.path.exists(coco_annotations_path):
         with open(coco_annotations_path, 'r', encoding="utf-8") as fp:
             existing_coco_annotations = json.load(fp)
         image_offset = max(image["id"] for image in existing_coco_annotations["images"]) + 1
@@ -72,8 +93,8 @@ def write_coco_annotations(output_dir: str, instance_segmaps: List[np.ndarray],
     new_coco_image_paths = []
 
     # for each rendered frame
-    for frame in range(bpy.context.scene.frame_start, bpy.context.scene.frame_end):
-        color_rgb = colors[frame - bpy.context.scene.frame_start]
+    # Iterate over the images, instead of indexing them, so lazy sequences can decode the next frames in the background
+    for frame, color_rgb in zip(range(bpy.context.scene.frame_start, bpy.context.scene.frame_end), colors):
 
         # Reverse channel order for opencv
         color_bgr = color_rgb.copy()
@@ -101,9 +122,12 @@ def write_coco_annotations(output_dir: str, instance_segmaps: List[np.ndarray],
                                                                existing_coco_annotations,
                                                                label_mapping)
 
-    print("Writing coco annotations to " + coco_annotations_path)
-    with open(coco_annotations_path, 'w', encoding="utf-8") as fp:
-        json.dump(coco_output, fp, indent=indent)
+    if sharded_output:
+        _CocoWriterUtility.write_shard(output_dir, coco_output, last_shard_entry, indent)
+    else:
+        print("Writing coco annotations to " + coco_annotations_path)
+        with open(coco_annotations_path, 'w', encoding="utf-8") as fp:
+            json.dump(coco_output, fp, indent=indent)
 
 
 def binary_mask_to_rle(binary_mask: np.ndarray) -> Dict[str, List[int]]:
@@ -113,12 +137,18 @@ def binary_mask_to_rle(binary_mask: np.ndarray) -> Dict[str, List[int]]:
     :param binary_mask: a 2D binary numpy array where '1's represent the object
     :return: Mask in RLE format
     """
+    flat_mask = np.asarray(binary_mask).ravel(order='F')
     rle: Dict[str, List[int]] = {'counts': [], 'size': list(binary_mask.shape)}
-    counts = rle.get('counts')
-    for i, (value, elements) in enumerate(groupby(binary_mask.ravel(order='F'))):
-        if i == 0 and value == 1:
-            counts.append(0)
-        counts.append(len(list(elements)))
+    if flat_mask.size == 0:
+        return rle
+
+    # The lengths of all runs of equal values, determined via the positions where the value changes
+    run_bounds = np.concatenate(([0], np.flatnonzero(flat_mask[1:] != flat_mask[:-1]) + 1, [flat_mask.size]))
+    counts = np.diff(run_bounds).tolist()
+    # The counts always start with the number of zeros
+    if flat_mask[0] == 1:
+        counts.insert(0, 0)
+    rle['counts'] = counts
     return rle
 
 
@@ -220,19 +250,30 @@ def generate_coco_annotations(inst_segmaps, inst_attribute_maps, image_paths, su
             images.append(_CocoWriterUtility.create_image_info(image_id, image_path, inst_segmap.shape))
 
             # Go through all objects visible in this image
-            instances = np.unique(inst_segmap)
-            # Remove background
-            instances = np.delete(instances, np.where(instances == 0))
+            if mask_encoding_format == 'rle':
+                # Area, bounding box and rle of all instances are calculated at once
+                instance_masks_data = _CocoWriterUtility.calc_instance_masks_data(inst_segmap)
+                instances = list(instance_masks_data.keys())
+            else:
+                instances = np.unique(inst_segmap)
             for inst in instances:
-                if inst in instance_2_category_map:
-                    # Calc object mask
-                    binary_inst_mask = np.where(inst_segmap == inst, 1, 0)
-                    # Add coco info for object in this image
-                    annotation = _CocoWriterUtility.create_annotation_info(len(annotations) + 1,
-                                                                           image_id,
-                                                                           instance_2_category_map[inst],
-                                                                           binary_inst_mask,
-                                                                           mask_encoding_format)
+                # Skip background
+                if inst != 0 and inst in instance_2_category_map:
+                    if mask_encoding_format == 'rle':
+                        area, bounding_box, segmentation = instance_masks_data[inst]
+                        annotation = _CocoWriterUtility.build_annotation_info(len(annotations) + 1, image_id,
+                                                                              instance_2_category_map[inst],
+                                                                              area, bounding_box, segmentation,
+                                                                              inst_segmap.shape)
+                    else:
+                        # Calc object mask
+                        binary_inst_mask = (inst_segmap == inst).astype(np.uint8)
+                        # Add coco info for object in this image
+                        annotation = _CocoWriterUtility.create_annotation_info(len(annotations) + 1,
+                                                                               image_id,
+                                                                               instance_2_category_map[inst],
+                                                                               binary_inst_mask,
+                                                                               mask_encoding_format)
                     if annotation is not None:
                         annotations.append(annotation)
 
@@ -285,6 +326,83 @@ def merge_coco_annotations(existing_coco_annotations, new_coco_annotations):
 
         return existing_coco_annotations
 
+    @staticmethod
+    def get_last_shard_entry(output_dir: str) -> Dict[str, int]:
+        """ Returns the index entry of the last coco annotation shard, which contains the ids to continue with.
+
+        Only the last line of the shard index is read. If there are no shards yet, the ids are determined from an
+        existing coco_annotations.json.
+
+        :param output_dir: The output directory of the coco writer.
+        :return: The index entry with the keys "shard_id", "next_image_id" and "last_annotation_id".
+        """
+        index_path = os.path.join(output_dir, "coco_annotations_shards", "index.jsonl")
+        if os.path.exists(index_path) and os.path.getsize(index_path) > 0:
+            with open(index_path, 'rb') as fp:
+                fp.seek(0, os.SEEK_END)
+                file_size = fp.tell()
+                block_size = min(1024, file_size)
+                while True:
+                    fp.seek(file_size - block_size)
+                    lines = fp.read(block_size).rstrip().split(b'\n')
+                    # Make sure the last line has been read completely
+                    if len(lines) > 1 or block_size == file_size:
+                        return json.loads(lines[-1])
+                    block_size = min(2 * block_size, file_size)
+
+        coco_annotations_path = os.path.join(output_dir, "coco_annotations.json")
+        if os.path.exists(coco_annotations_path):
+            with open(coco_annotations_path, 'r', encoding="utf-8") as fp:
+                existing_coco_annotations = json.load(fp)
+            return {
+                "shard_id": -1,
+                "next_image_id": max(image["id"] for image in existing_coco_annotations["images"]) + 1,
+                "last_annotation_id": max((annotation["id"] for annotation in existing_coco_annotations["annotations"]),
+                                          default=0)
+            }
+        return {"shard_id": -1, "next_image_id": 0, "last_annotation_id": 0}
+
+    @staticmethod
+    def write_shard(output_dir: str, coco_annotations: Dict, last_shard_entry: Dict[str, int],
+                    indent: Optional[Union[int, str]] = None):
+        """ Writes the given coco annotations as a new shard and appends it to the shard index.
+
+        The image and annotation ids are shifted, such that they continue the ones of the previous shards.
+
+        :param output_dir: The output directory of the coco writer.
+        :param coco_annotations: The coco annotations of the new images, with ids starting at zero.
+        :param last_shard_entry: The index entry of the previous shard, see get_last_shard_entry().
+        :param indent: The indent level used for pretty-printing the shard.
+        """
+        image_id_offset = last_shard_entry["next_image_id"]
+        annotation_id_offset = last_shard_entry["last_annotation_id"]
+        for image in coco_annotations["images"]:
+            image["id"] += image_id_offset
+        for annotation in coco_annotations["annotations"]:
+            annotation["id"] += annotation_id_offset
+            annotation["image_id"] += image_id_offset
+
+        shard_id = last_shard_entry["shard_id"] + 1
+        shard_name = f"shard_{shard_id:06d}.json"
+        shard_dir = os.path.join(output_dir, "coco_annotations_shards")
+        print("Writing coco annotations to " + os.path.join(shard_dir, shard_name))
+        with open(os.path.join(shard_dir, shard_name), 'w', encoding="utf-8") as fp:
+            json.dump(coco_annotations, fp, indent=indent)
+
+        # The shard only becomes visible once its entry has been appended to the index
+        shard_entry = {
+            "shard_id": shard_id,
+            "shard": shard_name,
+            "num_images": len(coco_annotations["images"]),
+            "num_annotations": len(coco_annotations["annotations"]),
+            "next_image_id": max((image["id"] for image in coco_annotations["images"]),
+                                 default=image_id_offset - 1) + 1,
+            "last_annotation_id": max((annotation["id"] for annotation in coco_annotations["annotations"]),
+                                      default=annotation_id_offset)
+        }
+        with open(os.path.join(shard_dir, "index.jsonl"), 'a', encoding="utf-8") as fp:
+            fp.write(json.dumps(shard_entry) + "\n")
+
     @staticmethod
     def create_image_info(image_id: int, file_name: str, image_size: Tuple[int, int]) -> Dict[str, Union[str, int]]:
         """Creates image info section of coco annotation
@@ -334,6 +452,26 @@ def create_annotation_info(annotation_id: int, image_id: int, category_id: int,
         else:
             raise RuntimeError(f"Unknown encoding format: {mask_encoding_format}")
 
+        return _CocoWriterUtility.build_annotation_info(annotation_id, image_id, category_id, area, bounding_box,
+                                                        segmentation, binary_mask.shape)
+
+    @staticmethod
+    def build_annotation_info(annotation_id: int, image_id: int, category_id: int, area: int,
+                              bounding_box: List[int], segmentation: Union[Dict[str, List[int]], List[np.ndarray]],
+                              mask_shape: Tuple[int, int]) -> Optional[Dict[str, Union[str, int]]]:
+        """Creates info section of coco annotation from the already calculated properties of the object mask
+
+        :param annotation_id: integer to uniquly identify the annotation
+        :param image_id: integer to uniquly identify image
+        :param category_id: Id of the category
+        :param area: The number of pixels in the object mask.
+        :param bounding_box: The bounding box of the object mask represented as [x, y, width, height].
+        :param segmentation: The encoded object mask.
+        :param mask_shape: The shape [H, W] of the object mask.
+        """
+        if area < 1:
+            return None
+
         annotation_info: Dict[str, Union[str, int]] = {
             "id": annotation_id,
             "image_id": image_id,
@@ -342,11 +480,59 @@ def create_annotation_info(annotation_id: int, image_id: int, category_id: int,
             "area": area,
             "bbox": bounding_box,
             "segmentation": segmentation,
-            "width": binary_mask.shape[1],
-            "height": binary_mask.shape[0],
+            "width": mask_shape[1],
+            "height": mask_shape[0],
         }
         return annotation_info
 
+    @staticmethod
+    def calc_instance_masks_data(inst_segmap: np.ndarray) -> Dict[int, Tuple[int, List[int], Dict[str, List[int]]]]:
+        """ Calculates area, bounding box and rle of the binary masks of all instances in a single pass over the
+        instance segmentation map, without building a binary mask per instance.
+
+        The results are identical to calc_binary_mask_area(), bbox_from_binary_mask() and binary_mask_to_rle()
+        applied on the binary mask of each instance.
+
+        :param inst_segmap: The instance segmentation map with the shape [H, W].
+        :return: A dict mapping each instance id to its area, bounding box and rle.
+        """
+        instances, labels = np.unique(inst_segmap, return_inverse=True)
+        labels = labels.reshape(inst_segmap.shape)
+        areas = np.bincount(labels.ravel(), minlength=len(instances))
+        # Labels are shifted by one, as label 0 is ignored by find_objects
+        bounding_boxes = ndimage.find_objects(labels + 1, max_label=len(instances))
+
+        # All runs of equal instance ids in column-major order
+        flat_labels = labels.ravel(order='F')
+        run_starts = np.concatenate(([0], np.flatnonzero(flat_labels[1:] != flat_labels[:-1]) + 1))
+        run_lengths = np.diff(np.concatenate((run_starts, [flat_labels.size])))
+        # Group the runs by instance, keeping their order within each instance
+        run_order = np.argsort(flat_labels[run_starts], kind='stable')
+        run_starts, run_lengths = run_starts[run_order], run_lengths[run_order]
+        group_bounds = np.cumsum(np.bincount(flat_labels[run_starts], minlength=len(instances)))
+
+        instance_masks_data = {}
+        group_start = 0
+        for label, inst in enumerate(instances):
+            starts = run_starts[group_start:group_bounds[label]]
+            lengths = run_lengths[group_start:group_bounds[label]]
+            group_start = group_bounds[label]
+
+            # The rle alternates between the gaps in front of the runs and the runs themselves
+            ends = starts + lengths
+            counts = np.empty(2 * len(starts), dtype=np.int64)
+            counts[0::2] = starts - np.concatenate(([0], ends[:-1]))
+            counts[1::2] = lengths
+            counts = counts.tolist()
+            if ends[-1] < flat_labels.size:
+                counts.append(int(flat_labels.size - ends[-1]))
+
+            rows, cols = bounding_boxes[label]
+            bounding_box = [cols.start, rows.start, cols.stop - cols.start, rows.stop - rows.start]
+            rle = {'counts': counts, 'size': list(inst_segmap.shape)}
+            instance_masks_data[inst] = (int(areas[label]), bounding_box, rle)
+        return instance_masks_data
+
     @staticmethod
     def bbox_from_binary_mask(binary_mask: np.ndarray) -> List[int]:
         """ Returns the smallest bounding box containing all pixels marked "1" in the given image mask.
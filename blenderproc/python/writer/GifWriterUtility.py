@@ -1,6 +1,7 @@
 """Allows to write a set of rendering as a gif animation for quick visualization."""
 
-from typing import Dict, List, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Union, Iterator, Optional, Tuple
 import os
 
 import bpy
@@ -10,8 +11,8 @@
 import matplotlib
 matplotlib.use("agg")
 
-from blenderproc.scripts.visHdf5Files import vis_data
-from blenderproc.python.utility.Utility import Utility
+from blenderproc.scripts.visHdf5Files import flow_to_rgb, key_matches, default_flow_keys, default_segmap_keys, \
+    default_depth_keys, default_depth_max
 
 
 def write_gif_animation(
@@ -19,7 +20,8 @@ def write_gif_animation(
         output_data_dict: Dict[str, List[Union[np.ndarray, list, dict]]],
         append_to_existing_output: bool = False,
         frame_duration_in_ms: int = 50,
-        reverse_animation: bool = False):
+        reverse_animation: bool = False,
+        num_threads: int = 0):
     """
     Generates a .gif file animation out of rendered frames
 
@@ -30,6 +32,8 @@ def write_gif_animation(
                             start right where the last run left off.
     :param frame_duration_in_ms: Duration of each frame in the animation in milliseconds.
     :param reverse_animation: If this is True, the order of the frames will be reversed.
+    :param num_threads: The number of threads used to write the animations of the different keys in parallel.
+                        If 0 is given, the animations are written one after another.
     """
 
     # Generates subdirectory for .gif files
@@ -49,14 +53,15 @@ def write_gif_animation(
     # Sorts out keys which are just metadata and not plottable
     keys_to_use = _GifWriterUtility.select_keys(output_data_dict)
 
-    # Build temporary folders with .png collections
-    to_animate = _GifWriterUtility.cache_png(keys_to_use, output_data_dict)
+    # Determine which animations are written for which keys, stereo images and channels
+    to_animate = _GifWriterUtility.collect_animations(keys_to_use, output_data_dict)
 
-    # Write the cache .png files to .gif files and delete cache
-    _GifWriterUtility.write_to_gif(to_animate, output_dir_path,
+    # Convert the frames directly into palette images and write them into the .gif files
+    _GifWriterUtility.write_to_gif(to_animate, output_data_dict, output_dir_path,
                                    append_to_existing_output,
                                    frame_duration_in_ms,
-                                   reverse_animation)
+                                   reverse_animation,
+                                   num_threads)
 
 
 class _GifWriterUtility:
@@ -83,46 +88,113 @@ def is_image(x: Union[np.ndarray, list, dict]) -> bool:
                 if len(value) > 0 and is_image(value[0])]
 
     @staticmethod
-    def cache_png(keys_to_use: List[str],
-                  output_data_dict: Dict[str, List[Union[np.ndarray, list, dict]]]) -> Dict[str, List[str]]:
-        """
-        Builds temporary folders with .png collections
-        and returns the locations as dictionary.
+    def collect_animations(keys_to_use: List[str],
+                           output_data_dict: Dict[str, List[Union[np.ndarray, list, dict]]]) \
+            -> Dict[str, Tuple[str, Optional[int], Optional[int]]]:
         """
+        Determines the animations to write. Stereo images get one animation per perspective and segmentation maps
+        with multiple channels one animation per channel.
 
+        :return: A dict mapping the name of each animation to the key, the stereo index and the segmap channel.
+        """
         if not set(keys_to_use) <= set(output_data_dict.keys()):
             raise ValueError("The keys_to_use list must be contained in the list of keys from the output_data_dict!")
 
         to_animate = {}
         for key in keys_to_use:
-            value = output_data_dict[key][0]
-            value = np.array(value)
+            value = np.array(output_data_dict[key][0])
             # Check if frames are rendered in stereo vision
             if value.shape[0] == 2:
-                # stereo images
-                for index, perspective in enumerate(['_L', '_R']):
-                    to_animate[key + perspective] = []
-                    for number, frame in enumerate(output_data_dict[key]):
-                        file_path = os.path.join(
-                            Utility.get_temporary_directory(),
-                            f'{number}_{key}_{perspective}.png')
-                        to_animate[key + perspective].append(file_path)
-                        vis_data(key=key,
-                                 data=frame[index],
-                                 save_to_file=file_path)
+                perspectives = [(key + perspective, index) for index, perspective in enumerate(['_L', '_R'])]
+                value = value[0]
             else:
-                # non stereo images
-                to_animate[key] = []
-                for number, frame in enumerate(output_data_dict[key]):
-                    file_path = os.path.join(
-                        Utility.get_temporary_directory(),
-                        f'{number}_{key}.png')
-                    to_animate[key].append(file_path)
-                    vis_data(key=key,
-                             data=frame,
-                             save_to_file=file_path)
+                perspectives = [(key, None)]
+
+            for name, stereo_index in perspectives:
+                if key_matches(key, default_segmap_keys) and len(value.shape) == 3 and value.shape[2] > 1:
+                    for channel in range(value.shape[2]):
+                        to_animate[f"{name}_{channel}"] = (key, stereo_index, channel)
+                else:
+                    to_animate[name] = (key, stereo_index, None)
         return to_animate
 
+    @staticmethod
+    def colormap_palette(name: str) -> List[int]:
+        """ Returns the 256 colors of the given matplotlib colormap as flat gif palette. """
+        lut = matplotlib.colormaps[name](np.linspace(0, 1, 256), bytes=True)
+        return lut[:, :3].flatten().tolist()
+
+    @staticmethod
+    def colormap_indices(data: np.ndarray, vmax: Optional[float] = None) -> np.ndarray:
+        """
+        Maps the given values to the 256 entries of a colormap lookup table, like matplotlib does with a
+        normalization between the minimum and the given maximum (per default the maximum of the data).
+        """
+        data = np.asarray(data, dtype=np.float64)
+        finite_data = data[np.isfinite(data)]
+        vmin = finite_data.min() if finite_data.size > 0 else 0
+        if vmax is None:
+            vmax = finite_data.max() if finite_data.size > 0 else 0
+        if vmax > vmin:
+            normalized = (data - vmin) * (256 / (vmax - vmin))
+        else:
+            normalized = np.zeros_like(data)
+        normalized = np.nan_to_num(normalized, nan=0, posinf=255, neginf=0)
+        return np.clip(normalized, 0, 255).astype(np.uint8)
+
+    @staticmethod
+    def to_rgb(data: np.ndarray) -> np.ndarray:
+        """ Converts the given rgb(a) image into uint8 rgb. """
+        data = np.asarray(data)[:, :, :3]
+        if data.dtype != np.uint8:
+            data = (np.clip(data, 0, 1) * 255).astype(np.uint8)
+        return data
+
+    @staticmethod
+    def iterate_gif_frames(key: str, frames: List[Union[np.ndarray, list, dict]], stereo_index: Optional[int],
+                           channel: Optional[int], reverse_animation: bool) -> Iterator[Image.Image]:
+        """
+        Converts the given frames one by one into palette images.
+
+        Single channel data (segmentation maps, depth, ...) is mapped to the indices of a colormap, which is then
+        directly used as palette. Rgb data is quantized once, the palette of the first frame is reused for the
+        following frames.
+        """
+        palette_image = None
+        palettes = {}
+        frame_indices = range(len(frames) - 1, -1, -1) if reverse_animation else range(len(frames))
+        for frame_index in frame_indices:
+            data = np.asarray(frames[frame_index])
+            if stereo_index is not None:
+                data = data[stereo_index]
+
+            colormap, vmax = None, None
+            if key_matches(key, default_flow_keys):
+                data = flow_to_rgb(data)
+            elif key_matches(key, default_segmap_keys):
+                colormap = "jet"
+                if len(data.shape) == 3:
+                    data = data[:, :, channel if channel is not None else 0]
+            elif key_matches(key, default_depth_keys):
+                colormap, vmax = "summer", default_depth_max
+                if len(data.shape) == 3:
+                    data = data[:, :, 0]
+            elif len(data.shape) == 2:
+                colormap = "viridis"
+
+            if colormap is not None:
+                if colormap not in palettes:
+                    palettes[colormap] = _GifWriterUtility.colormap_palette(colormap)
+                image = Image.fromarray(_GifWriterUtility.colormap_indices(data, vmax))
+                image.putpalette(palettes[colormap])
+            else:
+                image = Image.fromarray(_GifWriterUtility.to_rgb(data))
+                if palette_image is None:
+                    image = palette_image = image.quantize(256)
+                else:
+                    image = image.quantize(palette=palette_image)
+            yield image
+
     @staticmethod
     def look_for_existing_output(output_dir_path: str, append_to_existing_output: bool, name_ending: str) -> int:
         """
@@ -140,24 +212,39 @@ def look_for_existing_output(output_dir_path: str, append_to_existing_output: bo
         return gif_number
 
     @staticmethod
-    def write_to_gif(to_animate: Dict[str, list],
+    def write_to_gif(to_animate: Dict[str, Tuple[str, Optional[int], Optional[int]]],
+                     output_data_dict: Dict[str, List[Union[np.ndarray, list, dict]]],
                      output_dir_path: str,
                      append_to_existing_output: bool,
                      frame_duration_in_ms: int,
-                     reverse_animation: bool) -> None:
+                     reverse_animation: bool,
+                     num_threads: int = 0) -> None:
         """
-        Loads all .png files from each specific temporary folder and concatenates them to a single gif file respectively
+        Converts the frames of each animation into palette images and streams them into a single gif file
+        respectively. Only the converted palette images are held by the encoder.
         """
-        for key, frame_list in to_animate.items():
-            print(f'gif for {key}')
-            if reverse_animation:
-                frame_list.reverse()
-            # loads actual picture data as frames
-            frames = [Image.open(path) for path in frame_list]
+
+        def write_animation(name: str, key: str, stereo_index: Optional[int], channel: Optional[int]):
+            print(f'gif for {name}')
+            frames = _GifWriterUtility.iterate_gif_frames(key, output_data_dict[key], stereo_index, channel,
+                                                          reverse_animation)
+            first_frame = next(frames)
 
             gif_number = _GifWriterUtility.look_for_existing_output(output_dir_path, append_to_existing_output,
-                                                                    f"_{key}_animation.gif")
-            file_name = f"{gif_number}_{key}_animation.gif"
+                                                                    f"_{name}_animation.gif")
+            file_name = f"{gif_number}_{name}_animation.gif"
             file = os.path.join(output_dir_path, file_name)
-            frames[0].save(file, format='GIF', append_images=frames[1:], save_all=True, duration=frame_duration_in_ms,
-                           loop=0)
+            first_frame.save(file, format='GIF', append_images=frames, save_all=True,
+                             duration=frame_duration_in_ms, loop=0)
+
+        if num_threads <= 0:
+            for name, (key, stereo_index, channel) in to_animate.items():
+                write_animation(name, key, stereo_index, channel)
+            return
+
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            futures = [executor.submit(write_animation, name, key, stereo_index, channel)
+                       for name, (key, stereo_index, channel) in to_animate.items()]
+            # Raise possible exceptions of the threads
+            for future in futures:
+                future.result()
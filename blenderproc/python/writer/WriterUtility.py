@@ -2,8 +2,16 @@
 
 
 import os
-from typing import List, Dict, Union, Any, Set, Tuple
+from typing import List, Dict, Union, Any, Set, Tuple, Optional, Iterable, Callable, Iterator
 import json
+import zlib
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import deque, OrderedDict
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor, Future
 
 import csv
 import numpy as np
@@ -12,7 +20,7 @@
 import h5py
 
 from blenderproc.python.postprocessing.PostProcessingUtility import trim_redundant_channels, \
-    segmentation_mapping
+    segmentation_mapping, snapshot_segmentation_attributes
 from blenderproc.python.postprocessing.PostProcessingUtility import dist2depth, depth2dist
 from blenderproc.python.types.EntityUtility import Entity
 from blenderproc.python.utility.BlenderUtility import load_image
@@ -23,7 +31,9 @@
 
 
 def write_hdf5(output_dir_path: str, output_data_dict: Dict[str, List[Union[np.ndarray, list, dict]]],
-               append_to_existing_output: bool = False, stereo_separate_keys: bool = False):
+               append_to_existing_output: bool = False, stereo_separate_keys: bool = False,
+               single_container: bool = False, compression: Optional[str] = "gzip",
+               num_compression_threads: int = 0):
     """
     Saves the information provided inside of the output_data_dict into a .hdf5 container
 
@@ -37,6 +47,15 @@ def write_hdf5(output_dir_path: str, output_data_dict: Dict[str, List[Union[np.n
                                  won't be saved in one tensor [2, img_x, img_y, channels], where the img[0] is the
                                  left image and img[1] the right. They will be saved in separate keys: for example
                                  for colors in colors_0 and colors_1.
+    :param single_container: If this is True, all frames of this run are written into one .hdf5 container named
+                             `<first_frame>-<last_frame>.hdf5` instead of one container per frame. Every key is
+                             then stored as a chunked, resizable dataset whose first axis is the frame and the
+                             frame numbers are stored in the `frame_ids` dataset.
+    :param compression: The compression used for all non-string datasets: "gzip", "lzf" or None for no
+                        compression (e.g. when writing to /dev/shm).
+    :param num_compression_threads: If > 0, single_container is used and the compression is gzip, the frames are
+                                    compressed by that many background threads, while the main thread writes the
+                                    compressed chunks into the container.
     """
 
     if not os.path.exists(output_dir_path):
@@ -44,17 +63,17 @@ def write_hdf5(output_dir_path: str, output_data_dict: Dict[str, List[Union[np.n
 
     amount_of_frames = 0
     for data_block in output_data_dict.values():
-        if isinstance(data_block, list):
+        if isinstance(data_block, (list, LazyFrameSequence)):
             amount_of_frames = max([amount_of_frames, len(data_block)])
 
     # if append to existing output is turned on the existing folder is searched for the highest occurring
     # index, which is then used as starting point for this run
     if append_to_existing_output:
         frame_offset = 0
-        # Look for hdf5 file with highest index
+        # Look for hdf5 file with highest index, single containers are named <first_frame>-<last_frame>.hdf5
         for path in os.listdir(output_dir_path):
             if path.endswith(".hdf5"):
-                index = path[:-len(".hdf5")]
+                index = path[:-len(".hdf5")].split("-")[-1]
                 if index.isdigit():
                     frame_offset = max(frame_offset, int(index) + 1)
     else:
@@ -64,7 +83,19 @@ def write_hdf5(output_dir_path: str, output_data_dict: Dict[str, List[Union[np.n
         raise Exception("The amount of images stored in the output_data_dict does not correspond with the amount"
                         "of images specified by frame_start to frame_end.")
 
-    for frame in range(bpy.context.scene.frame_start, bpy.context.scene.frame_end):
+    frames = range(bpy.context.scene.frame_start, bpy.context.scene.frame_end)
+    if single_container:
+        if len(frames) == 0:
+            return
+        hdf5_path = os.path.join(output_dir_path, f"{frames[0] + frame_offset}-{frames[-1] + frame_offset}.hdf5")
+        print(f"Merging data for frames {frames[0]} to {frames[-1]} into {hdf5_path}")
+        frame_data = (_WriterUtility.collect_frame_data(output_data_dict, frame - bpy.context.scene.frame_start,
+                                                        stereo_separate_keys) for frame in frames)
+        _WriterUtility.write_hdf5_container(hdf5_path, [frame + frame_offset for frame in frames], frame_data,
+                                            compression, num_compression_threads)
+        return
+
+    for frame in frames:
         # for each frame a new .hdf5 file is generated
         hdf5_path = os.path.join(output_dir_path, str(frame + frame_offset) + ".hdf5")
         with h5py.File(hdf5_path, "w") as file:
@@ -72,72 +103,171 @@ def write_hdf5(output_dir_path: str, output_data_dict: Dict[str, List[Union[np.n
             print(f"Merging data for frame {frame} into {hdf5_path}")
 
             adjusted_frame = frame - bpy.context.scene.frame_start
-            for key, data_block in output_data_dict.items():
-                if adjusted_frame < len(data_block):
-                    # get the current data block for the current frame
-                    used_data_block = data_block[adjusted_frame]
-                    if stereo_separate_keys and (bpy.context.scene.render.use_multiview or
-                                                 used_data_block.shape[0] == 2):
-                        # stereo mode was activated
-                        _WriterUtility.write_to_hdf_file(file, key + "_0", data_block[adjusted_frame][0])
-                        _WriterUtility.write_to_hdf_file(file, key + "_1", data_block[adjusted_frame][1])
-                    else:
-                        _WriterUtility.write_to_hdf_file(file, key, data_block[adjusted_frame])
-                else:
-                    raise Exception(f"There are more frames {adjusted_frame} then there are blocks of information "
-                                    f" {len(data_block)} in the given list for key {key}.")
+            frame_data = _WriterUtility.collect_frame_data(output_data_dict, adjusted_frame, stereo_separate_keys)
+            for key, data in frame_data.items():
+                _WriterUtility.write_to_hdf_file(file, key, data, compression)
             blender_proc_version = Utility.get_current_version()
             if blender_proc_version is not None:
                 _WriterUtility.write_to_hdf_file(file, "blender_proc_version", np.bytes_(blender_proc_version))
 
 
+class LazyFrameSequence(Sequence):
+    """ A read-only, frame-indexed sequence of rendered outputs, whose frames are only decoded when accessed.
+
+    It can be used like the lists returned by `render()`: indexing decodes the requested frame, slicing returns
+    another lazy sequence. While iterating, the next frames are decoded in background threads, so only the current
+    and the prefetched frames are held in memory.
+    """
+
+    def __init__(self, load_frame: Callable[[int], Any], num_frames: int, num_prefetch: int = 2,
+                 frame_indices: Optional[range] = None, owner: Any = None,
+                 finish_frame: Optional[Callable[[Any], Any]] = None):
+        """
+        :param load_frame: A function which decodes the frame with the given index. It is called from background
+                           threads while iterating, so it must not access blender.
+        :param num_frames: The number of frames.
+        :param num_prefetch: The number of frames which are decoded in advance while iterating.
+        :param frame_indices: The frame indices covered by this sequence, used for slices. Default: all frames.
+        :param owner: An object which is kept alive as long as this sequence, e.g. the owner of the decoded files.
+        :param finish_frame: If given, it is applied to every decoded frame on the thread accessing the frame.
+        """
+        self._load_frame = load_frame
+        self._frame_indices = frame_indices if frame_indices is not None else range(num_frames)
+        self._num_prefetch = num_prefetch
+        self._owner = owner
+        self._finish_frame = finish_frame if finish_frame is not None else lambda frame: frame
+
+    def __len__(self) -> int:
+        return len(self._frame_indices)
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return LazyFrameSequence(self._load_frame, 0, self._num_prefetch, self._frame_indices[index], self._owner,
+                                     self._finish_frame)
+        return self._finish_frame(self._load_frame(self._frame_indices[index]))
+
+    def __iter__(self) -> Iterator[Any]:
+        if self._num_prefetch <= 0:
+            for frame_index in self._frame_indices:
+                yield self._finish_frame(self._load_frame(frame_index))
+            return
+
+        with ThreadPoolExecutor(max_workers=self._num_prefetch) as executor:
+            pending = deque()
+            for frame_index in self._frame_indices:
+                pending.append(executor.submit(self._load_frame, frame_index))
+                if len(pending) > self._num_prefetch:
+                    yield self._finish_frame(pending.popleft().result())
+            while pending:
+                yield self._finish_frame(pending.popleft().result())
+
+
+class _OwnedDirectory:
+    """ A directory which is removed together with all its files, as soon as this object is garbage collected. """
+
+    def __init__(self, path: str):
+        """
+        :param path: The path of the directory.
+        """
+        self.path = path
+        weakref.finalize(self, shutil.rmtree, path, True)
+
+
+class _SharedFrameDecoder:
+    """ Decodes the frames for multiple lazy sequences, s.t. every frame is only decoded once.
+
+    The most recently requested frames are kept, so sequences which are iterated side by side share them.
+    """
+
+    def __init__(self, decode_frame: Callable[[int], Any], max_frames: int):
+        """
+        :param decode_frame: A function which decodes the frame with the given index.
+        :param max_frames: The number of decoded frames which are kept.
+        """
+        self._decode_frame = decode_frame
+        self._max_frames = max_frames
+        self._frames: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, frame_index: int) -> Any:
+        with self._lock:
+            future = self._frames.get(frame_index)
+            is_decoding_thread = future is None
+            if is_decoding_thread:
+                future = Future()
+                self._frames[frame_index] = future
+                while len(self._frames) > self._max_frames:
+                    self._frames.popitem(last=False)
+            else:
+                self._frames.move_to_end(frame_index)
+
+        # Other threads requesting the same frame wait for the result
+        if is_decoding_thread:
+            try:
+                future.set_result(self._decode_frame(frame_index))
+            except BaseException as e:
+                future.set_exception(e)
+        return future.result()
+
+
 class _WriterUtility:
 
     @staticmethod
-    def load_registered_outputs(keys: Set[str], keys_with_alpha_channel: Set[str] = None) -> \
-            Dict[str, Union[np.ndarray, List[np.ndarray]]]:
+    def load_registered_outputs(keys: Set[str], keys_with_alpha_channel: Set[str] = None, lazy: bool = False,
+                                num_threads: int = 0) -> \
+            Dict[str, Union[np.ndarray, List[np.ndarray], "LazyFrameSequence"]]:
         """
         Loads registered outputs with specified keys
 
         :param keys: set of output_key types to load
         :param keys_with_alpha_channel: A set containing all keys whose alpha channels should be loaded.
+        :param lazy: If True, per frame outputs are not loaded directly, instead a LazyFrameSequence is returned
+                     for them, which decodes the frames when they are accessed.
+        :param num_threads: If > 0, the files of all frames and keys are decoded by that many threads in parallel,
+                            the blender dependent postprocessing and the order of the results stay the same as in
+                            the serial mode. For lazy outputs, this is the number of prefetched frames.
         :return: dict of lists of raw loaded outputs. Keys are e.g. 'distance', 'colors', 'normals', 'segmap'
         """
-        output_data_dict: Dict[str, Union[np.ndarray, List[np.ndarray]]] = {}
-        reg_outputs = Utility.get_registered_outputs()
-        for reg_out in reg_outputs:
-            if reg_out['key'] in keys:
-                key_has_alpha_channel = keys_with_alpha_channel is not None and reg_out[
-                    'key'] in keys_with_alpha_channel
-                if '%' in reg_out['path']:
-                    # per frame outputs
-                    for frame_id in range(bpy.context.scene.frame_start, bpy.context.scene.frame_end):
-                        output_path = resolve_path(reg_out['path'] % frame_id)
-                        if os.path.exists(output_path):
-                            output_file = _WriterUtility.load_output_file(output_path, key_has_alpha_channel)
+        output_data_dict: Dict[str, Union[np.ndarray, List[np.ndarray], LazyFrameSequence]] = {}
+        reg_outputs = [reg_out for reg_out in Utility.get_registered_outputs() if reg_out['key'] in keys]
+        keys_with_alpha_channel = keys_with_alpha_channel if keys_with_alpha_channel is not None else set()
+        frame_ids = range(bpy.context.scene.frame_start, bpy.context.scene.frame_end)
+
+        with ThreadPoolExecutor(max_workers=max(num_threads, 1)) as executor:
+            # In the parallel mode, all files are handed to the threads upfront, the decoded frames are then
+            # collected below in the same order as in the serial mode
+            decoded_frames = {}
+            if num_threads > 0 and not lazy:
+                for reg_out_index, reg_out in enumerate(reg_outputs):
+                    if '%' in reg_out['path']:
+                        decoded_frames[reg_out_index] = [
+                            executor.submit(_WriterUtility.decode_registered_output_frame, reg_out,
+                                            resolve_path(reg_out['path'] % frame_id),
+                                            reg_out['key'] in keys_with_alpha_channel)
+                            for frame_id in frame_ids]
+
+            for reg_out_index, reg_out in enumerate(reg_outputs):
+                key_has_alpha_channel = reg_out['key'] in keys_with_alpha_channel
+                if '%' in reg_out['path'] and lazy:
+                    output_data_dict.update(_WriterUtility.load_registered_output_lazily(
+                        reg_out, key_has_alpha_channel, num_threads if num_threads > 0 else 2))
+                elif '%' in reg_out['path']:
+                    # per frame outputs, the objects and the camera are only looked up once for all frames
+                    attribute_snapshot = _WriterUtility.snapshot_segmentation_attributes(reg_out)
+                    intrinsics = _WriterUtility.snapshot_intrinsics(reg_out)
+                    for frame_index, frame_id in enumerate(frame_ids):
+                        if reg_out_index in decoded_frames:
+                            output_file = decoded_frames[reg_out_index][frame_index].result()
+                            # Release the decoded frame, as soon as it is collected
+                            decoded_frames[reg_out_index][frame_index] = None
                         else:
-                            # check for stereo files
-                            output_paths = _WriterUtility.get_stereo_path_pair(output_path)
-                            # convert to a tensor of shape [2, img_x, img_y, channels]
-                            # output_file[0] is the left image and output_file[1] the right image
-                            output_file = np.array(
-                                [_WriterUtility.load_output_file(path, key_has_alpha_channel) for path in
-                                 output_paths])
-                        # For outputs like distance or depth, we automatically trim the last channel here
-                        if "trim_redundant_channels" in reg_out and reg_out["trim_redundant_channels"]:
-                            output_file = trim_redundant_channels(output_file)
-                        if "convert_to_depth" in reg_out and reg_out["convert_to_depth"]:
-                            output_file = dist2depth(output_file)
-                        if "convert_to_distance" in reg_out and reg_out["convert_to_distance"]:
-                            output_file = depth2dist(output_file)
-
-                        # semantic seg must be last
-                        if "is_semantic_segmentation" in reg_out and reg_out["is_semantic_segmentation"]\
-                                and "semantic_segmentation_mapping" in reg_out \
-                                and "semantic_segmentation_default_values" in reg_out:
-                            output_file = segmentation_mapping(output_file,
-                                                               reg_out["semantic_segmentation_mapping"],
-                                                               reg_out["semantic_segmentation_default_values"])
+                            output_path = resolve_path(reg_out['path'] % frame_id)
+                            output_file = _WriterUtility.decode_registered_output_frame(reg_out, output_path,
+                                                                                        key_has_alpha_channel)
+                        output_file = _WriterUtility.postprocess_registered_output_frame(reg_out, output_file,
+                                                                                         attribute_snapshot,
+                                                                                         intrinsics)
+                        if isinstance(output_file, dict):
                             for key, output_info in output_file.items():
                                 output_data_dict.setdefault(key, []).append(output_info)
                         else:
@@ -150,6 +280,191 @@ def load_registered_outputs(keys: Set[str], keys_with_alpha_channel: Set[str] =
 
         return output_data_dict
 
+    @staticmethod
+    def decode_registered_output_frame(reg_out: Dict[str, Any], output_path: str, key_has_alpha_channel: bool,
+                                       remove: bool = True) -> Union[np.ndarray, List[Any]]:
+        """ Loads one frame of the given registered output and trims its redundant channels.
+
+        This does not access blender, so it can be called from background threads.
+
+        :param reg_out: The registered output.
+        :param output_path: The path of the frame, for stereo outputs the path without the _L / _R suffix.
+        :param key_has_alpha_channel: Whether the alpha channel should be loaded.
+        :param remove: Whether to delete the file(s) after loading.
+        :return: The decoded frame.
+        """
+        if os.path.exists(output_path):
+            output_file = _WriterUtility.load_output_file(output_path, key_has_alpha_channel, remove)
+        else:
+            # check for stereo files
+            output_paths = _WriterUtility.get_stereo_path_pair(output_path)
+            # convert to a tensor of shape [2, img_x, img_y, channels]
+            # output_file[0] is the left image and output_file[1] the right image
+            output_file = np.array(
+                [_WriterUtility.load_output_file(path, key_has_alpha_channel, remove) for path in output_paths])
+        # For outputs like distance or depth, we automatically trim the last channel here
+        if "trim_redundant_channels" in reg_out and reg_out["trim_redundant_channels"]:
+            output_file = trim_redundant_channels(output_file)
+        return output_file
+
+    @staticmethod
+    def is_semantic_segmentation(reg_out: Dict[str, Any]) -> bool:
+        """ Returns whether the given registered output contains pass indices, which have to be mapped via
+        `segmentation_mapping`.
+
+        :param reg_out: The registered output.
+        :return: True, if it is a semantic segmentation output.
+        """
+        return "is_semantic_segmentation" in reg_out and reg_out["is_semantic_segmentation"] \
+            and "semantic_segmentation_mapping" in reg_out and "semantic_segmentation_default_values" in reg_out
+
+    @staticmethod
+    def snapshot_segmentation_attributes(reg_out: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """ Resolves the attributes of the objects, which are needed to map the frames of a semantic segmentation
+        output, see `snapshot_segmentation_attributes()` in the PostProcessingUtility.
+
+        :param reg_out: The registered output.
+        :return: The snapshot of the attributes or None, if the output is no semantic segmentation.
+        """
+        if not _WriterUtility.is_semantic_segmentation(reg_out):
+            return None
+        return snapshot_segmentation_attributes(reg_out["semantic_segmentation_mapping"],
+                                                reg_out["semantic_segmentation_default_values"])
+
+    @staticmethod
+    def snapshot_intrinsics(reg_out: Dict[str, Any]) -> Optional[np.ndarray]:
+        """ Returns the intrinsics of the current camera, if the given registered output is converted between depth
+        and distance.
+
+        The K matrix also reflects the current resolution.
+
+        :param reg_out: The registered output.
+        :return: The K matrix or None, if the output is not converted.
+        """
+        if reg_out.get("convert_to_depth") or reg_out.get("convert_to_distance"):
+            return CameraUtility.get_intrinsics_as_K_matrix()
+        return None
+
+    @staticmethod
+    def postprocess_registered_output_frame(reg_out: Dict[str, Any], output_file: Union[np.ndarray, List[Any]],
+                                            attribute_snapshot: Optional[Dict[str, Any]] = None,
+                                            intrinsics: Optional[np.ndarray] = None) \
+            -> Union[np.ndarray, List[Any], Dict[str, Any]]:
+        """ Applies the depth/distance conversion and the semantic segmentation mapping to a decoded frame.
+
+        These read the camera and render settings from blender, so they are applied on the calling thread. If the
+        attribute snapshot and the intrinsics are given, blender is not accessed.
+
+        :param reg_out: The registered output.
+        :param output_file: The decoded frame, see `decode_registered_output_frame`.
+        :param attribute_snapshot: The attributes of the objects used for the semantic segmentation mapping, see
+                                   `snapshot_segmentation_attributes()`. If None, the current scene is used.
+        :param intrinsics: The K matrix used for the depth/distance conversion, see `snapshot_intrinsics()`. If None,
+                           the current camera is used.
+        :return: The postprocessed frame. For semantic segmentations, a dict mapping from the resulting keys to
+                 the data.
+        """
+        if "convert_to_depth" in reg_out and reg_out["convert_to_depth"]:
+            output_file = dist2depth(output_file, K=intrinsics)
+        if "convert_to_distance" in reg_out and reg_out["convert_to_distance"]:
+            output_file = depth2dist(output_file, K=intrinsics)
+
+        # semantic seg must be last
+        if _WriterUtility.is_semantic_segmentation(reg_out):
+            output_file = segmentation_mapping(output_file,
+                                               reg_out["semantic_segmentation_mapping"],
+                                               reg_out["semantic_segmentation_default_values"],
+                                               attribute_snapshot)
+        return output_file
+
+    @staticmethod
+    def load_registered_output_lazily(reg_out: Dict[str, Any], key_has_alpha_channel: bool,
+                                      num_prefetch: int = 2) -> Dict[str, "LazyFrameSequence"]:
+        """ Returns lazy sequences over the frames of the given per frame output.
+
+        The rendered files are moved into a separate directory, so they are not overwritten by the next rendering.
+        The directory is removed, as soon as none of the returned sequences is used anymore.
+
+        :param reg_out: The registered output.
+        :param key_has_alpha_channel: Whether the alpha channel should be loaded.
+        :param num_prefetch: The number of frames which are decoded in advance while iterating.
+        :return: A dict mapping from the output key(s) to the lazy sequence of frames.
+        """
+        frame_ids = range(bpy.context.scene.frame_start, bpy.context.scene.frame_end)
+        if len(frame_ids) == 0:
+            return {}
+        output_paths = [resolve_path(reg_out['path'] % frame_id) for frame_id in frame_ids]
+
+        # Move the files into a directory next to them, so it is on the same file system
+        owned_dir = _OwnedDirectory(tempfile.mkdtemp(prefix="lazy_outputs_", dir=os.path.dirname(output_paths[0])))
+        moved_paths = []
+        for output_path in output_paths:
+            paths = [output_path] if os.path.exists(output_path) else _WriterUtility.get_stereo_path_pair(output_path)
+            for path in paths:
+                if not os.path.exists(path):
+                    raise FileNotFoundError("File not found: " + path)
+                shutil.move(path, os.path.join(owned_dir.path, os.path.basename(path)))
+            moved_paths.append(os.path.join(owned_dir.path, os.path.basename(output_path)))
+
+        # The attributes of the objects and the camera intrinsics are resolved now, so the frames are postprocessed
+        # with the scene which has been rendered, even if it changes until the frames are accessed. Therefore, the
+        # postprocessing does not access blender anymore and can happen in the background threads.
+        attribute_snapshot = _WriterUtility.snapshot_segmentation_attributes(reg_out)
+        intrinsics = _WriterUtility.snapshot_intrinsics(reg_out)
+
+        def decode_frame(frame_index: int) -> Union[np.ndarray, List[Any], Dict[str, Any]]:
+            output_file = _WriterUtility.decode_registered_output_frame(reg_out, moved_paths[frame_index],
+                                                                        key_has_alpha_channel, remove=False)
+            return _WriterUtility.postprocess_registered_output_frame(reg_out, output_file, attribute_snapshot,
+                                                                      intrinsics)
+
+        if attribute_snapshot is None:
+            return {reg_out['key']: LazyFrameSequence(decode_frame, len(frame_ids), num_prefetch, owner=owned_dir)}
+
+        # Semantic segmentations are split into multiple keys, which share the decoded frames
+        shared_decoder = _SharedFrameDecoder(decode_frame, 2 * num_prefetch + 2)
+
+        def select_key(frame: Dict[str, Any], key: str) -> Any:
+            if key not in frame:
+                raise RuntimeError(f"The key {key} is not available in this frame, as none of the visible objects has "
+                                   f"a numeric value for it.")
+            return frame[key]
+
+        return {key: LazyFrameSequence(shared_decoder, len(frame_ids), num_prefetch, owner=owned_dir,
+                                       finish_frame=lambda frame, key=key: select_key(frame, key))
+                for key in _WriterUtility.segmentation_output_keys(reg_out, attribute_snapshot)}
+
+    @staticmethod
+    def segmentation_output_keys(reg_out: Dict[str, Any], attribute_snapshot: Dict[str, Any]) -> List[str]:
+        """ Determines the keys, into which the frames of the given semantic segmentation output are split by
+        `segmentation_mapping()`, without decoding any frame.
+
+        A map_by attribute gets its own key, if any object has a numeric value for it.
+
+        :param reg_out: The registered semantic segmentation output.
+        :param attribute_snapshot: The attributes of the objects, see `snapshot_segmentation_attributes()`.
+        :return: The list of keys.
+        """
+        map_by = reg_out["semantic_segmentation_mapping"]
+        if not isinstance(map_by, list):
+            map_by = [map_by]
+
+        keys = []
+        for map_by_attribute in map_by:
+            map_by_attribute = map_by_attribute.lower()
+            if map_by_attribute == "instance":
+                keys.append("instance_segmaps")
+                continue
+            current_attribute = "category_id" if map_by_attribute in ["class", "category_id"] else map_by_attribute
+            if any(isinstance(values.get(current_attribute), (int, float, np.integer, np.floating))
+                   for values in attribute_snapshot["values"].values()):
+                keys.append(f"{map_by_attribute}_segmaps")
+            elif "instance" not in map_by:
+                raise ValueError(f"The map_by key \"{map_by_attribute}\" requires that the instance map is "
+                                 f"stored as well in the output. Change it to: {map_by + ['instance']}")
+        keys.append("instance_attribute_maps")
+        return keys
+
     @staticmethod
     def get_stereo_path_pair(file_path: str) -> Tuple[str, str]:
         """
@@ -341,12 +656,39 @@ def _get_shapenet_attribute(shapenet_obj: bpy.types.Object, attribute_name: str,
                                                    world_frame_change)
 
     @staticmethod
-    def write_to_hdf_file(file, key: str, data: Union[np.ndarray, list, dict], compression: str = "gzip"):
-        """ Adds the given data as a new entry to the given hdf5 file.
+    def collect_frame_data(output_data_dict: Dict[str, List[Union[np.ndarray, list, dict]]], adjusted_frame: int,
+                           stereo_separate_keys: bool) -> Dict[str, Union[np.ndarray, list, dict]]:
+        """ Collects the data of all keys for the given frame.
+
+        :param output_data_dict: The container, which keeps the different images, see `write_hdf5`.
+        :param adjusted_frame: The frame relative to frame_start.
+        :param stereo_separate_keys: Whether stereo images should be split into two keys, see `write_hdf5`.
+        :return: A dict mapping from the hdf5 key to the data of the given frame.
+        """
+        frame_data = {}
+        for key, data_block in output_data_dict.items():
+            if adjusted_frame < len(data_block):
+                # get the current data block for the current frame
+                used_data_block = data_block[adjusted_frame]
+                if stereo_separate_keys and (bpy.context.scene.render.use_multiview or
+                                             used_data_block.shape[0] == 2):
+                    # stereo mode was activated
+                    frame_data[key + "_0"] = data_block[adjusted_frame][0]
+                    frame_data[key + "_1"] = data_block[adjusted_frame][1]
+                else:
+                    frame_data[key] = data_block[adjusted_frame]
+            else:
+                raise Exception(f"There are more frames {adjusted_frame} then there are blocks of information "
+                                f" {len(data_block)} in the given list for key {key}.")
+        return frame_data
+
+    @staticmethod
+    def to_hdf_data(key: str, data: Union[np.ndarray, list, dict]) -> np.ndarray:
+        """ Converts the given data into a numpy array which can be stored in a hdf5 file.
 
-        :param file: The hdf5 file handle. Type: hdf5.File
         :param key: The key at which the data should be stored in the hdf5 file.
         :param data: The data to store.
+        :return: The data as numpy array, dicts are serialized into a json byte string.
         """
         if not isinstance(data, np.ndarray) and not isinstance(data, np.bytes_):
             if isinstance(data, (list, dict)):
@@ -358,8 +700,121 @@ def write_to_hdf_file(file, key: str, data: Union[np.ndarray, list, dict], compr
             else:
                 raise Exception(
                     f"This fct. expects the data for key {key} to be a np.ndarray, list or dict not a {type(data)}!")
+        return data
+
+    @staticmethod
+    def write_to_hdf_file(file, key: str, data: Union[np.ndarray, list, dict], compression: Optional[str] = "gzip"):
+        """ Adds the given data as a new entry to the given hdf5 file.
+
+        :param file: The hdf5 file handle. Type: hdf5.File
+        :param key: The key at which the data should be stored in the hdf5 file.
+        :param data: The data to store.
+        :param compression: The compression used for non-string data: "gzip", "lzf" or None.
+        """
+        data = _WriterUtility.to_hdf_data(key, data)
 
         if data.dtype.char == 'S':
             file.create_dataset(key, data=data, dtype=data.dtype)
         else:
             file.create_dataset(key, data=data, compression=compression)
+
+    @staticmethod
+    def _prepare_container_frame(frame_data: Dict[str, Union[np.ndarray, list, dict]],
+                                 compress: bool) -> Dict[str, Tuple[np.ndarray, Optional[bytes]]]:
+        """ Converts the data of one frame for the hdf5 container and optionally compresses it.
+
+        :param frame_data: A dict mapping from the hdf5 key to the data of the frame.
+        :param compress: If True, every non-string array is compressed into one gzip chunk.
+        :return: A dict mapping from the hdf5 key to the converted data and its compressed chunk (or None).
+        """
+        prepared = {}
+        for key, data in frame_data.items():
+            data = _WriterUtility.to_hdf_data(key, data)
+            chunk = None
+            if compress and data.dtype.char != 'S':
+                data = np.ascontiguousarray(data)
+                # Level 4 is also the default level of the gzip filter in h5py
+                chunk = zlib.compress(data.tobytes(), 4)
+            prepared[key] = (data, chunk)
+        return prepared
+
+    @staticmethod
+    def _write_container_frame(file, frame_index: int, frame_id: int,
+                               prepared: Dict[str, Tuple[np.ndarray, Optional[bytes]]], compression: Optional[str]):
+        """ Appends the prepared data of one frame to the datasets of the given hdf5 container.
+
+        :param file: The hdf5 file handle. Type: hdf5.File
+        :param frame_index: The index of the frame inside the container.
+        :param frame_id: The frame number, only used for error messages.
+        :param prepared: The data of the frame, as returned by `_prepare_container_frame`.
+        :param compression: The compression used for non-string datasets: "gzip", "lzf" or None.
+        """
+        for key, (data, chunk) in prepared.items():
+            # Json strings differ in length from frame to frame, so they are stored as variable length strings
+            is_string = data.dtype.char == 'S' and data.ndim == 0
+            if key not in file:
+                if is_string:
+                    file.create_dataset(key, shape=(0,), maxshape=(None,), dtype=h5py.vlen_dtype(bytes))
+                else:
+                    file.create_dataset(key, shape=(0,) + data.shape, maxshape=(None,) + data.shape,
+                                        dtype=data.dtype, chunks=(1,) + tuple(max(1, dim) for dim in data.shape),
+                                        compression=None if data.dtype.char == 'S' else compression)
+            dataset = file[key]
+            if not is_string and dataset.shape[1:] != data.shape:
+                raise Exception(f"The data for key {key} has the shape {data.shape} in frame {frame_id}, but the "
+                                f"shape {dataset.shape[1:]} in the previous frames of the container.")
+
+            dataset.resize(frame_index + 1, axis=0)
+            if is_string:
+                dataset[frame_index] = data.tobytes()
+            elif chunk is not None and data.dtype == dataset.dtype:
+                # Every frame is exactly one chunk, so the precompressed chunk can be written directly
+                dataset.id.write_direct_chunk((frame_index,) + (0,) * data.ndim, chunk)
+            else:
+                dataset[frame_index] = data
+
+    @staticmethod
+    def write_hdf5_container(hdf5_path: str, frame_ids: List[int],
+                             frame_data: Iterable[Dict[str, Union[np.ndarray, list, dict]]],
+                             compression: Optional[str] = "gzip", num_compression_threads: int = 0):
+        """ Writes multiple frames into one hdf5 container.
+
+        Every key is stored as a resizable dataset, chunked per frame, whose first axis is the frame. The frame
+        numbers are stored in the dataset `frame_ids`. Like in the per frame containers, the blenderproc version is
+        stored once in the scalar dataset `blender_proc_version`, which has no frame axis.
+
+        :param hdf5_path: The path of the hdf5 container.
+        :param frame_ids: The frame numbers of the given frames.
+        :param frame_data: For every frame, a dict mapping from the hdf5 key to the data of that frame.
+        :param compression: The compression used for non-string datasets: "gzip", "lzf" or None.
+        :param num_compression_threads: If > 0 and gzip is used, the frames are compressed by that many background
+                                        threads and written into the container as precompressed chunks.
+        """
+        with h5py.File(hdf5_path, "w") as file:
+            blender_proc_version = Utility.get_current_version()
+            if blender_proc_version is not None:
+                _WriterUtility.write_to_hdf_file(file, "blender_proc_version", np.bytes_(blender_proc_version))
+            file.create_dataset("frame_ids", data=np.array(frame_ids, dtype=np.int64), maxshape=(None,))
+
+            if num_compression_threads > 0 and compression == "gzip":
+                # zlib releases the GIL, so the frames are compressed in parallel, while the main thread writes the
+                # compressed chunks in frame order
+                with ThreadPoolExecutor(max_workers=num_compression_threads) as executor:
+                    pending = deque()
+                    frame_index = 0
+                    for data in frame_data:
+                        pending.append(executor.submit(_WriterUtility._prepare_container_frame, data, True))
+                        # Limit the number of compressed frames waiting to be written, to bound the memory usage
+                        if len(pending) >= 2 * num_compression_threads:
+                            _WriterUtility._write_container_frame(file, frame_index, frame_ids[frame_index],
+                                                                  pending.popleft().result(), compression)
+                            frame_index += 1
+                    while pending:
+                        _WriterUtility._write_container_frame(file, frame_index, frame_ids[frame_index],
+                                                              pending.popleft().result(), compression)
+                        frame_index += 1
+            else:
+                for frame_index, data in enumerate(frame_data):
+                    _WriterUtility._write_container_frame(file, frame_index, frame_ids[frame_index],
+                                                          _WriterUtility._prepare_container_frame(data, False),
+                                                          compression)
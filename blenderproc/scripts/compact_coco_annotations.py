@@ -0,0 +1,26 @@
+""" Compacts sharded coco annotations into one coco_annotations.json file """
+
+import argparse
+
+from blenderproc.python.writer.CocoShardUtility import compact_coco_annotations
+
+
+def cli():
+    """
+    Command line function
+    """
+    parser = argparse.ArgumentParser("Compacts sharded coco annotations into one coco_annotations.json file.")
+    parser.add_argument('output_dir', help='The output directory of the coco writer, containing the '
+                                           'coco_annotations_shards folder.')
+    parser.add_argument('--indent', default=None, type=int,
+                        help="If given, the resulting json file is pretty-printed with that indent level.")
+    parser.add_argument('--keep-shards', dest='keep_shards', action='store_true',
+                        help="If set, the shards are not removed after compacting them. Only shards written "
+                             "afterwards are merged by the next compaction.")
+    args = parser.parse_args()
+
+    compact_coco_annotations(args.output_dir, args.indent, remove_shards=not args.keep_shards)
+
+
+if __name__ == "__main__":
+    cli()
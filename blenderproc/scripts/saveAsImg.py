@@ -8,9 +8,9 @@
 import numpy as np
 
 try:
-    from visHdf5Files import vis_data
+    from visHdf5Files import vis_data, iterate_frames
 except ModuleNotFoundError:
-    from blenderproc.scripts.visHdf5Files import vis_data
+    from blenderproc.scripts.visHdf5Files import vis_data, iterate_frames
 
 
 def save_array_as_image(array, key, file_path):
@@ -22,27 +22,28 @@ def convert_hdf(base_file_path: str, output_folder: Optional[str] = None):
     """ Convert a hdf5 file to images """
     if os.path.exists(base_file_path):
         if os.path.isfile(base_file_path):
-            base_name = str(os.path.basename(base_file_path)).split('.', maxsplit=1)[0]
-            if output_folder is not None:
-                base_name = os.path.join(output_folder, base_name)
-            with h5py.File(base_file_path, 'r') as data:
-                print(f"{base_file_path}:")
-                for key, val in data.items():
-                    val = np.array(val)
-                    if np.issubdtype(val.dtype, np.string_) or len(val.shape) == 1:
-                        pass  # metadata
-                    else:
-                        print(f"key: {key} {val.shape} {val.dtype.name}")
-
-                        if val.shape[0] != 2:
-                            # mono image
-                            file_path = f'{base_name}_{key}.png'
-                            save_array_as_image(val, key, file_path)
+            with h5py.File(base_file_path, 'r') as hdf5_data:
+                for file_label, file_stem, data in iterate_frames(hdf5_data, os.path.basename(base_file_path)):
+                    base_name = file_stem
+                    if output_folder is not None:
+                        base_name = os.path.join(output_folder, base_name)
+                    print(f"{file_label}:")
+                    for key, val in data.items():
+                        val = np.array(val)
+                        if np.issubdtype(val.dtype, np.string_) or len(val.shape) == 1:
+                            pass  # metadata
                         else:
-                            # stereo image
-                            for image_index, image_value in enumerate(val):
-                                file_path = f'{base_name}_{key}_{image_index}.png'
-                                save_array_as_image(image_value, key, file_path)
+                            print(f"key: {key} {val.shape} {val.dtype.name}")
+
+                            if val.shape[0] != 2:
+                                # mono image
+                                file_path = f'{base_name}_{key}.png'
+                                save_array_as_image(val, key, file_path)
+                            else:
+                                # stereo image
+                                for image_index, image_value in enumerate(val):
+                                    file_path = f'{base_name}_{key}_{image_index}.png'
+                                    save_array_as_image(image_value, key, file_path)
         else:
             print("The path is not a file")
     else:
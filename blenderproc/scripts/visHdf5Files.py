@@ -154,6 +154,31 @@ def vis_data(key, data, full_hdf5_data=None, file_label="", rgb_keys=None, flow_
             plt.close()
 
 
+def iterate_frames(data, file_name):
+    """
+    Iterates over the frames stored in the given hdf5 file. A file written via `write_hdf5(..., single_container=True)`
+    contains multiple frames, all other files contain exactly one frame.
+
+    :param data: The opened hdf5 file.
+    :param file_name: The file name of the hdf5 file.
+    :return: A generator of tuples (label, file name stem, frame data), where frame data maps every key to its data.
+    """
+    stem = str(file_name).split('.', maxsplit=1)[0]
+    if "frame_ids" not in data:
+        yield file_name, stem, data
+        return
+
+    for frame_index, frame_id in enumerate(data["frame_ids"]):
+        frame_data = {}
+        for key, dataset in data.items():
+            if key != "frame_ids":
+                # Scalar datasets (e.g. the blenderproc version) are shared by all frames
+                value = dataset[()] if dataset.ndim == 0 else dataset[frame_index]
+                # Variable length strings (e.g. json) are returned as bytes
+                frame_data[key] = np.bytes_(value) if isinstance(value, bytes) else value
+        yield f"{file_name} (frame {frame_id})", f"{stem}_{frame_id}", frame_data
+
+
 def vis_file(path, keys_to_visualize=None, rgb_keys=None, flow_keys=None, segmap_keys=None, segcolormap_keys=None,
              depth_keys=None, depth_max=default_depth_max, save_to_path=None):
     """ Visualize a file """
@@ -163,61 +188,67 @@ def vis_file(path, keys_to_visualize=None, rgb_keys=None, flow_keys=None, segmap
     # Check if file exists
     if os.path.exists(path):
         if os.path.isfile(path):
-            with h5py.File(path, 'r') as data:
-                print(path + ": ")
-
-                # Select only a subset of keys if args.keys is given
-                if keys_to_visualize is not None:
-                    keys = [key for key in data.keys() if key_matches(key, keys_to_visualize)]
-                else:
-                    keys = list(data.keys())
-
-                # Visualize every key
-                res = []
-                for key in keys:
-                    value = np.array(data[key])
-
-                    if sum(ele for ele in value.shape) < 5 or "version" in key:
-                        if value.dtype == "|S5":
-                            res.append(
-                                (key, str(value).replace("[", "").replace("]", "").replace("b'", "").replace("'", "")))
-                        else:
-                            res.append((key, value))
-                    else:
-                        res.append((key, value.shape))
-
-                if res:
-                    res = [f"'{key}': {key_res}" for key, key_res in res]
-                    print("Keys: " + ', '.join(res))
-
-                for key in keys:
-                    value = np.array(data[key])
-                    if save_to_path is not None:
-                        save_to_file = os.path.join(save_to_path,
-                                                    str(os.path.basename(path)).split('.', maxsplit=1)[0] +
-                                                    f"_{key}.png")
-                    else:
-                        save_to_file = None
-
-                    # Check if it is a stereo image
-                    if len(value.shape) >= 3 and value.shape[0] == 2:
-                        # Visualize both eyes separately
-                        for i, img in enumerate(value):
-                            if save_to_file:
-                                save_to_file = str(Path(save_to_file).with_suffix("")) + (
-                                    "_left" if i == 0 else "_right") + Path(save_to_file).suffix
-                            vis_data(key, img, data, os.path.basename(path) + (" (left)" if i == 0 else " (right)"),
-                                     rgb_keys, flow_keys, segmap_keys, segcolormap_keys, depth_keys, depth_max,
-                                     save_to_file)
-                    else:
-                        vis_data(key, value, data, os.path.basename(path), rgb_keys, flow_keys, segmap_keys,
-                                 segcolormap_keys, depth_keys, depth_max, save_to_file)
+            with h5py.File(path, 'r') as hdf5_data:
+                for file_label, file_stem, data in iterate_frames(hdf5_data, os.path.basename(path)):
+                    vis_frame(data, file_label, file_stem, keys_to_visualize, rgb_keys, flow_keys, segmap_keys,
+                              segcolormap_keys, depth_keys, depth_max, save_to_path)
         else:
             print("The path is not a file")
     else:
         print(f"The file does not exist: {path}")
 
 
+def vis_frame(data, file_label, file_stem, keys_to_visualize=None, rgb_keys=None, flow_keys=None, segmap_keys=None,
+              segcolormap_keys=None, depth_keys=None, depth_max=default_depth_max, save_to_path=None):
+    """ Visualize the data of one frame """
+    print(file_label + ": ")
+
+    # Select only a subset of keys if args.keys is given
+    if keys_to_visualize is not None:
+        keys = [key for key in data.keys() if key_matches(key, keys_to_visualize)]
+    else:
+        keys = list(data.keys())
+
+    # Visualize every key
+    res = []
+    for key in keys:
+        value = np.array(data[key])
+
+        if sum(ele for ele in value.shape) < 5 or "version" in key:
+            if value.dtype == "|S5":
+                res.append(
+                    (key, str(value).replace("[", "").replace("]", "").replace("b'", "").replace("'", "")))
+            else:
+                res.append((key, value))
+        else:
+            res.append((key, value.shape))
+
+    if res:
+        res = [f"'{key}': {key_res}" for key, key_res in res]
+        print("Keys: " + ', '.join(res))
+
+    for key in keys:
+        value = np.array(data[key])
+        if save_to_path is not None:
+            save_to_file = os.path.join(save_to_path, file_stem + f"_{key}.png")
+        else:
+            save_to_file = None
+
+        # Check if it is a stereo image
+        if len(value.shape) >= 3 and value.shape[0] == 2:
+            # Visualize both eyes separately
+            for i, img in enumerate(value):
+                if save_to_file:
+                    save_to_file = str(Path(save_to_file).with_suffix("")) + (
+                        "_left" if i == 0 else "_right") + Path(save_to_file).suffix
+                vis_data(key, img, data, file_label + (" (left)" if i == 0 else " (right)"),
+                         rgb_keys, flow_keys, segmap_keys, segcolormap_keys, depth_keys, depth_max,
+                         save_to_file)
+        else:
+            vis_data(key, value, data, file_label, rgb_keys, flow_keys, segmap_keys,
+                     segcolormap_keys, depth_keys, depth_max, save_to_file)
+
+
 def cli():
     """
     Command line function
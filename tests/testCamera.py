@@ -3,6 +3,7 @@
 import os.path
 import numpy as np
 import bpy
+from mathutils import Matrix
 
 resource_folder = os.path.join(os.path.dirname(__file__), "..", "examples", "resources")
 
@@ -47,3 +48,57 @@ def test_camera_rotation_from_forward_vec(self):
         for x, y in zip(np.reshape(correct_roation_matrix, -1).tolist(), np.reshape(calc_rotation_matrix, -1).tolist()):
             self.assertAlmostEqual(x, y, places=6)
 
+
+    def test_validate_camera_poses(self):
+        """ Tests if the batch validation leads to the same results as checking every camera pose on its own.
+        """
+        bproc.clean_up(True)
+        objects = [bproc.object.create_primitive("CUBE", location=[0, 0, 0]),
+                   bproc.object.create_primitive("SPHERE", location=[2, 1, 0])]
+        objects[1].set_cp("category_id", 1)
+        bvh_tree = bproc.object.create_bvh_tree_multi_objects(objects)
+
+        rng = np.random.default_rng(0)
+        cam2world_matrices = []
+        for _ in range(20):
+            location = rng.uniform([-6, -6, 2], [6, 6, 6])
+            rotation_matrix = bproc.camera.rotation_from_forward_vec(rng.uniform(-1, 1, 3) - location)
+            cam2world_matrices.append(bproc.math.build_transformation_mat(location, rotation_matrix))
+        cam2world_matrices = np.array(cam2world_matrices)
+
+        proximity_checks = {"min": 1.0, "avg": {"min": 0.5, "max": 6.0}}
+        mask, scores = bproc.camera.validate_camera_poses(cam2world_matrices, proximity_checks, 0.0, objects)
+        for cam2world_matrix, valid, score in zip(cam2world_matrices, mask, scores):
+            self.assertEqual(valid, bproc.camera.perform_obstacle_in_view_check(cam2world_matrix, proximity_checks,
+                                                                                bvh_tree))
+            self.assertAlmostEqual(score, bproc.camera.scene_coverage_score(cam2world_matrix), places=5)
+
+    def test_pose_novelty_tracker(self):
+        """ Tests if the incremental novelty tracker leads to the same results as recomputing the variances.
+        """
+        def is_novel_reference(cam2world_matrix, existing_poses):
+            for values, new_value in [([Matrix(pose).to_euler() for pose in existing_poses],
+                                       Matrix(cam2world_matrix).to_euler()),
+                                      ([np.array(pose)[:3, 3] for pose in existing_poses], cam2world_matrix[:3, 3])]:
+                old_var = np.var(values)
+                if np.var(values + [new_value]) < old_var:
+                    return False
+            return True
+
+        rng = np.random.default_rng(0)
+        existing_poses = []
+        tracker = bproc.camera.PoseNoveltyTracker()
+        for i in range(200):
+            location = rng.normal(0, 1 + i * 0.05, 3)
+            rotation_matrix = bproc.camera.rotation_from_forward_vec(-location, inplane_rot=rng.uniform(-1, 1))
+            cam2world_matrix = bproc.math.build_transformation_mat(location, rotation_matrix)
+
+            novel = tracker.is_novel(cam2world_matrix)
+            self.assertEqual(novel, len(existing_poses) == 0 or is_novel_reference(cam2world_matrix, existing_poses))
+            if novel:
+                existing_poses.append(cam2world_matrix)
+                tracker.add_pose(cam2world_matrix)
+
+        candidates = [bproc.math.build_transformation_mat(rng.normal(0, 5, 3), np.eye(3)) for _ in range(20)]
+        self.assertEqual(tracker.are_novel(candidates).tolist(),
+                         [is_novel_reference(candidate, existing_poses) for candidate in candidates])
@@ -0,0 +1,60 @@
+import blenderproc as bproc
+import unittest
+import numpy as np
+
+from blenderproc.python.postprocessing.PostProcessingUtility import _PostProcessingUtility
+
+
+def remove_segmap_noise_reference(image):
+    """ The original pixel by pixel implementation of remove_segmap_noise. """
+    noise_indices = _PostProcessingUtility.determine_noisy_pixels(image)
+
+    for index in noise_indices:
+        neighbors = _PostProcessingUtility.get_pixel_neighbors(image, index[0], index[1])
+        curr_val = image[index[0]][index[1]][0]
+
+        neighbor_vals = [image[neighbor[0]][neighbor[1]] for neighbor in neighbors]
+        neighbor_vals = np.unique(np.array([np.array(index) for index in neighbor_vals]))
+
+        min_val = 10000000000
+        min_idx = 0
+
+        for idx, n in enumerate(neighbor_vals):
+            if n - curr_val <= min_val:
+                min_val = n - curr_val
+                min_idx = idx
+
+        new_val = neighbor_vals[min_idx]
+        image[index[0]][index[1]] = np.array([new_val, new_val, new_val])
+
+    return image
+
+
+class UnitTestCheckPostProcessing(unittest.TestCase):
+
+    def test_remove_segmap_noise(self):
+        """ Test if the vectorized remove_segmap_noise leads to the same results as the pixel by pixel implementation
+        on a small segmap.
+        """
+        rng = np.random.default_rng(0)
+        height, width = 128, 160
+        segmap = np.zeros((height, width))
+        y, x = np.ogrid[:height, :width]
+        for i in range(8):
+            center_y, center_x, radius = rng.integers(0, height), rng.integers(0, width), rng.integers(5, 40)
+            segmap[(y - center_y) ** 2 + (x - center_x) ** 2 < radius ** 2] = (i + 1) * 20000
+        # Object borders get random values, as they are produced by antialiasing
+        edges = np.zeros((height, width), dtype=bool)
+        edges[:, 1:] |= segmap[:, 1:] != segmap[:, :-1]
+        edges[1:] |= segmap[1:] != segmap[:-1]
+        segmap[edges] = rng.integers(0, 2 ** 24, np.count_nonzero(edges))
+        segmap = np.repeat(segmap[..., None], 3, axis=2).astype(np.float32)
+
+        expected = remove_segmap_noise_reference(segmap.copy())
+        result = bproc.postprocessing.remove_segmap_noise(segmap.copy())
+
+        np.testing.assert_array_equal(result, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,6 +7,7 @@
 from blenderproc.python.tests.SilentMode import SilentMode
 from blenderproc.python.tests.TestsPathManager import test_path_manager
 from blenderproc.python.utility.Utility import UndoAfterExecution
+from blenderproc.python.utility.CollisionUtility import CollisionUtility, BroadPhaseIndex, BVHCache
 
 
 class UnitTestCheckUtility(unittest.TestCase):
@@ -48,4 +49,50 @@ def test_math_util_transformation_mat(self):
         cam2world_matrix = bproc.math.build_transformation_mat(location, rotation_matrix)
 
         for x, y in zip(np.reshape(correct_cam2world_matrix, -1).tolist(), np.reshape(cam2world_matrix, -1).tolist()):
-            self.assertAlmostEqual(x, y)
\ No newline at end of file
+            self.assertAlmostEqual(x, y)
+
+    def test_broad_phase_index(self):
+        """ Tests if the broad phase index returns the same objects as checking all bounding boxes.
+        """
+        bproc.clean_up(True)
+        rng = np.random.default_rng(0)
+        objs = [bproc.object.create_primitive("CUBE", scale=rng.uniform(0.1, 1, 3)) for _ in range(30)]
+        for obj in objs:
+            obj.set_location(rng.uniform(-5, 5, 3))
+            obj.set_rotation_euler(rng.uniform(0, np.pi, 3))
+
+        broad_phase = BroadPhaseIndex(objs[:20])
+        for obj in objs:
+            obj.set_location(rng.uniform(-5, 5, 3))
+            if obj in broad_phase:
+                broad_phase.update(obj)
+            expected = {other for other in objs[:20]
+                        if other != obj and CollisionUtility.check_bb_intersection(obj, other)}
+            self.assertEqual(set(broad_phase.query(obj)), expected)
+
+    def test_bvh_cache(self):
+        """ Tests if the local space bvh cache detects the same collisions as building the trees in world space.
+        """
+        bproc.clean_up(True)
+        rng = np.random.default_rng(0)
+        cube = bproc.object.create_primitive("CUBE", scale=[0.5, 1, 0.3])
+        sphere = bproc.object.create_primitive("SPHERE", radius=0.6)
+
+        bvh_cache = BVHCache()
+        for _ in range(50):
+            for obj in [cube, sphere]:
+                obj.set_location(rng.uniform(-1.5, 1.5, 3))
+                obj.set_rotation_euler(rng.uniform(0, np.pi, 3))
+            expected, _ = CollisionUtility.check_mesh_intersection(cube, sphere)
+            intersection, _ = CollisionUtility.check_mesh_intersection(cube, sphere, bvh_cache=bvh_cache)
+            self.assertEqual(intersection, expected)
+        self.assertEqual(bvh_cache.stats()["misses"], 2)
+
+        # The world space tree of an object which has not been moved is reused
+        world_tree_builds = bvh_cache.stats()["world_tree_builds"]
+        for _ in range(10):
+            cube.set_location(rng.uniform(-1.5, 1.5, 3))
+            expected, _ = CollisionUtility.check_mesh_intersection(cube, sphere)
+            intersection, _ = CollisionUtility.check_mesh_intersection(cube, sphere, bvh_cache=bvh_cache)
+            self.assertEqual(intersection, expected)
+        self.assertEqual(bvh_cache.stats()["world_tree_builds"], world_tree_builds + 10)
@@ -0,0 +1,98 @@
+import blenderproc as bproc
+import unittest
+import os
+import json
+import tempfile
+import numpy as np
+import cv2
+
+from blenderproc.python.utility.GlobalStorage import GlobalStorage
+from blenderproc.python.utility.Utility import Utility
+from blenderproc.python.writer.WriterUtility import _WriterUtility
+from blenderproc.python.writer.CocoWriterUtility import _CocoWriterUtility
+from PIL import Image
+
+
+class UnitTestCheckWriterUtility(unittest.TestCase):
+
+    def test_load_registered_outputs_in_parallel(self):
+        """ Test if decoding the registered outputs in parallel leads to the same results as the serial decoding.
+        """
+        bproc.clean_up(True)
+        num_frames = 8
+        bproc.utility.set_keyframe_render_interval(0, num_frames)
+
+        rng = np.random.default_rng(0)
+        images = [rng.integers(0, 65536, (48, 64, 3), dtype=np.uint16) for _ in range(num_frames)]
+        with tempfile.TemporaryDirectory() as output_dir:
+            output = {"key": "test_colors", "path": os.path.join(output_dir, "test_colors_%04d.png"),
+                      "version": "2.0.0"}
+            Utility.add_output_entry(output)
+
+            results = {}
+            for num_threads in [0, 4]:
+                for frame_id in range(num_frames):
+                    cv2.imwrite(output["path"] % frame_id, images[frame_id])
+
+                results[num_threads] = _WriterUtility.load_registered_outputs({"test_colors"},
+                                                                              num_threads=num_threads)["test_colors"]
+            GlobalStorage.get("output").remove(output)
+
+        self.assertEqual(len(results[0]), num_frames)
+        self.assertEqual(len(results[4]), num_frames)
+        for serial_frame, parallel_frame in zip(results[0], results[4]):
+            np.testing.assert_array_equal(serial_frame, parallel_frame)
+
+    def test_write_gif_animation(self):
+        """ Test if every key is written into its own gif animation with one frame per rendered frame.
+        """
+        bproc.clean_up(True)
+        num_frames = 5
+        bproc.utility.set_keyframe_render_interval(0, num_frames)
+
+        rng = np.random.default_rng(0)
+        data = {
+            "colors": [rng.integers(0, 256, (48, 64, 3), dtype=np.uint8) for _ in range(num_frames)],
+            "depth": [rng.uniform(0, 30, (48, 64)).astype(np.float32) for _ in range(num_frames)],
+            "class_segmaps": [rng.integers(0, 5, (48, 64, 2)) for _ in range(num_frames)],
+            "instance_attribute_maps": [[{"idx": 0}] for _ in range(num_frames)]
+        }
+        with tempfile.TemporaryDirectory() as output_dir:
+            bproc.writer.write_gif_animation(output_dir, data, num_threads=2)
+
+            gif_dir = os.path.join(output_dir, "gif_animations")
+            self.assertEqual(sorted(os.listdir(gif_dir)),
+                             ["0_class_segmaps_0_animation.gif", "0_class_segmaps_1_animation.gif",
+                              "0_colors_animation.gif", "0_depth_animation.gif"])
+            for file_name in os.listdir(gif_dir):
+                with Image.open(os.path.join(gif_dir, file_name)) as animation:
+                    self.assertEqual(animation.n_frames, num_frames)
+
+    def test_compact_coco_annotations_keep_shards(self):
+        """ Test if compacting while keeping the shards does not merge the same shards again in the next compaction.
+        """
+        def write_shard(output_dir):
+            coco_annotations = {"info": {}, "licenses": [], "categories": [{"id": 1, "name": "1"}],
+                                "images": [{"id": 0, "file_name": "image.png"}],
+                                "annotations": [{"id": 1, "image_id": 0, "category_id": 1}]}
+            _CocoWriterUtility.write_shard(output_dir, coco_annotations,
+                                           _CocoWriterUtility.get_last_shard_entry(output_dir))
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            os.makedirs(os.path.join(output_dir, "coco_annotations_shards"))
+            write_shard(output_dir)
+            write_shard(output_dir)
+            bproc.writer.compact_coco_annotations(output_dir, remove_shards=False)
+            bproc.writer.compact_coco_annotations(output_dir, remove_shards=False)
+            write_shard(output_dir)
+            bproc.writer.compact_coco_annotations(output_dir)
+
+            self.assertFalse(os.path.exists(os.path.join(output_dir, "coco_annotations_shards")))
+            with open(os.path.join(output_dir, "coco_annotations.json"), "r", encoding="utf-8") as fp:
+                coco_annotations = json.load(fp)
+            self.assertEqual([image["id"] for image in coco_annotations["images"]], [0, 1, 2])
+            self.assertEqual([annotation["id"] for annotation in coco_annotations["annotations"]], [1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()